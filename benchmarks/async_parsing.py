@@ -0,0 +1,65 @@
+"""Measures the latency of concurrent parsing requests served by an asyncio event loop, and how long the event loop is
+blocked, when parsing in the event loop itself and with parse_async, with and without a limit on concurrent parsers
+and with a process pool."""
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.parse_file import SimpleLangParserWithoutAST
+from pylasu.concurrency import AsyncRunner
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def serve(requests, parse):
+    lags = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def request(code, delay):
+        await asyncio.sleep(delay)
+        await parse(code)
+        # From when the request arrived, even if the event loop was too busy to notice
+        return time.perf_counter() - start - delay
+
+    start = time.perf_counter()
+    beating = asyncio.ensure_future(heartbeat())
+    latencies = await asyncio.gather(*(request(code, delay) for code, delay in requests))
+    done.set()
+    await beating
+    return latencies, lags
+
+
+def run(label, requests, parse):
+    latencies, lags = asyncio.run(serve(requests, parse))
+    print(f"{label:<32}latency p50 {percentile(latencies, 0.5) * 1000:>7.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:>7.1f} ms, p99 {percentile(latencies, 0.99) * 1000:>7.1f} ms; "
+          f"event loop blocked up to {max(lags) * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    requests = [("".join(f"set v{j} = {j} display {j} " for j in range(random.choice([10, 10, 10, 1000]))),
+                 random.uniform(0, 0.5)) for _ in range(40)]
+    parser = SimpleLangParserWithoutAST()
+
+    async def blocking(code):
+        parser.parse(code)
+
+    run("parse in the event loop", requests, blocking)
+    run("parse_async", requests, parser.parse_async)
+    runner = AsyncRunner(limit=1)
+    run("parse_async, limit=1", requests, lambda code: parser.parse_async(code, runner=runner))
+    with ProcessPoolExecutor(os.cpu_count()) as executor:
+        runner = AsyncRunner(executor)
+        run("parse_async, process pool", requests, lambda code: parser.parse_async(code, runner=runner))
@@ -0,0 +1,42 @@
+"""Compares computing the positions of all the elements of a parse tree of about 100k tokens one at a time, with
+to_position, and in bulk with compute_positions, with and without NumPy.
+
+Uses the SimpleLang parser of the test suite, that must have been generated first (see tests/generate-test-parsers.sh).
+"""
+from antlr4 import CommonTokenStream, InputStream
+
+from pylasu.parsing.parse_tree import TokenPoints
+from pylasu.parsing.positions import collect_parse_trees, compute_positions, numpy
+from tests.simple_lang.SimpleLangLexer import SimpleLangLexer
+from tests.simple_lang.SimpleLangParser import SimpleLangParser
+
+from benchmarks.support import measure, report
+
+
+def parse(statements: int):
+    code = " ".join(f"set v{i} = {i} + \"\" * 2 display {i}" for i in range(statements))
+    token_stream = CommonTokenStream(SimpleLangLexer(InputStream(code)))
+    parse_tree = SimpleLangParser(token_stream).compilationUnit()
+    return parse_tree, len(token_stream.tokens)
+
+
+def one_at_a_time(parse_trees):
+    return [parse_tree.to_position() for parse_tree in parse_trees]
+
+
+def sharing_token_points(parse_trees):
+    points = TokenPoints()
+    return [points.position(parse_tree) for parse_tree in parse_trees]
+
+
+if __name__ == "__main__":
+    parse_tree, tokens = parse(5_000)
+    parse_trees = collect_parse_trees(parse_tree)[1]
+    print(f"{tokens} tokens, {len(parse_trees)} parse tree elements")
+    report("to_position", measure(lambda: one_at_a_time(parse_trees), repeat=3), len(parse_trees), "element")
+    report("TokenPoints", measure(lambda: sharing_token_points(parse_trees), repeat=3), len(parse_trees), "element")
+    report("compute_positions, array", measure(lambda: compute_positions(parse_tree, use_numpy=False), repeat=3),
+           len(parse_trees), "element")
+    if numpy is not None:
+        report("compute_positions, NumPy", measure(lambda: compute_positions(parse_tree, use_numpy=True), repeat=3),
+               len(parse_trees), "element")
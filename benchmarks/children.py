@@ -0,0 +1,43 @@
+"""Compares walking a tree by scanning every feature value of every node for nodes, like older versions of Pylasu did,
+with walking it through the children functions compiled for each concept. Both walks use the same explicit stack, so
+that they differ only in how the children of each node are found, even on deep trees."""
+from pylasu.model import child_nodes, feature_values, walk
+from pylasu.model.model import nodes_in
+
+from benchmarks.support import deep_tree, measure, report, wide_tree
+
+
+def walk_scanning(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(nodes_in(feature_values(node)))))
+
+
+def walk_compiled(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(child_nodes(node)))
+
+
+def children_scanning(nodes):
+    for node in nodes:
+        list(nodes_in(feature_values(node)))
+
+
+def children_compiled(nodes):
+    for node in nodes:
+        child_nodes(node)
+
+
+if __name__ == "__main__":
+    for name, tree in [("deep", deep_tree(400)), ("wide", wide_tree(10_000))]:
+        nodes = list(walk(tree))
+        print(f"{name} tree, {len(nodes)} nodes")
+        report("children of each node, scanning feature values", measure(lambda: children_scanning(nodes)), len(nodes))
+        report("children of each node, compiled", measure(lambda: children_compiled(nodes)), len(nodes))
+        report("walk, scanning feature values", measure(lambda: sum(1 for _ in walk_scanning(tree))), len(nodes))
+        report("walk, compiled children", measure(lambda: sum(1 for _ in walk_compiled(tree))), len(nodes))
@@ -0,0 +1,50 @@
+"""Measures the latency of the first parses in a fresh process, with a cold DFA, after warm_up on a sample corpus, and
+after loading the DFA saved by another process with save_prediction_state. Each case runs in a new process, as a
+short-lived worker would."""
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from antlr4 import InputStream
+
+from benchmarks.incremental import ScriptParser
+from benchmarks.prediction_caches import script
+
+FIRST_PARSES = 5
+SAMPLES = 20
+
+
+def samples(seed: int, count: int):
+    random.seed(seed)
+    return [script() for _ in range(count)]
+
+
+def run(case: str, directory: str):
+    parser = ScriptParser()
+    start = time.perf_counter()
+    if case == "warm up":
+        parser.warm_up(samples(1, SAMPLES))
+    elif case == "load":
+        assert parser.load_prediction_state(directory)
+    setup = time.perf_counter() - start
+    latencies = []
+    for code in samples(2, FIRST_PARSES):
+        start = time.perf_counter()
+        assert not parser.parse_first_stage(InputStream(code)).issues
+        latencies.append(time.perf_counter() - start)
+    print(f"{case:<10}{setup * 1000:>10.1f} ms setup   first parses: "
+          + " ".join(f"{latency * 1000:6.1f}" for latency in latencies) + " ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run(sys.argv[1], sys.argv[2])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            parser = ScriptParser()
+            parser.warm_up(samples(1, SAMPLES))
+            parser.save_prediction_state(directory)
+            for case in ["cold", "warm up", "load"]:
+                subprocess.run([sys.executable, "-m", "benchmarks.dfa_warm_up", case, directory], check=True)
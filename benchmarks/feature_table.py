@@ -0,0 +1,30 @@
+"""Measures the per-node cost of reading the properties of a node with and without the cached feature table of its
+concept."""
+from pylasu.model import walk
+
+from benchmarks.support import measure, report, wide_tree
+
+
+def properties_by_reflection(nodes):
+    for node in nodes:
+        for p in type(node)._compute_node_properties():
+            getattr(node, p.name)
+
+
+def properties_from_feature_table(nodes):
+    for node in nodes:
+        for f in type(node).node_features:
+            f.getter(node)
+
+
+def node_properties(nodes):
+    for node in nodes:
+        for _ in node.properties:
+            pass
+
+
+if __name__ == "__main__":
+    nodes = list(walk(wide_tree(1_000)))
+    report("features computed by reflection", measure(lambda: properties_by_reflection(nodes), repeat=1), len(nodes))
+    report("features from the feature table", measure(lambda: properties_from_feature_table(nodes)), len(nodes))
+    report("Node.properties", measure(lambda: node_properties(nodes)), len(nodes))
@@ -0,0 +1,36 @@
+"""Compares reading a large source file into a string with reading it as bytes with SourceText.from_file, in terms of
+the memory taken and of the time spent to look up the text of many positions."""
+import os
+import random
+import tempfile
+import tracemalloc
+
+from pylasu.model import SourceText, pos
+
+from benchmarks.support import measure, report
+
+
+def allocated(function):
+    tracemalloc.start()
+    result = function()
+    # Include the line index
+    result.line_count
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "source.txt")
+        with open(path, "w", newline="") as file:
+            file.write("".join(f"    set variable{i} = {i} * {i} + 1\r\n" for i in range(200_000)))
+        read, read_size = allocated(lambda: SourceText(open(path, newline="").read()))
+        as_bytes, bytes_size = allocated(lambda: SourceText.from_file(path))
+        print(f"read into a string: {read_size / 1024:.0f} KiB, as bytes: {bytes_size / 1024:.0f} KiB")
+        positions = [pos(line, 4, line, 20) for line in random.sample(range(1, 200_000), 10_000)]
+        report("text at positions, read into a string", measure(lambda: [read.text_at(p) for p in positions]),
+               len(positions), "query")
+        report("text at positions, read as bytes", measure(lambda: [as_bytes.text_at(p) for p in positions]),
+               len(positions), "query")
+        del as_bytes
@@ -0,0 +1,57 @@
+"""Compares parsing a 20,000 lines script again after a one-character edit with reparse, which only parses the edited
+statement again, and with parse. When the edit adds a line, reparse also has to move the positions of all the following
+nodes, so it takes time proportional to their number."""
+import time
+
+from antlr4 import InputStream, Parser, TokenStream
+
+from pylasu.model import Point, Position
+from pylasu.parsing.antlr import PylasuANTLRParser
+from pylasu.parsing.incremental import TextEdit
+from tests.antlr_script.AntlrScriptLexer import AntlrScriptLexer
+from tests.antlr_script.AntlrScriptParser import AntlrScriptParser
+from tests.fixtures import Box, Item
+
+LINES = 20_000
+
+
+class ScriptParser(PylasuANTLRParser):
+    def create_antlr_lexer(self, input_stream: InputStream):
+        return AntlrScriptLexer(input_stream)
+
+    def create_antlr_parser(self, token_stream: TokenStream):
+        return AntlrScriptParser(token_stream)
+
+    def parse_tree_to_ast(self, root, consider_range, issues, source):
+        return Box("script", [self.unit_to_ast(s, issues, source) for s in root.statement()]).with_parse_tree(root)
+
+    def parse_unit(self, parser: Parser):
+        return parser.statement()
+
+    def ast_units(self, root):
+        return root.contents
+
+    def unit_to_ast(self, parse_tree, issues, source):
+        return Item(parse_tree.getText()).with_parse_tree(parse_tree, source)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    code = "".join(f"set value of item{i} to {i} * 2 + 1\n" for i in range(LINES))
+    parser = ScriptParser()
+    result, elapsed = timed(lambda: parser.parse(code))
+    print(f"{'parse':<50}{elapsed * 1000:>10.1f} ms")
+    for label, line, text in [("one character, same line, middle", LINES // 2, "9"),
+                              ("one character, same line, start", 1, "9"),
+                              ("new line, middle", LINES // 2, "\n"),
+                              ("new line, start", 1, "\n")]:
+        column = len(f"set value of item{line - 1} to ")
+        edit = TextEdit(Position(Point(line, column), Point(line, column)), text)
+        result, elapsed = timed(lambda: parser.reparse(result, [edit]))
+        assert not result.issues
+        print(f"{f'reparse, {label}':<50}{elapsed * 1000:>10.1f} ms")
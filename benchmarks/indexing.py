@@ -0,0 +1,33 @@
+"""Compares answering structural queries (is X inside Y, the descendants of Y, the depth of X) by walking the tree with
+answering them from an ASTIndex."""
+import random
+
+from pylasu.model import ASTIndex, walk
+
+from benchmarks.support import deep_tree, measure, report
+
+
+def is_ancestor_walking(ancestor, node):
+    return any(a is ancestor for a in node.walk_ancestors())
+
+
+def depth_walking(node):
+    return sum(1 for _ in node.walk_ancestors())
+
+
+if __name__ == "__main__":
+    tree = deep_tree(2_000)
+    tree.assign_parents()
+    nodes = list(walk(tree))
+    pairs = [(random.choice(nodes), random.choice(nodes)) for _ in range(1_000)]
+    index = ASTIndex(tree)
+    report("build the index", measure(lambda: index.rebuild()), len(nodes))
+    report("is_ancestor, walking the ancestors",
+           measure(lambda: [is_ancestor_walking(a, b) for a, b in pairs]), len(pairs), "query")
+    report("is_ancestor, index", measure(lambda: [index.is_ancestor(a, b) for a, b in pairs]), len(pairs), "query")
+    report("depth, walking the ancestors", measure(lambda: [depth_walking(a) for a, _ in pairs]), len(pairs), "query")
+    report("depth, index", measure(lambda: [index.depth(a) for a, _ in pairs]), len(pairs), "query")
+    report("descendants, walking", measure(lambda: [list(a.walk_descendants()) for a, _ in pairs]), len(pairs), "query")
+    report("descendants, index", measure(lambda: [index.descendants(a) for a, _ in pairs]), len(pairs), "query")
+    report("lowest common ancestor, index",
+           measure(lambda: [index.lowest_common_ancestor(a, b) for a, b in pairs]), len(pairs), "query")
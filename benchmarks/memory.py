@@ -0,0 +1,47 @@
+"""Reports the memory taken by each node of an AST, for ordinary dataclass nodes and for compact (slotted) ones."""
+import gc
+import tracemalloc
+from dataclasses import dataclass
+
+from pylasu.model import Node, compact_dataclass, pos
+
+from benchmarks.support import measure, report
+
+
+@dataclass
+class Statement(Node):
+    name: str = None
+    value: int = 0
+    kind: str = None
+
+
+@compact_dataclass
+class CompactStatement(Node):
+    name: str = None
+    value: int = 0
+    kind: str = None
+
+
+def build(node_class, count: int):
+    root = node_class("root")
+    position = pos(1, 0, 1, 10)
+    return [node_class("s", 1, "k").with_parent(root).with_position(position) for _ in range(count)]
+
+
+def bytes_per_node(node_class, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = build(node_class, count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodes
+    return (after - before) / count
+
+
+if __name__ == "__main__":
+    count = 100_000
+    for node_class in (Statement, CompactStatement):
+        print(f"{node_class.__name__ + ' memory':<50} {bytes_per_node(node_class, count):10.1f} bytes/node")
+    for node_class in (Statement, CompactStatement):
+        report(f"{node_class.__name__} construction", measure(lambda: build(node_class, count)), count)
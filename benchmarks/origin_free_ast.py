@@ -0,0 +1,114 @@
+"""Compares building the AST of a 20,000 lines script without positions (consider_range=False) as parse does, giving
+the nodes no origin at all, and as older versions did, creating a ParseTreeOrigin for each node and removing them all
+with another walk of the tree. The AST is built by a ParseTreeToASTTransformer. Reports the time of parsing and of
+building the AST, and the peak memory allocated while building the AST from the parse tree."""
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List
+
+from pylasu.mapping.parse_tree_to_ast_transformer import ParseTreeToASTTransformer
+from pylasu.model import Node, walk
+from pylasu.parsing.parse_tree import parse_tree_origins
+from tests.antlr_script.AntlrScriptParser import AntlrScriptParser as P
+
+from benchmarks.incremental import LINES, ScriptParser
+
+
+@dataclass
+class Expression(Node):
+    pass
+
+
+@dataclass
+class Script(Node):
+    statements: List[Node] = field(default_factory=list)
+
+
+@dataclass
+class SetStatement(Node):
+    feature: str = None
+    instance: Expression = None
+    value: Expression = None
+
+
+@dataclass
+class PrintStatement(Node):
+    message: Expression = None
+
+
+@dataclass
+class Reference(Expression):
+    name: str = None
+
+
+@dataclass
+class Literal(Expression):
+    value: str = None
+
+
+@dataclass
+class BinaryExpression(Expression):
+    operator: str = None
+    left: Expression = None
+    right: Expression = None
+
+
+def make_transformer() -> ParseTreeToASTTransformer:
+    transformer = ParseTreeToASTTransformer(allow_generic_node=False)
+    t = transformer.transform
+    transformer.register_node_factory(P.ScriptContext, lambda ctx: Script([t(s) for s in ctx.statements]))
+    transformer.register_node_factory(
+        P.Set_statementContext, lambda ctx: SetStatement(ctx.feature.text, t(ctx.instance), t(ctx.value)))
+    transformer.register_node_factory(P.Print_statementContext, lambda ctx: PrintStatement(t(ctx.message)))
+    transformer.register_node_factory(P.Reference_expressionContext, lambda ctx: Reference(ctx.name.text))
+    transformer.register_node_factory(P.Int_literal_expressionContext, lambda ctx: Literal(ctx.getText()))
+    transformer.register_node_factory(P.String_literal_expressionContext, lambda ctx: Literal(ctx.getText()))
+    transformer.register_node_factory(P.Parens_expressionContext, lambda ctx: t(ctx.expression()))
+    for context in [P.Div_mult_expressionContext, P.Sum_sub_expressionContext]:
+        transformer.register_node_factory(
+            context, lambda ctx: BinaryExpression(ctx.op.text, t(ctx.left), t(ctx.right)))
+    transformer.register_node_factory(
+        P.Concat_expressionContext, lambda ctx: BinaryExpression("concat", t(ctx.left), t(ctx.right)))
+    return transformer
+
+
+class TransformingParser(ScriptParser):
+    def parse_tree_to_ast(self, root, consider_range, issues, source):
+        return make_transformer().transform(root)
+
+
+class StrippingParser(TransformingParser):
+    def parse_tree_to_ast(self, root, consider_range, issues, source):
+        with parse_tree_origins(True):
+            ast = super().parse_tree_to_ast(root, consider_range, issues, source)
+        for node in walk(ast):
+            node.origin = None
+        return ast
+
+
+def peak_memory(parser: TransformingParser, root) -> int:
+    with parse_tree_origins(False):
+        tracemalloc.start()
+        ast = parser.parse_tree_to_ast(root, False, [], None)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    del ast
+    return peak
+
+
+if __name__ == "__main__":
+    code = "".join(f"set value of item{i} to ({i} * 2 + 1) / item{i + 1}\nprint concat 'a' and item{i}\n"
+                   for i in range(LINES // 2))
+    for label, parser in [("origins created and removed", StrippingParser()),
+                          ("no origins", TransformingParser())]:
+        parser.parse(code, consider_range=False)
+        start = time.perf_counter()
+        result = parser.parse(code, consider_range=False)
+        elapsed = time.perf_counter() - start
+        assert all(node.origin is None for node in walk(result.root))
+        count = sum(1 for _ in walk(result.root))
+        peak = peak_memory(parser, result.first_stage.root)
+        print(f"{label:<30}{elapsed * 1000:>10.1f} ms parse"
+              f"{result.timings.parse_tree_to_ast / 1_000_000:>10.1f} ms AST"
+              f"{peak / 1024 / 1024:>10.1f} MiB peak building the AST ({count} nodes)")
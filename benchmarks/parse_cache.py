@@ -0,0 +1,33 @@
+"""Compares parsing a synthetic corpus of files without a cache, with a cold ParseCache (which has to store the
+results), with a ParseCache whose entries are in a directory written by a previous run, and with one whose entries are
+in memory."""
+import tempfile
+import time
+
+from benchmarks.parse_many import write_corpus
+from pylasu.parsing.cache import ParseCache
+from tests.parsing.test_pylasu_antlr_parser import SimpleLangBoxParser
+
+
+def parse_all(parser, paths) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        parser.parse_file(path)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as cache_directory:
+        paths = write_corpus(directory, 100)
+        parser = SimpleLangBoxParser()
+        baseline = parse_all(parser, paths)
+        print(f"{'no cache':<30}{baseline:>10.3f} s")
+        parser.cache = ParseCache(cache_directory)
+        elapsed = parse_all(parser, paths)
+        print(f"{'cold cache':<30}{elapsed:>10.3f} s{baseline / elapsed:>10.1f}x")
+        parser.cache = ParseCache(cache_directory)
+        elapsed = parse_all(parser, paths)
+        print(f"{'directory hits':<30}{elapsed:>10.3f} s{baseline / elapsed:>10.1f}x")
+        elapsed = parse_all(parser, paths)
+        print(f"{'memory hits':<30}{elapsed:>10.3f} s{baseline / elapsed:>10.1f}x")
+        print(parser.cache.statistics)
@@ -0,0 +1,65 @@
+"""Compares parsing a large file with parse_file, which reads it as bytes, with parse(open(...).read()), in terms of
+wall time and peak resident memory. Each way of parsing runs in a process of its own, so that their peaks don't mix."""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from antlr4 import InputStream, TokenStream
+
+from pylasu.model import SourceText
+from pylasu.parsing.antlr import PylasuANTLRParser, SourceTextInputStream
+from tests.simple_lang.SimpleLangLexer import SimpleLangLexer
+from tests.simple_lang.SimpleLangParser import SimpleLangParser
+
+
+class SimpleLangParserWithoutAST(PylasuANTLRParser):
+    def create_antlr_lexer(self, input_stream: InputStream):
+        return SimpleLangLexer(input_stream)
+
+    def create_antlr_parser(self, token_stream: TokenStream):
+        return SimpleLangParser(token_stream)
+
+    def parse_tree_to_ast(self, root, consider_range, issues, source):
+        return None
+
+
+def stream_size(create_stream) -> int:
+    tracemalloc.start()
+    stream = create_stream()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del stream
+    return size
+
+
+def run(way: str, path: str):
+    parser = SimpleLangParserWithoutAST()
+    start = time.perf_counter()
+    if way == "parse_file":
+        result = parser.parse_file(path)
+    else:
+        with open(path) as file:
+            result = parser.parse(file.read())
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{way:<30}{elapsed:>10.2f} s{peak / 1024:>10.1f} MiB peak RSS, {len(result.code)} chars")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run(sys.argv[1], sys.argv[2])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "source.txt")
+            with open(path, "w") as file:
+                file.write("".join(f"set variable{i} = {i} display {i} " for i in range(20_000)))
+            print(f"input stream from a string: {stream_size(lambda: InputStream(open(path).read())) / 1024:.0f} KiB, "
+                  f"from the bytes of the file: "
+                  f"{stream_size(lambda: SourceTextInputStream(SourceText.from_file(path))) / 1024:.0f} KiB")
+            for way in ("parse(open(...).read())", "parse_file"):
+                subprocess.run([sys.executable, "-m", "benchmarks.parse_file", way, path], check=True)
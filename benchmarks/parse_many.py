@@ -0,0 +1,38 @@
+"""Reports the throughput of parse_many on a synthetic corpus of files of different sizes, with an increasing number of
+worker processes, up to the number of CPUs, compared with parsing the files one at a time."""
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.parse_file import SimpleLangParserWithoutAST
+from pylasu.parsing.batch import parse_many
+
+
+def write_corpus(directory: str, count: int):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"file{i}.simple")
+        with open(path, "w") as file:
+            file.write("".join(f"set v{j} = {j} display {j} " for j in range(random.randint(10, 1000))))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_corpus(directory, 100)
+        parser = SimpleLangParserWithoutAST()
+        start = time.perf_counter()
+        for path in paths:
+            parser.parse_file(path)
+        sequential = time.perf_counter() - start
+        print(f"{'one at a time':<30}{sequential:>10.2f} s")
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            failed = sum(result.failed for result in parse_many(SimpleLangParserWithoutAST, paths, workers=workers))
+            elapsed = time.perf_counter() - start
+            print(f"{f'parse_many, {workers} workers':<30}{elapsed:>10.2f} s{sequential / elapsed:>10.1f}x"
+                  f"{f', {failed} failed' if failed else ''}")
+            workers *= 2
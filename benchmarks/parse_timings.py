@@ -0,0 +1,46 @@
+"""Reports the average time of each phase of parsing a small input, as recorded in ParsingResultWithFirstStage.timings,
+and the overhead of measuring the phases, without listeners and with a listener that does nothing."""
+import time
+from dataclasses import fields
+
+from pylasu.parsing.timing import ParsingPhaseListener, ParsingTimings, PhaseTimer
+from tests.parsing.test_pylasu_antlr_parser import SimpleLangBoxParser
+
+PARSES = 5_000
+PHASES = 5
+
+
+def parse_many_times(parser, code: str):
+    totals = {f.name: 0 for f in fields(ParsingTimings)}
+    start = time.perf_counter_ns()
+    for _ in range(PARSES):
+        timings = parser.parse(code).timings
+        for name in totals:
+            totals[name] += getattr(timings, name) or 0
+    return (time.perf_counter_ns() - start) / PARSES, {name: total / PARSES for name, total in totals.items()}
+
+
+def timer_overhead(listeners) -> float:
+    timer = PhaseTimer(ParsingTimings(), listeners, None)
+    start = time.perf_counter_ns()
+    for _ in range(PARSES):
+        for _ in range(PHASES):
+            with timer("parsing"):
+                pass
+    return (time.perf_counter_ns() - start) / PARSES
+
+
+if __name__ == "__main__":
+    code = "set a = 10 display 42"
+    parser = SimpleLangBoxParser()
+    parse_many_times(parser, code)
+    elapsed, phases = parse_many_times(parser, code)
+    print(f"{'parse, no listeners':<40}{elapsed / 1000:>10.1f} us")
+    for name, average in phases.items():
+        if average:
+            print(f"  {name:<38}{average / 1000:>10.1f} us")
+    parser.add_phase_listener(ParsingPhaseListener())
+    elapsed, _ = parse_many_times(parser, code)
+    print(f"{'parse, one listener':<40}{elapsed / 1000:>10.1f} us")
+    print(f"{'timing the phases, no listeners':<40}{timer_overhead([]) / 1000:>10.2f} us")
+    print(f"{'timing the phases, one listener':<40}{timer_overhead([ParsingPhaseListener()]) / 1000:>10.2f} us")
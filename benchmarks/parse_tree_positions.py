@@ -0,0 +1,63 @@
+"""Compares computing the positions of nodes built from a parse tree on every access, like older versions of Pylasu
+did, with remembering them in the ParseTreeOrigin, and with computing all of them eagerly with precompute_positions.
+
+Uses the SimpleLang parser of the test suite, that must have been generated first (see tests/generate-test-parsers.sh).
+"""
+import gc
+import tracemalloc
+
+from antlr4 import CommonTokenStream, InputStream
+
+from pylasu.model import walk
+from pylasu.parsing.parse_tree import precompute_positions
+from tests.fixtures import Box, Item
+from tests.simple_lang.SimpleLangLexer import SimpleLangLexer
+from tests.simple_lang.SimpleLangParser import SimpleLangParser
+
+from benchmarks.support import measure, report
+
+
+def build_ast(statements: int):
+    code = " ".join(f"set v{i} = {i} + {i} * 2 display {i}" for i in range(statements))
+    parse_tree = SimpleLangParser(CommonTokenStream(SimpleLangLexer(InputStream(code)))).compilationUnit()
+    return Box("cu", [
+        Box("statement", [Item("expression").with_parse_tree(s.expression())]).with_parse_tree(s)
+        for s in parse_tree.statement()
+    ]).with_parse_tree(parse_tree)
+
+
+def read_positions(nodes, times=3):
+    for _ in range(times):
+        for node in nodes:
+            node.position
+
+
+def read_positions_uncached(nodes, times=3):
+    for _ in range(times):
+        for node in nodes:
+            node.origin.parse_tree.to_position(node.origin.source)
+
+
+def position_memory(nodes, compute) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    compute()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(nodes)
+
+
+if __name__ == "__main__":
+    ast = build_ast(5_000)
+    nodes = list(walk(ast))
+    print(f"{len(nodes)} nodes, positions read 3 times each")
+    report("positions computed on every access", measure(lambda: read_positions_uncached(nodes), repeat=1), len(nodes))
+    report("positions remembered, first access", measure(lambda: read_positions(nodes, 1), repeat=1), len(nodes))
+    report("positions remembered, later accesses", measure(lambda: read_positions(nodes)), len(nodes))
+    eager = list(walk(build_ast(5_000)))
+    report("precompute_positions", measure(lambda: precompute_positions(eager[0]), repeat=1), len(nodes))
+    lazy = list(walk(build_ast(5_000)))
+    print(f"lazy positions: {position_memory(lazy, lambda: read_positions(lazy, 1)):.0f} bytes/node")
+    eager = list(walk(build_ast(5_000)))
+    print(f"precomputed positions: {position_memory(eager, lambda: precompute_positions(eager[0])):.0f} bytes/node")
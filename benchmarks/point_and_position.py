@@ -0,0 +1,75 @@
+"""Compares the memory taken by points and positions, the time to create them and the time to compare them, for
+dataclasses like the ones of older versions of Pylasu and for the current compact ones."""
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+
+from pylasu.model import Point, Position, Source
+
+from benchmarks.support import measure, report
+
+
+@dataclass(order=True)
+class OldPoint:
+    line: int
+    column: int
+
+    def __post_init__(self):
+        if self.line < 1:
+            raise Exception(f"Line {self.line} cannot be less than 1")
+        if self.column < 0:
+            raise Exception(f"Column {self.column} cannot be less than 0")
+
+
+@dataclass(order=True)
+class OldPosition:
+    start: OldPoint
+    end: OldPoint
+    source: Source = field(compare=False, default=None)
+
+    def __post_init__(self):
+        if self.end < self.start:
+            raise Exception(f"End point can't be before starting point: {self.start} – {self.end}")
+
+    def __contains__(self, pos):
+        return isinstance(pos, OldPosition) and self.start <= pos.start and self.end >= pos.end
+
+
+def bytes_per_position(create, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    positions = [create(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del positions
+    return (after - before) / count
+
+
+def old_position(i):
+    return OldPosition(OldPoint(i + 1, 0), OldPoint(i + 2, 10))
+
+
+def new_position(i):
+    return Position(Point(i + 1, 0), Point(i + 2, 10))
+
+
+def trusted_position(i):
+    return Position.trusted(Point(i + 1, 0), Point(i + 2, 10))
+
+
+if __name__ == "__main__":
+    count = 100_000
+    print(f"dataclass positions: {bytes_per_position(old_position, count):.0f} bytes/position")
+    print(f"compact positions: {bytes_per_position(new_position, count):.0f} bytes/position")
+    report("create dataclass positions", measure(lambda: [old_position(i) for i in range(count)]), count, "position")
+    report("create compact positions", measure(lambda: [new_position(i) for i in range(count)]), count, "position")
+    report("create trusted positions", measure(lambda: [trusted_position(i) for i in range(count)]), count, "position")
+    lines = [random.randint(1, 1000) for _ in range(count)]
+    old = [(old_position(line), old_position(line // 2)) for line in lines]
+    new = [(new_position(line), new_position(line // 2)) for line in lines]
+    report("contains, dataclass positions", measure(lambda: [a in b for a, b in old]), count, "test")
+    report("contains, compact positions", measure(lambda: [a in b for a, b in new]), count, "test")
+    report("sort dataclass positions", measure(lambda: sorted(p for p, _ in old)), count, "position")
+    report("sort compact positions", measure(lambda: sorted(p for p, _ in new)), count, "position")
@@ -0,0 +1,46 @@
+"""Compares finding the innermost node at a point, and the nodes within a position, by descending the tree from the
+root, with looking them up in the interval tree of an ASTIndex."""
+import random
+
+from pylasu.model import ASTIndex, Point, pos, walk
+
+from benchmarks.support import measure, report, wide_tree
+
+
+def positioned_tree(lines: int):
+    """A block with a binary expression such as "1 + 2" on each line."""
+    tree = wide_tree(lines)
+    for line, statement in enumerate(tree.statements, start=1):
+        statement.left.with_position(pos(line, 0, line, 1))
+        statement.right.with_position(pos(line, 4, line, 5))
+        statement.with_position(pos(line, 0, line, 5))
+    return tree.with_position(pos(1, 0, lines, 5))
+
+
+def node_at_descending(tree, point):
+    position = pos(point.line, point.column, point.line, point.column)
+    node = tree
+    while True:
+        for child in node.children:
+            if child.position is not None and position in child.position:
+                node = child
+                break
+        else:
+            return node
+
+
+if __name__ == "__main__":
+    tree = positioned_tree(66_667)
+    count = sum(1 for _ in walk(tree))
+    print(f"tree of {count} nodes")
+    points = [Point(random.randint(1, 66_667), random.randint(0, 5)) for _ in range(1_000)]
+    ranges = [pos(line, 0, line + 10, 5) for line in (random.randint(1, 66_000) for _ in range(100))]
+    index = ASTIndex(tree)
+    report("build the index and the interval tree",
+           measure(lambda: index.rebuild().node_at(points[0]), repeat=1), count)
+    report("node at point, descending from the root",
+           measure(lambda: [node_at_descending(tree, p) for p in points[:10]], repeat=1), 10, "query")
+    report("node at point, index", measure(lambda: [index.node_at(p) for p in points]), len(points), "query")
+    report("walk_within", measure(lambda: [list(tree.walk_within(r)) for r in ranges[:10]], repeat=1), 10, "query")
+    report("walk_within, index",
+           measure(lambda: [list(tree.walk_within(r, index=index)) for r in ranges]), len(ranges), "query")
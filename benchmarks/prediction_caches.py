@@ -0,0 +1,52 @@
+"""Parses a stream of distinct scripts, with random expressions, with different PredictionCachePolicies, reporting the
+time taken and the size of the prediction caches at the end. On grammars that need a lot of lookahead, the caches keep
+growing with the variety of the inputs, unless a policy resets them, at the cost of warming them up again; this shows
+what checking the policy, counting predictions and resetting cost on the warm path."""
+import random
+import time
+
+from benchmarks.incremental import ScriptParser
+from pylasu.parsing.prediction import PredictionCachePolicy
+
+SCRIPTS = 300
+
+
+def expression(depth: int) -> str:
+    choice = random.randrange(7 if depth else 3)
+    if choice == 0:
+        return f"item{random.randrange(100)}"
+    elif choice == 1:
+        return str(random.randrange(1000))
+    elif choice == 2:
+        return f"'s{random.randrange(100)}'"
+    elif choice == 3:
+        return f"{expression(depth - 1)} {random.choice('+-*/')} {expression(depth - 1)}"
+    elif choice == 4:
+        return f"({expression(depth - 1)})"
+    elif choice == 5:
+        return f"concat {expression(depth - 1)} and {expression(depth - 1)}"
+    else:
+        return f"-{expression(depth - 1)}"
+
+
+def script() -> str:
+    return "".join(f"set value of {expression(3)} to {expression(4)}\nprint {expression(4)}\n" for _ in range(20))
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    scripts = [script() for _ in range(SCRIPTS)]
+    for label, policy in [("unbounded", PredictionCachePolicy()),
+                          ("unbounded, counting predictions", PredictionCachePolicy(count_predictions=True)),
+                          ("reset after 50 parses", PredictionCachePolicy(reset_after_parses=50)),
+                          ("at most 2,000 DFA states", PredictionCachePolicy(max_dfa_states=2_000)),
+                          ("at most 20,000 contexts", PredictionCachePolicy(max_prediction_contexts=20_000))]:
+        parser = ScriptParser(cache_policy=policy)
+        start = time.perf_counter()
+        for code in scripts:
+            parser.parse(code)
+        elapsed = time.perf_counter() - start
+        statistics = parser.prediction_cache_statistics()
+        hit_ratio = f"{statistics.hit_ratio:.3f}" if statistics.hit_ratio is not None else "-"
+        print(f"{label:<40}{elapsed:>8.2f} s{statistics.total_dfa_states:>10} DFA states"
+              f"{statistics.prediction_contexts:>10} contexts{statistics.resets:>5} resets   hit ratio {hit_ratio}")
@@ -0,0 +1,66 @@
+"""Compares the first stage of parsing in full LL prediction mode (the default) and in two stages, SLL then LL (see
+PylasuANTLRParser.two_stage_prediction), on valid and invalid inputs. Each mode runs once to warm up the DFA cache of
+the parser, then the best of a few runs is reported.
+
+To compare the modes on another grammar, pass a PylasuANTLRParser subclass and some files to parse:
+
+    python -m benchmarks.prediction_modes my_package.my_module:MyParser file1 file2 ...
+"""
+import importlib
+import sys
+import time
+from typing import Callable, Dict, List
+
+from antlr4 import InputStream
+
+from benchmarks.incremental import ScriptParser
+from benchmarks.parse_file import SimpleLangParserWithoutAST
+from pylasu.parsing.antlr import PylasuANTLRParser
+
+REPEAT = 5
+
+
+def compare_prediction_modes(parser_factory: Callable[..., PylasuANTLRParser], texts: Dict[str, List[str]]):
+    """Prints the time to parse each group of texts in each mode. Parser classes take two_stage_prediction as a
+    keyword argument, as PylasuANTLRParser does."""
+    print(f"{parser_factory.__name__}")
+    for label, group in texts.items():
+        times = {}
+        for two_stage_prediction in (False, True):
+            parser = parser_factory(two_stage_prediction=two_stage_prediction)
+            modes = set()
+            best = None
+            for _ in range(REPEAT + 1):
+                start = time.perf_counter()
+                for text in group:
+                    modes.add(parser.parse_first_stage(InputStream(text)).prediction_mode.name)
+                elapsed = time.perf_counter() - start
+                # The first run only warms up the DFA cache
+                best = elapsed if best is None else min(best, elapsed)
+            times[two_stage_prediction] = best
+            mode = "SLL, then LL" if two_stage_prediction else "LL"
+            print(f"  {f'{label}, {mode}':<40}{best * 1000:>10.1f} ms  (succeeded in {', '.join(sorted(modes))})")
+        print(f"  {f'{label}, speedup':<40}{times[False] / times[True]:>10.2f}x")
+
+
+def load_parser_class(name: str):
+    module, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module), class_name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        files = []
+        for path in sys.argv[2:]:
+            with open(path, encoding="utf-8") as file:
+                files.append(file.read())
+        compare_prediction_modes(load_parser_class(sys.argv[1]), {"files": files})
+    else:
+        compare_prediction_modes(SimpleLangParserWithoutAST, {
+            "valid": ["".join(f"set v{j} = {j} display {j} " for j in range(2000))],
+            "invalid": ["".join(f"set v{j} = {j} display {j} " for j in range(2000)) + "set set"],
+        })
+        compare_prediction_modes(ScriptParser, {
+            "valid": ["".join(f"set value of item{i} to {i} * 2 + 1\n" for i in range(2000))],
+            "invalid": ["".join(f"set value of item{i} to {i} * 2 + 1\n" for i in range(2000)) + "set to"],
+        })
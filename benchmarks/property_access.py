@@ -0,0 +1,28 @@
+"""Compares reading all the property values of the nodes of a tree through Node.properties, which allocates a
+PropertyDescription per feature, with the allocation-free feature_values and containment_values accessors."""
+from pylasu.model import walk, feature_values, containment_values
+
+from benchmarks.support import measure, report, wide_tree
+
+
+def read_properties(nodes):
+    for node in nodes:
+        for p in node.properties:
+            p.value
+
+
+def read_feature_values(nodes):
+    for node in nodes:
+        feature_values(node)
+
+
+def read_containment_values(nodes):
+    for node in nodes:
+        containment_values(node)
+
+
+if __name__ == "__main__":
+    nodes = list(walk(wide_tree(10_000)))
+    report("Node.properties", measure(lambda: read_properties(nodes)), len(nodes))
+    report("feature_values", measure(lambda: read_feature_values(nodes)), len(nodes))
+    report("containment_values", measure(lambda: read_containment_values(nodes)), len(nodes))
@@ -0,0 +1,24 @@
+"""Compares issuing many type searches on the same tree by walking it each time with looking the nodes up in the type
+table of an ASTIndex."""
+from pylasu.model import ASTIndex, Node, search_by_type, walk
+
+from benchmarks.support import BinaryExpression, Block, Expression, Literal, measure, report, wide_tree
+
+TYPES = [Literal, BinaryExpression, Expression, Block, Node]
+
+
+def searches(tree, index=None):
+    for target_type in TYPES * 4:
+        for _ in search_by_type(tree, target_type, index=index):
+            pass
+
+
+if __name__ == "__main__":
+    tree = wide_tree(10_000)
+    count = sum(1 for _ in walk(tree))
+    print(f"{len(TYPES) * 4} searches on a tree of {count} nodes")
+    report("search_by_type, walking", measure(lambda: searches(tree)), len(TYPES) * 4, "search")
+    report("search_by_type, index built each time",
+           measure(lambda: searches(tree, ASTIndex(tree))), len(TYPES) * 4, "search")
+    index = ASTIndex(tree)
+    report("search_by_type, existing index", measure(lambda: searches(tree, index)), len(TYPES) * 4, "search")
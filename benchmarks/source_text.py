@@ -0,0 +1,38 @@
+"""Compares computing points from text by scanning it one character at a time, like older versions of Pylasu did, with
+Point.__add__ and with a SourceText line index."""
+import random
+
+from pylasu.model import Point, SourceText
+
+from benchmarks.support import measure, report
+
+
+def add_scanning(point, text):
+    line = point.line
+    column = point.column
+    i = 0
+    while i < len(text):
+        if text[i] == '\n' or text[i] == '\r':
+            line += 1
+            column = 0
+            if text[i] == '\r' and i < len(text) - 1 and text[i + 1] == '\n':
+                i += 1
+        else:
+            column += 1
+        i += 1
+    return Point(line, column)
+
+
+if __name__ == "__main__":
+    text = "".join(f"    set variable{i} = {i} * {i} + 1\r\n" for i in range(20_000))
+    tokens = text.split(" ")
+    start = Point(1, 0)
+    report("end points of tokens, scanning", measure(lambda: [add_scanning(start, t) for t in tokens]),
+           len(tokens), "token")
+    report("end points of tokens, Point.__add__", measure(lambda: [start + t for t in tokens]), len(tokens), "token")
+    offsets = [random.randrange(len(text)) for _ in range(100)]
+    report("offset to point, scanning", measure(lambda: [add_scanning(Point(1, 0), text[:o]) for o in offsets],
+                                                repeat=1), len(offsets), "query")
+    report("build the line index", measure(lambda: SourceText(text)), len(text), "char")
+    index = SourceText(text)
+    report("offset to point, line index", measure(lambda: [index.point_at(o) for o in offsets]), len(offsets), "query")
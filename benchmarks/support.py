@@ -0,0 +1,66 @@
+"""Shared fixtures and helpers for the benchmarks.
+
+Benchmarks are plain scripts, not part of the test suite. Run them from the root of the repository, e.g.:
+
+    python -m benchmarks.feature_table
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+from pylasu.model import Node
+
+
+@dataclass
+class Expression(Node):
+    pass
+
+
+@dataclass
+class Literal(Expression):
+    value: str = None
+
+
+@dataclass
+class BinaryExpression(Expression):
+    operator: str = "+"
+    left: Expression = None
+    right: Expression = None
+
+
+@dataclass
+class Block(Node):
+    name: str = None
+    statements: List[Node] = field(default_factory=list)
+
+
+def deep_tree(depth: int) -> Expression:
+    """A right-leaning chain of binary expressions such as 1 + (2 + (3 + ...)), i.e. a tree that is as deep as it is
+    large."""
+    tree = Literal(str(depth))
+    for i in range(depth - 1, 0, -1):
+        tree = BinaryExpression(left=Literal(str(i)), right=tree)
+    return tree
+
+
+def wide_tree(width: int) -> Block:
+    """A block containing width binary expressions between two literals, i.e. a shallow tree."""
+    return Block("block", [BinaryExpression(left=Literal(str(i)), right=Literal(str(i + 1))) for i in range(width)])
+
+
+def measure(function: Callable[[], object], repeat: int = 5) -> float:
+    """Returns the best wall time, in seconds, of repeat invocations of function."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(label: str, seconds: float, count: int = None, unit: str = "node"):
+    line = f"{label:<50} {seconds * 1000:10.2f} ms"
+    if count:
+        line += f" {seconds * 1_000_000_000 / count:10.0f} ns/{unit}"
+    print(line)
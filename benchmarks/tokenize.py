@@ -0,0 +1,44 @@
+"""Compares tokenizing a 20,000 lines script with PylasuANTLRParser.tokenize, which records the tokens in TokenColumns,
+and with the lexer of the parser filling a CommonTokenStream, reporting the time taken and the memory that the tokens
+take. Both use the same lexer DFA, warmed up by a first run."""
+import gc
+import time
+import tracemalloc
+
+from antlr4 import CommonTokenStream, InputStream
+
+from benchmarks.incremental import LINES, ScriptParser
+
+
+def fill(parser: ScriptParser, code: str):
+    token_stream = CommonTokenStream(parser.create_lexer(InputStream(code), []))
+    token_stream.fill()
+    return token_stream.tokens
+
+
+def tokenize(parser: ScriptParser, code: str):
+    return parser.tokenize(code).tokens
+
+
+def measure(function, parser: ScriptParser, code: str):
+    function(parser, code)
+    gc.collect()
+    start = time.perf_counter()
+    tokens = function(parser, code)
+    elapsed = time.perf_counter() - start
+    del tokens
+    gc.collect()
+    tracemalloc.start()
+    tokens = function(parser, code)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, memory, len(tokens)
+
+
+if __name__ == "__main__":
+    code = "".join(f"set value of item{i} to {i} * 2 + 1\n" for i in range(LINES))
+    parser = ScriptParser()
+    for label, function in [("CommonTokenStream.fill", fill), ("tokenize", tokenize)]:
+        elapsed, memory, count = measure(function, parser, code)
+        print(f"{label:<30}{elapsed * 1000:>10.1f} ms{memory / 1024 / 1024:>10.1f} MiB"
+              f"{memory / count:>10.1f} bytes per token ({count} tokens)")
@@ -0,0 +1,45 @@
+"""Measures the throughput of an ASTTransformer, resolving the concept of each produced node with concept_of as older
+versions of Pylasu did (calling dir on the node) and with the current cached resolution."""
+from pylasu.model import walk
+from pylasu.model.model import Concept
+from pylasu.transformation import transformation
+from pylasu.transformation.transformation import ASTTransformer
+
+from benchmarks.support import BinaryExpression, Block, Literal, measure, report, wide_tree
+
+
+def concept_of_with_dir(node):
+    properties = dir(node)
+    if "__concept__" in properties:
+        node_type = node.__concept__
+    elif "node_type" in properties:
+        node_type = node.node_type
+    else:
+        node_type = type(node)
+    if isinstance(node_type, Concept):
+        return node_type
+    else:
+        raise Exception(f"Not a concept: {node_type} of {node}")
+
+
+def make_transformer():
+    transformer = ASTTransformer(allow_generic_node=False)
+    transformer.register_node_factory(
+        Block, lambda source: Block(source.name, [transformer.transform(s) for s in source.statements]))
+    transformer.register_node_factory(
+        BinaryExpression,
+        lambda source: BinaryExpression(
+            source.operator, transformer.transform(source.left), transformer.transform(source.right)))
+    transformer.register_node_factory(Literal, lambda source: Literal(source.value))
+    return transformer
+
+
+if __name__ == "__main__":
+    tree = wide_tree(5_000)
+    count = sum(1 for _ in walk(tree))
+    transformer = make_transformer()
+    concept_of = transformation.concept_of
+    transformation.concept_of = concept_of_with_dir
+    report("transform, concept_of calling dir", measure(lambda: transformer.transform(tree), repeat=3), count)
+    transformation.concept_of = concept_of
+    report("transform, cached concept_of", measure(lambda: transformer.transform(tree), repeat=3), count)
@@ -0,0 +1,36 @@
+"""Compares the recursive walks of older versions of Pylasu with the iterative ones based on an explicit stack.
+
+Recursive generators pay for each node a cost proportional to its depth, because every value is passed up through the
+whole chain of nested generators; they also fail on trees deeper than the recursion limit."""
+import sys
+
+from pylasu.model import child_nodes, walk, walk_leaves_first
+
+from benchmarks.support import deep_tree, measure, report, wide_tree
+
+
+def walk_recursive(node):
+    yield node
+    for child in child_nodes(node):
+        yield from walk_recursive(child)
+
+
+def walk_leaves_first_recursive(node):
+    for child in child_nodes(node):
+        yield from walk_leaves_first_recursive(child)
+    yield node
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(20_000)
+    for name, tree in [("deep", deep_tree(2_000)), ("wide", wide_tree(10_000))]:
+        count = sum(1 for _ in walk(tree))
+        print(f"{name} tree, {count} nodes")
+        report("walk, recursive", measure(lambda: sum(1 for _ in walk_recursive(tree))), count)
+        report("walk, explicit stack", measure(lambda: sum(1 for _ in walk(tree))), count)
+        report("walk_leaves_first, recursive",
+               measure(lambda: sum(1 for _ in walk_leaves_first_recursive(tree))), count)
+        report("walk_leaves_first, explicit stack", measure(lambda: sum(1 for _ in walk_leaves_first(tree))), count)
+    tree = deep_tree(200_000)
+    count = sum(1 for _ in walk(tree))
+    report("walk, explicit stack, depth 200000", measure(lambda: sum(1 for _ in walk(tree)), repeat=1), count)
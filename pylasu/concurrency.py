@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import weakref
+from asyncio import CancelledError
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_current = threading.local()
+
+
+def current_cancellation() -> Optional[threading.Event]:
+    """The event that's set when the asynchronous operation running in the current thread is cancelled, if any."""
+    return getattr(_current, "cancellation", None)
+
+
+def check_cancelled():
+    """Raises CancelledError if the asynchronous operation running in the current thread was cancelled. Long-running
+    synchronous code, such as parsing or transforming a tree, calls it from time to time, so that it stops early."""
+    cancellation = getattr(_current, "cancellation", None)
+    if cancellation is not None and cancellation.is_set():
+        raise CancelledError()
+
+
+class AsyncRunner:
+    """Runs blocking functions, such as parsing and transforming, on behalf of asyncio code, without blocking the event
+    loop. See PylasuANTLRParser.parse_async and ASTTransformer.transform_async.
+
+    :param executor: where the functions run; by default, the default executor of the event loop, that uses threads.
+    With a ProcessPoolExecutor, the functions, their arguments and their results must be picklable.
+    :param limit: if given, at most this many functions run at once; the others wait for their turn in the event loop,
+    without taking a place in the executor.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, limit: Optional[int] = None):
+        self.executor = executor
+        self.limit = limit
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._latest: Dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def uses_processes(self) -> bool:
+        return isinstance(self.executor, ProcessPoolExecutor)
+
+    async def run(self, function: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> Any:
+        """Runs function(*args, **kwargs) in the executor, and returns its result.
+
+        If a key is given (e.g., the URI of a document), a later call with the same key supersedes this one, which is
+        cancelled: awaiting it raises CancelledError. If the function is already running in a thread, it stops at the
+        next check_cancelled, otherwise its result is discarded."""
+        job = asyncio.ensure_future(self._run(function, args, kwargs))
+        if key is not None:
+            superseded = self._latest.get(key)
+            if superseded is not None:
+                superseded.cancel()
+            self._latest[key] = job
+        try:
+            return await job
+        finally:
+            if key is not None and self._latest.get(key) is job:
+                del self._latest[key]
+
+    async def _run(self, function: Callable, args, kwargs):
+        if self.limit is None:
+            return await self._run_in_executor(function, args, kwargs)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        await semaphore.acquire()
+        return await self._run_in_executor(function, args, kwargs, semaphore.release)
+
+    async def _run_in_executor(self, function: Callable, args, kwargs, release: Optional[Callable] = None):
+        """Runs the function in the executor. If release is given, it's called once the function has finished, or
+        once it's certain that it won't run, rather than when the caller is cancelled: a function already running in a
+        thread only stops at its next check_cancelled, and one running in a process can't be stopped."""
+        loop = asyncio.get_running_loop()
+        try:
+            if self.uses_processes:
+                submitted = self.executor.submit(function, *args, **kwargs)
+                future = asyncio.wrap_future(submitted)
+                stop = submitted.cancel
+            else:
+                cancellation = threading.Event()
+                future = loop.run_in_executor(
+                    self.executor, partial(_run_cancellable, cancellation, function, *args, **kwargs))
+                stop = cancellation.set
+        except BaseException:
+            if release is not None:
+                release()
+            raise
+        if release is not None:
+            future.add_done_callback(lambda _: release())
+        try:
+            # Shielded, so that cancelling the caller doesn't mark the function as done while it's still running
+            return await asyncio.shield(future)
+        except CancelledError:
+            stop()
+            raise
+
+
+def _run_cancellable(cancellation: threading.Event, function: Callable, *args, **kwargs):
+    _current.cancellation = cancellation
+    try:
+        check_cancelled()
+        return function(*args, **kwargs)
+    finally:
+        _current.cancellation = None
+
+
+default_runner = AsyncRunner()
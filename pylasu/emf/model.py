@@ -3,7 +3,7 @@ from enum import Enum
 from pyecore.ecore import EPackage
 from pyecore.resources import Resource
 
-from pylasu.model import Node
+from pylasu.model import Node, feature_values
 from pylasu.support import extension_method
 
 
@@ -40,13 +40,12 @@ def to_eobject(self: Node, resource: Resource, mappings=None):
         raise Exception("Unknown classifier for " + str(type(self)))
     eobject = eclass()
     mappings[id(self)] = eobject
-    for p in self.properties:
-        v = p.value
+    for f, v in zip(type(self).node_features, feature_values(self)):
         ev = translate_value(v, resource, mappings)
         if isinstance(v, list):
-            eobject.eGet(p.name).extend(ev)
+            eobject.eGet(f.name).extend(ev)
         else:
-            eobject.eSet(p.name, ev)
+            eobject.eSet(f.name, ev)
     return eobject
 
 
@@ -4,7 +4,7 @@ from antlr4 import ParserRuleContext
 from antlr4.tree.Tree import ParseTree
 
 from pylasu.model import Node, Origin
-from pylasu.parsing.parse_tree import ParseTreeOrigin, with_parse_tree
+from pylasu.parsing.parse_tree import ParseTreeOrigin, parse_tree_origins_enabled, with_parse_tree
 from pylasu.transformation.transformation import ASTTransformer
 
 
@@ -29,7 +29,8 @@ However, a node factory can override the parseTreeNode of the nodes it creates (
             return source
 
     def as_origin(self, source: Any) -> Optional[Origin]:
-        if isinstance(source, ParseTree):
+        """A ParseTreeOrigin for a parse tree, unless parse tree origins are disabled (see parse_tree_origins)."""
+        if isinstance(source, ParseTree) and parse_tree_origins_enabled():
             return ParseTreeOrigin(source)
         else:
             return None
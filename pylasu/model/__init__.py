@@ -1,5 +1,7 @@
-from .model import Destination, Node, Origin, internal_field, internal_properties
+from .model import Destination, Node, Origin, child_nodes, compact_dataclass, containment_values, feature_values, \
+    internal_field, internal_properties
 from .naming import Named, PossiblyNamed, ReferenceByName
-from .position import Point, Position, pos, Source
-from .traversing import walk, walk_ancestors, walk_descendants, walk_leaves_first
+from .position import Point, Position, pos, Source, SourceText
+from .traversing import TraversalEvent, walk, walk_ancestors, walk_descendants, walk_events, walk_leaves_first
 from .processing import children, search_by_type
+from .indexing import ASTIndex
@@ -0,0 +1,333 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from typing import Dict, Iterator, List, Optional
+
+from .model import Node, child_nodes
+from .position import Point, Position
+from .processing import modification_count
+
+
+class ASTIndex:
+    """A flattened, read-only view of an AST, to answer structural queries without walking the tree.
+
+    The nodes are numbered in pre-order (the order of walk). For each node, the index stores the number of the node
+    following its subtree, the number of its parent and its depth. Then, a node is a descendant of another if and only
+    if its number falls between the number of the other node and the end of its subtree, and the descendants of a node
+    are a contiguous slice of the nodes.
+
+    The index is built lazily on the first query. Pylasu does not see changes made to the AST by assigning fields
+    directly, so, after modifying the AST, call invalidate to have the index rebuilt on the next query. Changes made
+    with transform_children or replace_with are tracked, and make the index stale; refresh rebuilds it only in that
+    case.
+
+    Parents are those found walking the tree from the root, regardless of whether assign_parents has been called.
+
+    Queries by type use a table of the nodes of each type, built on the first such query. The nodes of a type that is
+    not the concrete type of any node (an abstract concept, or a trait such as Statement or Expression) are computed
+    merging those of its subtypes, the first time that type is queried.
+
+    Queries by position use a static interval tree, built on the first such query: the positioned nodes sorted by start
+    point, and a segment tree holding the maximum end point of each range of them. The source of the positions is not
+    taken into account.
+    """
+
+    def __init__(self, root: Node):
+        self.root = root
+        self._nodes: Optional[List[Node]] = None
+        self._numbers: Dict[int, int] = {}
+        self._ends = array("i")
+        self._parents = array("i")
+        self._depths = array("i")
+        self._modification_count = -1
+        self._reset_tables()
+
+    def _reset_tables(self):
+        """Discards the tables that are only built when some query needs them."""
+        self._jumps: List[array] = []
+        self._by_concrete_type: Optional[Dict[type, array]] = None
+        self._by_type: Dict[object, array] = {}
+        self._positioned: Optional[array] = None
+        self._starts = array("q")
+        self._position_ends = array("q")
+        self._max_ends = array("q")
+
+    def invalidate(self):
+        """Discards the index, that will be rebuilt on the next query."""
+        self._nodes = None
+        self._numbers = {}
+        self._reset_tables()
+
+    @property
+    def stale(self) -> bool:
+        """Whether the index has been invalidated, or some AST has been modified by transform_children or replace_with
+        after the index was built."""
+        return self._nodes is None or self._modification_count != modification_count()
+
+    def refresh(self) -> "ASTIndex":
+        """Rebuilds the index if it's stale."""
+        if self.stale:
+            self.rebuild()
+        return self
+
+    def rebuild(self) -> "ASTIndex":
+        """Builds the index again, in a single walk of the tree."""
+        nodes = []
+        parents = array("i")
+        depths = array("i")
+        stack = [(self.root, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            number = len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+            depths.append(depth)
+            children = child_nodes(node)
+            if children:
+                depth += 1
+                stack.extend((child, number, depth) for child in reversed(children))
+        ends = array("i", range(1, len(nodes) + 1))
+        # In reverse pre-order, a subtree is complete before we get to its root
+        for number in range(len(nodes) - 1, 0, -1):
+            parent = parents[number]
+            if ends[number] > ends[parent]:
+                ends[parent] = ends[number]
+        self._nodes = nodes
+        self._numbers = {id(node): number for number, node in enumerate(nodes)}
+        self._ends = ends
+        self._parents = parents
+        self._depths = depths
+        self._reset_tables()
+        self._modification_count = modification_count()
+        return self
+
+    @property
+    def nodes(self) -> List[Node]:
+        """All the nodes of the tree, in pre-order."""
+        if self._nodes is None:
+            self.rebuild()
+        return self._nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        if self._nodes is None:
+            self.rebuild()
+        return id(node) in self._numbers
+
+    def number(self, node: Node) -> int:
+        """The position of the node in pre-order, starting from 0 for the root.
+
+        :raises ValueError: if the node is not part of the indexed tree."""
+        if self._nodes is None:
+            self.rebuild()
+        try:
+            return self._numbers[id(node)]
+        except KeyError:
+            raise ValueError(f"{node} is not part of the indexed tree") from None
+
+    def depth(self, node: Node) -> int:
+        """The number of ancestors of the node, 0 for the root."""
+        number = self.number(node)
+        return self._depths[number]
+
+    def parent(self, node: Node) -> Optional[Node]:
+        """The parent of the node, or None for the root."""
+        number = self.number(node)
+        parent = self._parents[number]
+        return self._nodes[parent] if parent >= 0 else None
+
+    def ancestors(self, node: Node) -> Iterator[Node]:
+        """The ancestors of the node, from its parent up to the root."""
+        number = self.number(node)
+        parents = self._parents
+        number = parents[number]
+        while number >= 0:
+            yield self._nodes[number]
+            number = parents[number]
+
+    def is_ancestor(self, ancestor: Node, node: Node) -> bool:
+        """Whether [ancestor] is a proper ancestor of [node], i.e., [node] is in its subtree and is not [ancestor]."""
+        number = self.number(ancestor)
+        return number < self.number(node) < self._ends[number]
+
+    def contains(self, ancestor: Node, node: Node) -> bool:
+        """Whether [node] is [ancestor] or one of its descendants."""
+        number = self.number(ancestor)
+        return number <= self.number(node) < self._ends[number]
+
+    def subtree(self, node: Node) -> List[Node]:
+        """The node and all of its descendants, in pre-order."""
+        number = self.number(node)
+        return self._nodes[number:self._ends[number]]
+
+    def descendants(self, node: Node) -> List[Node]:
+        """The descendants of the node, in pre-order."""
+        number = self.number(node)
+        return self._nodes[number + 1:self._ends[number]]
+
+    def subtree_size(self, node: Node) -> int:
+        """The number of nodes in the subtree of the node, including the node itself."""
+        number = self.number(node)
+        return self._ends[number] - number
+
+    def lowest_common_ancestor(self, first: Node, second: Node) -> Node:
+        """The deepest node that contains both nodes (which may be one of the two nodes).
+
+        Computed in O(log n) using ancestor jump tables, that are built on the first call."""
+        a = self.number(first)
+        b = self.number(second)
+        ends = self._ends
+        if a <= b < ends[a]:
+            return first
+        if b <= a < ends[b]:
+            return second
+        # Climb from a as far as possible without reaching an ancestor of b; the parent of that node is the answer
+        for jumps in reversed(self._ancestor_jumps()):
+            ancestor = jumps[a]
+            if ancestor >= 0 and not ancestor <= b < ends[ancestor]:
+                a = ancestor
+        return self._nodes[self._parents[a]]
+
+    def _ancestor_jumps(self) -> List[array]:
+        """The tables of the 2^k-th ancestor of each node, for each k up to the height of the tree."""
+        if not self._jumps:
+            jumps = self._parents
+            self._jumps.append(jumps)
+            height = max(self._depths, default=0)
+            while (1 << len(self._jumps)) <= height:
+                jumps = array("i", (jumps[parent] if parent >= 0 else -1 for parent in jumps))
+                self._jumps.append(jumps)
+        return self._jumps
+
+    def of_type(self, target_type, within: Optional[Node] = None, include_within: bool = True) -> List[Node]:
+        """The nodes that are instances of the target type, in pre-order, like search_by_type would find them.
+
+        :param target_type: the type of the nodes to find; anything that isinstance accepts, including a tuple.
+        :param within: optional node; only nodes in its subtree are included. By default, the whole tree is searched.
+        :param include_within: whether the within node itself may be included, if it's an instance of the target type.
+        """
+        if within is None:
+            if self._nodes is None:
+                self.rebuild()
+            start, end = 0, len(self._nodes)
+        else:
+            start = self.number(within)
+            end = self._ends[start]
+            if not include_within:
+                start += 1
+        numbers = self._numbers_of_type(target_type)
+        low = bisect_left(numbers, start)
+        high = bisect_left(numbers, end, low)
+        nodes = self._nodes
+        return [nodes[number] for number in numbers[low:high]]
+
+    def _numbers_of_type(self, target_type) -> array:
+        numbers = self._by_type.get(target_type)
+        if numbers is None:
+            if self._by_concrete_type is None:
+                by_concrete_type = {}
+                for number, node in enumerate(self._nodes):
+                    node_type = type(node)
+                    numbers_of_type = by_concrete_type.get(node_type)
+                    if numbers_of_type is None:
+                        by_concrete_type[node_type] = numbers_of_type = array("i")
+                    numbers_of_type.append(number)
+                self._by_concrete_type = by_concrete_type
+            matching = [numbers for node_type, numbers in self._by_concrete_type.items()
+                        if issubclass(node_type, target_type)]
+            if len(matching) == 1:
+                numbers = matching[0]
+            else:
+                numbers = array("i", merge(*matching))
+            self._by_type[target_type] = numbers
+        return numbers
+
+    def node_at(self, point: Point) -> Optional[Node]:
+        """The innermost node whose position includes the point, if any.
+
+        Among the nodes including the point, that is the one starting last; if more of them start at the same point,
+        the one ending first; if more of them have the same position, the deepest one."""
+        key = point_key(point)
+        limit = bisect_right(self._position_table(), key)
+        if limit and self._position_ends[limit - 1] >= key:
+            return self._nodes[self._positioned[limit - 1]]
+        for i in self._ending_at_or_after(key, limit):
+            return self._nodes[self._positioned[i]]
+        return None
+
+    def nodes_overlapping(self, position: Position) -> List[Node]:
+        """The nodes whose position has at least a point in common with the given position, in pre-order."""
+        self._position_table()
+        numbers = sorted(self._positioned[i] for i in self._ending_at_or_after(
+            point_key(position.start), bisect_right(self._starts, point_key(position.end))))
+        nodes = self._nodes
+        return [nodes[number] for number in numbers]
+
+    def nodes_within(self, position: Position, within: Optional[Node] = None) -> List[Node]:
+        """The nodes whose position is inside the given position, in pre-order.
+
+        :param position: the position that includes the nodes.
+        :param within: optional node; only nodes in its subtree are included. By default, the whole tree is searched.
+        """
+        starts = self._position_table()
+        start = point_key(position.start)
+        end = point_key(position.end)
+        ends = self._position_ends
+        positioned = self._positioned
+        numbers = [positioned[i] for i in range(bisect_left(starts, start), bisect_right(starts, end))
+                   if ends[i] <= end]
+        if within is not None:
+            first = self.number(within)
+            last = self._ends[first]
+            numbers = [number for number in numbers if first <= number < last]
+        numbers.sort()
+        nodes = self._nodes
+        return [nodes[number] for number in numbers]
+
+    def _position_table(self) -> array:
+        """Builds the interval tree of the positions of the nodes, if needed, and returns their sorted start points."""
+        if self._positioned is None:
+            if self._nodes is None:
+                self.rebuild()
+            entries = []
+            for number, node in enumerate(self._nodes):
+                position = node.position
+                if position is not None:
+                    entries.append((point_key(position.start), -point_key(position.end), number))
+            # Sorted by start, then by decreasing end, then in pre-order, so that the innermost node including a point
+            # is the last one starting at or before it, and ending at or after it
+            entries.sort()
+            self._starts = array("q", (start for start, _, _ in entries))
+            self._position_ends = array("q", (-end for _, end, _ in entries))
+            size = 1
+            while size < len(entries):
+                size <<= 1
+            max_ends = array("q", [-1]) * (2 * size)
+            max_ends[size:size + len(entries)] = self._position_ends
+            for i in range(size - 1, 0, -1):
+                max_ends[i] = max(max_ends[2 * i], max_ends[2 * i + 1])
+            self._max_ends = max_ends
+            self._positioned = array("i", (number for _, _, number in entries))
+        return self._starts
+
+    def _ending_at_or_after(self, key: int, limit: int) -> Iterator[int]:
+        """The indexes, in decreasing order, of the sorted positions before limit that end at or after the key."""
+        max_ends = self._max_ends
+        stack = [(1, 0, len(max_ends) >> 1)]
+        while stack:
+            i, low, width = stack.pop()
+            if low >= limit or max_ends[i] < key:
+                continue
+            if width == 1:
+                yield low
+            else:
+                width >>= 1
+                stack.append((2 * i, low, width))
+                stack.append((2 * i + 1, low + width, width))
+
+
+def point_key(point: Point) -> int:
+    """Encodes the point as an integer, preserving order, for compact storage and fast comparisons."""
+    return point.line << 32 | point.column
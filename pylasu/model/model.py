@@ -2,17 +2,27 @@ import dataclasses
 import inspect
 import sys
 import typing
+import weakref
 from abc import ABC, abstractmethod, ABCMeta
+from collections.abc import Iterable
 from dataclasses import Field, MISSING, dataclass, field
-from typing import Optional, Callable, List, Union
+from enum import Enum
+from typing import Optional, Callable, List, Sequence, Tuple, Union
 
 from .naming import ReferenceByName
 from .position import Position, Source
-from .reflection import Multiplicity, PropertyDescription
+from .reflection import Feature, FeatureTable, Multiplicity, PropertyDescription
 from ..reflection import get_type_annotations, get_type_arguments, is_sequence_type
 from ..reflection.reflection import get_type_origin
 
 PYLASU_FEATURE = "pylasu_feature"
+FEATURE_TABLE = "__pylasu_features__"
+SCALAR_TYPES = (str, bytes, int, float, complex, bool, Enum, type(None))
+# The concept of the instances of each class, or None when it depends on the instance (e.g., node_type is overridden).
+# Classes are weakly referenced, so that classes created at runtime can be collected; a class that is its own concept,
+# the most common case, is recorded as _OWN_CLASS, because a reference to it in the value would keep the entry alive.
+_concepts_by_class = weakref.WeakKeyDictionary()
+_OWN_CLASS = object()
 
 
 class internal_property(property):
@@ -45,6 +55,41 @@ def internal_field(
         return InternalField(default, default_factory, init, repr, hash, compare, metadata)
 
 
+def compact_dataclass(cls=None, **kwargs):
+    """Like dataclasses.dataclass, but the generated node class stores its fields in slots rather than in a
+    per-instance __dict__, which saves a lot of memory on large ASTs. On Python 3.10+ this is the same as
+    @dataclass(slots=True); on earlier versions the slots are added in the same way.
+
+    Instances only lose their __dict__ if all their superclasses, including mixins such as Named, are slotted as well.
+    As with @dataclass(slots=True), the class is recreated, so methods using the zero-argument form of super() don't
+    work."""
+    def wrap(cls):
+        if sys.version_info >= (3, 10):
+            return dataclass(cls, slots=True, **kwargs)
+        else:
+            return add_slots(dataclass(cls, **kwargs))
+
+    return wrap if cls is None else wrap(cls)
+
+
+def add_slots(cls: type) -> type:
+    """Recreates a dataclass so that its fields are stored in slots (backport of @dataclass(slots=True))."""
+    inherited_slots = set()
+    for base in cls.__mro__[1:]:
+        slots = base.__dict__.get("__slots__", ())
+        inherited_slots.update((slots,) if isinstance(slots, str) else slots)
+    field_names = [f.name for f in dataclasses.fields(cls)]
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = tuple(name for name in field_names if name not in inherited_slots)
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    slotted = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
 def node_property(default=MISSING):
     description = PropertyDescription(
         "", None,
@@ -64,6 +109,8 @@ def node_containment(multiplicity: Multiplicity = Multiplicity.SINGULAR):
 
 
 class Origin(ABC):
+    __slots__ = ()
+
     @internal_property
     @abstractmethod
     def position(self) -> Optional[Position]:
@@ -86,7 +133,7 @@ class CompositeOrigin(Origin):
 
 
 class Destination(ABC):
-    pass
+    __slots__ = ()
 
 
 @dataclass
@@ -210,8 +257,43 @@ class Concept(ABCMeta):
             cls.__internal_properties__ = ["origin", "destination", "parent", "position", "position_override"]
         cls.__internal_properties__.extend([n for n, v in inspect.getmembers(cls, is_internal_property_or_method)])
 
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        cls.invalidate_features()
+
+    def __delattr__(cls, name):
+        super().__delattr__(name)
+        cls.invalidate_features()
+
+    @property
+    def node_feature_table(cls) -> FeatureTable:
+        """The features of this concept, with accessors for their values.
+
+        They're computed by reflection the first time they're requested, and then cached until the concept or one of
+        its super-concepts is modified (e.g., with extension_method or internal_properties)."""
+        return feature_table(cls)
+
+    @property
+    def node_features(cls) -> Tuple[Feature, ...]:
+        """The features of this concept, in declaration order. See node_feature_table."""
+        return cls.node_feature_table.features
+
+    def invalidate_features(cls):
+        """Discards the cached features of this concept and of all its sub-concepts, so that they're recomputed the
+        next time they're requested. Assigning or deleting class attributes already does this automatically."""
+        if FEATURE_TABLE in cls.__dict__:
+            type.__delattr__(cls, FEATURE_TABLE)
+        _concepts_by_class.clear()
+        for subclass in cls.__subclasses__():
+            if isinstance(subclass, Concept):
+                subclass.invalidate_features()
+
     @property
     def node_properties(cls):
+        for feature in cls.node_features:
+            yield feature.describe()
+
+    def _compute_node_properties(cls):
         names = set()
         for cl in cls.__mro__:
             yield from cls._direct_node_properties(cl, names)
@@ -237,11 +319,88 @@ class Concept(ABCMeta):
         return not name.startswith('_') and name not in cls.__internal_properties__
 
 
+def feature_table(concept: Concept) -> FeatureTable:
+    # A concept may inherit the table of its super-concept, hence the check on the owner. Not using concept.__dict__
+    # makes this lookup significantly faster, as it benefits from the type attribute cache.
+    table = getattr(concept, FEATURE_TABLE, None)
+    if table is None or table.concept is not concept:
+        table = FeatureTable(concept, tuple(Feature.of(p) for p in concept._compute_node_properties()))
+        table.children = compile_children_function(table)
+        type.__setattr__(concept, FEATURE_TABLE, table)
+    return table
+
+
+def may_contain_nodes(feature: Feature):
+    """Whether the values of a non-containment feature may nevertheless include nodes, e.g., because its type is
+    unknown, or it's a trait type such as `Statement` that doesn't extend Node."""
+    return not feature.is_reference and not (isinstance(feature.type, type) and issubclass(feature.type, SCALAR_TYPES))
+
+
+def no_children(_):
+    return ()
+
+
+def compile_children_function(table: FeatureTable) -> Callable[["Node"], Sequence["Node"]]:
+    """Generates a function that returns the children of the nodes of a concept, in the order of its features.
+
+    The generated function only reads the containment features, without type checks, plus the features that may
+    nevertheless contain nodes (see may_contain_nodes), which are scanned like in older versions of Pylasu. Concepts
+    that override the children property get a function that delegates to it."""
+    default_children = getattr(Node, "children", None)
+    if getattr(table.concept, "children", default_children) is not default_children:
+        return lambda node: list(node.children)
+    lines = []
+    for f in table.features:
+        if f.is_containment and f.multiple:
+            lines += [f"    for child in node.{f.name} or ():",
+                      "        if child is not None:",
+                      "            append(child)"]
+        elif f.is_containment:
+            lines += [f"    child = node.{f.name}",
+                      "    if child is not None:",
+                      "        append(child)"]
+        elif may_contain_nodes(f):
+            lines += [f"    children.extend(nodes_in((node.{f.name},)))"]
+    if not lines:
+        return no_children
+    source = "\n".join(["def children(node):", "    children = []", "    append = children.append", *lines,
+                        "    return children"])
+    namespace = {"nodes_in": nodes_in}
+    exec(source, namespace)
+    function = namespace["children"]
+    function.__qualname__ = f"{table.concept.__qualname__}.children"
+    return function
+
+
+def nodes_in(iterable):
+    for value in iterable:
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, Iterable) and not isinstance(value, str):
+            yield from nodes_in(value)
+
+
 class Node(Origin, Destination, metaclass=Concept):
-    origin: Optional[Origin] = None
-    destination: Optional[Destination] = None
-    parent: Optional["Node"] = None
-    position_override: Optional[Position] = None
+    """The base class of all AST nodes.
+
+    Node stores its own attributes in slots, so that subclasses can opt into a compact representation without a
+    per-instance __dict__; see compact_dataclass. Ordinary subclasses still have a __dict__ as usual, without those
+    attributes (so vars(node) doesn't include them), and a subclass can't also inherit from another class with
+    non-empty slots."""
+    __slots__ = ("origin", "destination", "parent", "position_override")
+    origin: Optional[Origin]
+    destination: Optional[Destination]
+    parent: Optional["Node"]
+    position_override: Optional[Position]
+
+    def __new__(cls, *args, **kwargs):
+        # Dataclass subclasses don't call Node.__init__, so this is where the slots get their default values
+        node = super().__new__(cls)
+        node.origin = None
+        node.destination = None
+        node.parent = None
+        node.position_override = None
+        return node
 
     def __init__(self, origin: Optional[Origin] = None, parent: Optional["Node"] = None,
                  position_override: Optional[Position] = None):
@@ -280,29 +439,68 @@ class Node(Origin, Destination, metaclass=Concept):
 
     @internal_property
     def properties(self):
-        return (PropertyDescription(p.name, p.type,
-                                    is_containment=p.is_containment, is_reference=p.is_reference,
-                                    multiplicity=p.multiplicity, value=getattr(self, p.name))
-                for p in self.__class__.node_properties)
+        """The features of this node, together with their values. Prefer feature_values and containment_values where
+        performance matters, because this allocates a new PropertyDescription for each feature."""
+        table = feature_table(type(self))
+        return (f.describe(v) for f, v in zip(table.features, table.values(self)))
 
     @internal_property
     def _fields(self):
-        yield from (name for name, _ in self.properties)
+        yield from (f.name for f in type(self).node_features)
 
     @internal_property
     def node_type(self):
         return type(self)
 
 
+def feature_values(node: Node) -> tuple:
+    """The values of the features of a node, in the same order as the node_features of its concept."""
+    return feature_table(type(node)).values(node)
+
+
+def containment_values(node: Node) -> tuple:
+    """The values of the containment features of a node, in the same order as they appear in the node_features of its
+    concept. Each value is a node, None, or a list of nodes, depending on the multiplicity of the feature."""
+    return feature_table(type(node)).containment_values(node)
+
+
+def child_nodes(node: Node) -> Sequence[Node]:
+    """The children of a node, in the order of the features of its concept.
+
+    This is the fastest way to obtain the children of a node, because it uses a function that has been compiled
+    specifically for the node's concept (see compile_children_function)."""
+    return feature_table(type(node)).children(node)
+
+
 def concept_of(node):
-    properties = dir(node)
-    if "__concept__" in properties:
-        node_type = node.__concept__
-    elif "node_type" in properties:
-        node_type = node.node_type
+    instance_attributes = getattr(node, "__dict__", None)
+    if instance_attributes and "__concept__" in instance_attributes:
+        node_type = instance_attributes["__concept__"]
     else:
-        node_type = type(node)
+        node_class = type(node)
+        try:
+            node_type = _concepts_by_class[node_class]
+        except KeyError:
+            node_type = class_concept(node_class)
+            _concepts_by_class[node_class] = _OWN_CLASS if node_type is node_class else node_type
+        if node_type is _OWN_CLASS:
+            node_type = node_class
+        elif node_type is None:
+            node_type = node.__concept__ if hasattr(node, "__concept__") else node.node_type
     if isinstance(node_type, Concept):
         return node_type
     else:
         raise Exception(f"Not a concept: {node_type} of {node}")
+
+
+def class_concept(node_class: type):
+    """The node type of all the instances of a class, according to its __concept__ or node_type attribute, or None if
+    it must be computed for each instance, because the attribute is a property or some other descriptor."""
+    for name in ("__concept__", "node_type"):
+        for cl in node_class.__mro__:
+            if name in cl.__dict__:
+                attribute = cl.__dict__[name]
+                if cl is Node and name == "node_type":
+                    return node_class
+                return None if hasattr(type(attribute), "__get__") else attribute
+    return node_class
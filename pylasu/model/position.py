@@ -1,17 +1,66 @@
-from dataclasses import dataclass, field
+import codecs
+import os
+import re
+import sys
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, fields, is_dataclass
 from pathlib import Path
+from typing import Optional, Sequence, Tuple
 
+LINE_TERMINATOR = re.compile("\r\n?|\n")
+BINARY_LINE_TERMINATOR = re.compile(b"\r\n?|\n")
+NON_ASCII = re.compile(b"[\x80-\xff]")
+# Encodings where byte offsets are character offsets: always, for single byte encodings, or if the text is ASCII only
+SINGLE_BYTE_ENCODINGS = ("ascii", "iso8859-1", "cp1252")
+ASCII_COMPATIBLE_ENCODINGS = ("utf-8", *SINGLE_BYTE_ENCODINGS)
+UTF_32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
 
-@dataclass(order=True)
+
+@dataclass(init=False, eq=False)
 class Point:
+    """A point in a source file, at the given line (starting from 1) and column (starting from 0).
+
+    Points are compact: they store their fields in slots, and they're compared without building tuples."""
+    __slots__ = ("line", "column")
     line: int
     column: int
 
-    def __post_init__(self):
-        if self.line < 1:
-            raise Exception(f"Line {self.line} cannot be less than 1")
-        if self.column < 0:
-            raise Exception(f"Column {self.column} cannot be less than 0")
+    def __init__(self, line: int, column: int):
+        if line < 1:
+            raise Exception(f"Line {line} cannot be less than 1")
+        if column < 0:
+            raise Exception(f"Column {column} cannot be less than 0")
+        self.line = line
+        self.column = column
+
+    __hash__ = None
+
+    def __eq__(self, other):
+        if other.__class__ is self.__class__:
+            return self.line == other.line and self.column == other.column
+        return NotImplemented
+
+    def __lt__(self, other):
+        if other.__class__ is self.__class__:
+            return self.line < other.line or self.line == other.line and self.column < other.column
+        return NotImplemented
+
+    def __le__(self, other):
+        if other.__class__ is self.__class__:
+            return self.line < other.line or self.line == other.line and self.column <= other.column
+        return NotImplemented
+
+    def __gt__(self, other):
+        if other.__class__ is self.__class__:
+            return self.line > other.line or self.line == other.line and self.column > other.column
+        return NotImplemented
+
+    def __ge__(self, other):
+        if other.__class__ is self.__class__:
+            return self.line > other.line or self.line == other.line and self.column >= other.column
+        return NotImplemented
 
     def is_before(self, other: "Point"):
         return self < other
@@ -20,19 +69,12 @@ class Point:
         if isinstance(other, str):
             if len(other) == 0:
                 return self
-            line = self.line
-            column = self.column
-            i = 0
-            while i < len(other):
-                if other[i] == '\n' or other[i] == '\r':
-                    line += 1
-                    column = 0
-                    if other[i] == '\r' and i < len(other) - 1 and other[i + 1] == '\n':
-                        i += 1  # Count the \r\n sequence as 1 line
-                else:
-                    column += 1
-                i += 1
-            return Point(line, column)
+            if "\n" not in other and "\r" not in other:
+                return Point(self.line, self.column + len(other))
+            # Count the \r\n sequence as 1 line
+            line_breaks = other.count("\n") + other.count("\r") - other.count("\r\n")
+            last_line_start = max(other.rfind("\n"), other.rfind("\r")) + 1
+            return Point(self.line + line_breaks, len(other) - last_line_start)
         else:
             raise NotImplementedError()
 
@@ -43,8 +85,142 @@ class Point:
         return f"{self.line}:{self.column}"
 
 
+class SourceText:
+    """The text of a source, with the offsets at which its lines start, to convert between character offsets in the text
+    and Points in O(log n), without scanning the text again.
+    Like Point.__add__, it considers "\r\n", "\r" and "\n" as line terminators.
+
+    A source text keeps a single buffer per source, and serves slices of it by offset. When it's read from a file (see
+    from_file), the buffer is the bytes of the file: if each character takes a single byte, slices are decoded from
+    those bytes directly, and the whole text is only decoded if it's requested."""
+    __slots__ = ("_text", "_buffer", "_encoding", "_line_starts")
+
+    def __init__(self, text: str):
+        self._text = text
+        self._buffer = None
+        self._encoding = None
+        self._line_starts = None
+
+    @classmethod
+    def from_file(cls, path, encoding: str = "utf-8") -> "SourceText":
+        """The text of a file, read as bytes, and decoded only when needed. The file is not memory-mapped: if it were
+        truncated while mapped, reading the text would crash the interpreter."""
+        with open(path, "rb") as file:
+            buffer = file.read()
+        source_text = cls(None)
+        source_text._encoding = codecs.lookup(encoding).name
+        if source_text._encoding in SINGLE_BYTE_ENCODINGS \
+                or (source_text._encoding in ASCII_COMPATIBLE_ENCODINGS and NON_ASCII.search(buffer) is None):
+            source_text._buffer = buffer
+        else:
+            # Character offsets don't match byte offsets, we have to decode the text
+            source_text._text = str(buffer, source_text._encoding)
+        return source_text
+
+    @property
+    def text(self) -> str:
+        """The whole text, decoded on demand."""
+        if self._text is None:
+            self._text = str(self._buffer, self._encoding)
+        return self._text
+
+    @property
+    def line_starts(self) -> array:
+        if self._line_starts is None:
+            if self._text is None:
+                terminators = BINARY_LINE_TERMINATOR.finditer(self._buffer)
+            else:
+                terminators = LINE_TERMINATOR.finditer(self._text)
+            self._line_starts = array("q", [0])
+            self._line_starts.extend(match.end() for match in terminators)
+        return self._line_starts
+
+    def __len__(self):
+        return len(self._text) if self._text is not None else len(self._buffer)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    def code_points(self) -> Sequence[int]:
+        """The code points of the characters of the text, e.g., for a lexer. If the text was read from a file and its
+        bytes are its code points, that's the bytes themselves; otherwise, it's an array of 4 bytes per character."""
+        if self._buffer is not None \
+                and (self._encoding in ("ascii", "iso8859-1") or NON_ASCII.search(self._buffer) is None):
+            return self._buffer
+        return array("I", self.text.encode(UTF_32))
+
+    def utf8(self) -> Sequence[int]:
+        """The text encoded in UTF-8, e.g., to hash it. If the text was read from a file and it's ASCII only, that's the
+        bytes of the file."""
+        if self._buffer is not None and NON_ASCII.search(self._buffer) is None:
+            return self._buffer
+        return self.text.encode("utf-8", "surrogatepass")
+
+    def slice(self, start: int, end: int) -> str:
+        """The text from the start offset (included) to the end offset (excluded), materialized only now."""
+        if self._text is not None:
+            return self._text[start:end]
+        return self._buffer[start:end].decode(self._encoding)
+
+    def replace(self, start: int, end: int, replacement: str) -> "SourceText":
+        """A new source text, where the text from the start offset (included) to the end offset (excluded) is replaced
+        with the given one. If the line index of this text was built, the one of the new text is derived from it,
+        scanning only the lines that changed, rather than the whole text."""
+        text = self.text
+        replaced = SourceText(text[:start] + replacement + text[end:])
+        if self._line_starts is not None:
+            line_starts = self._line_starts
+            # Lines starting before the start, and after the end, are still there, shifted in the latter case
+            kept = max(bisect_left(line_starts, start), 1)
+            following = bisect_right(line_starts, end)
+            delta = len(replacement) - (end - start)
+            scan_end = line_starts[following] + delta if following < len(line_starts) else len(replaced._text)
+            replaced._line_starts = line_starts[:kept]
+            replaced._line_starts.extend(match.end() for match in LINE_TERMINATOR.finditer(
+                replaced._text, line_starts[kept - 1], scan_end) if match.end() < scan_end
+                or following == len(line_starts))
+            replaced._line_starts.extend(map(delta.__add__, line_starts[following:]))
+        return replaced
+
+    def point_at(self, offset: int) -> "Point":
+        """The point right before the character at the given offset, or right after the text if the offset equals its
+        length."""
+        if offset < 0 or offset > len(self):
+            raise ValueError(f"Offset {offset} is out of the text")
+        line_starts = self.line_starts
+        line = bisect_right(line_starts, offset)
+        if offset > 0 and line_starts[line - 1] != offset and self.slice(offset - 1, offset) == "\r":
+            # Between \r and \n: the \r alone already ends the line
+            return Point(line + 1, 0)
+        return Point(line, offset - line_starts[line - 1])
+
+    def offset_of(self, point: "Point") -> int:
+        """The offset of the character right after the given point."""
+        line_starts = self.line_starts
+        if point.line > len(line_starts):
+            raise ValueError(f"{point!r} is out of the text")
+        offset = line_starts[point.line - 1] + point.column
+        if offset > len(self):
+            raise ValueError(f"{point!r} is out of the text")
+        return offset
+
+    def position(self, start: int, end: int, source: "Source" = None) -> "Position":
+        """The position of the text from the start offset (included) to the end offset (excluded)."""
+        if end < start:
+            raise ValueError(f"End offset {end} is before start offset {start}")
+        return Position.trusted(self.point_at(start), self.point_at(end), source)
+
+    def text_at(self, position: "Position") -> str:
+        """The text at the given position."""
+        return self.slice(self.offset_of(position.start), self.offset_of(position.end))
+
+
 class Source:
-    pass
+    @property
+    def line_index(self) -> Optional[SourceText]:
+        """The text of the source, indexed by line, if it's known."""
+        return None
 
 
 @dataclass
@@ -62,6 +238,28 @@ class SourceSetElement(Source):
 @dataclass
 class FileSource(Source):
     file: Path
+    encoding: str = "utf-8"
+    _line_index: Optional[SourceText] = field(default=None, init=False, repr=False, compare=False)
+    # The modification time and size of the file when its text was read
+    _stamp: Optional[Tuple[int, int]] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def line_index(self) -> Optional[SourceText]:
+        """The text of the file, decoded with its encoding, if the file can be read and decoded. It's read again if the
+        file has changed since."""
+        try:
+            stat = os.stat(self.file)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._line_index is None or self._stamp != stamp:
+                self._line_index = SourceText.from_file(self.file, self.encoding)
+                self._stamp = stamp
+        except (OSError, UnicodeDecodeError):
+            return None
+        return self._line_index
+
+    def __getstate__(self):
+        # The text is not sent along; it's read again when it's needed
+        return {**self.__dict__, "_line_index": None, "_stamp": None}
 
     def __str__(self):
         return str(self.file)
@@ -70,6 +268,15 @@ class FileSource(Source):
 @dataclass
 class StringSource(Source):
     code: str = None
+    _line_index: Optional[SourceText] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def line_index(self) -> Optional[SourceText]:
+        if self.code is None:
+            return None
+        if self._line_index is None or self._line_index._text is not self.code:
+            self._line_index = SourceText(self.code)
+        return self._line_index
 
 
 @dataclass
@@ -77,7 +284,7 @@ class URLSource(Source):
     url: str = None
 
 
-@dataclass(order=True)
+@dataclass(init=False, eq=False)
 class Position:
     """An area in a source file, from start to end.
     The start point is the point right before the starting character.
@@ -85,17 +292,66 @@ class Position:
     An empty position will have coinciding points.
 
     Consider a file with one line, containing the text "HELLO".
-    The Position of such text will be Position(Point(1, 0), Point(1, 5))."""
+    The Position of such text will be Position(Point(1, 0), Point(1, 5)).
+
+    Positions are ordered by start, then by end; the source is not taken into account when comparing them."""
+    __slots__ = ("start", "end", "source")
     start: Point
     end: Point
-    source: Source = field(compare=False, default=None)
+    source: Source
+
+    def __init__(self, start: Point, end: Point, source: Source = None):
+        if end < start:
+            raise Exception(f"End point can't be before starting point: {start} – {end}")
+        self.start = start
+        self.end = end
+        self.source = source
 
-    def __post_init__(self):
-        if self.end < self.start:
-            raise Exception(f"End point can't be before starting point: {self.start} – {self.end}")
+    @classmethod
+    def trusted(cls, start: Point, end: Point, source: Source = None) -> "Position":
+        """Creates a position without checking that the end doesn't come before the start, because that's known
+        (e.g., the points come from the lexer)."""
+        position = object.__new__(cls)
+        position.start = start
+        position.end = end
+        position.source = source
+        return position
+
+    __hash__ = None
+
+    def __eq__(self, other):
+        if other.__class__ is self.__class__:
+            return self.start == other.start and self.end == other.end
+        return NotImplemented
+
+    def __lt__(self, other):
+        if other.__class__ is self.__class__:
+            return self.start < other.start or self.start == other.start and self.end < other.end
+        return NotImplemented
+
+    def __le__(self, other):
+        if other.__class__ is self.__class__:
+            return self.start < other.start or self.start == other.start and self.end <= other.end
+        return NotImplemented
+
+    def __gt__(self, other):
+        if other.__class__ is self.__class__:
+            return self.start > other.start or self.start == other.start and self.end > other.end
+        return NotImplemented
+
+    def __ge__(self, other):
+        if other.__class__ is self.__class__:
+            return self.start > other.start or self.start == other.start and self.end >= other.end
+        return NotImplemented
 
     def __contains__(self, pos):
-        return isinstance(pos, Position) and self.start <= pos.start and self.end >= pos.end
+        if not isinstance(pos, Position):
+            return False
+        start, other_start = self.start, pos.start
+        if start.line > other_start.line or start.line == other_start.line and start.column > other_start.column:
+            return False
+        end, other_end = self.end, pos.end
+        return end.line > other_end.line or end.line == other_end.line and end.column >= other_end.column
 
     def __repr__(self):
         return f"Position(start={self.start}, end={self.end}"\
@@ -108,6 +364,22 @@ class Position:
         return str_rep
 
 
+_interned_sources = weakref.WeakValueDictionary()
+
+
+def intern_source(source: Optional[Source]) -> Optional[Source]:
+    """Returns a canonical instance of a source equal to the given one, so that the positions of the nodes parsed from
+    the same source at different times share a single Source instance. Sources that are not dataclasses, or whose
+    fields are not hashable, are returned as they are."""
+    if source is None or not is_dataclass(source):
+        return source
+    key = (type(source), *(getattr(source, f.name) for f in fields(source) if f.compare))
+    try:
+        return _interned_sources.setdefault(key, source)
+    except TypeError:
+        return source
+
+
 def pos(start_line: int, start_col: int, end_line: int, end_col: int, source: Source = None):
     """Utility function to create a Position"""
     return Position(Point(start_line, start_col), Point(end_line, end_col), source)
@@ -1,9 +1,8 @@
-from collections.abc import Iterable
 from typing import Callable, List, Set
 
 from . import walk
-from .model import Node, internal_property
-from ..support import extension_method
+from .model import Node, child_nodes, feature_table, internal_property, nodes_in  # noqa: F401
+from ..support import extension_method, register_internal_property
 
 
 @extension_method(Node)
@@ -15,28 +14,43 @@ def assign_parents(self: Node):
 
     :param self: the root of the AST subtree to start from.
     """
-    for node in children(self):
-        node.parent = self
-        assign_parents(node)
+    stack = [self]
+    while stack:
+        parent = stack.pop()
+        for node in child_nodes(parent):
+            node.parent = parent
+            stack.append(node)
 
 
 def children(self: Node):
-    yield from nodes_in(p.value for p in self.properties)
+    return iter(child_nodes(self))
 
 
 Node.children = internal_property(children)
+register_internal_property(Node, "children")
 
+_modification_count = 0
 
-def nodes_in(iterable):
-    for value in iterable:
-        if isinstance(value, Node):
-            yield value
-        elif isinstance(value, Iterable) and not isinstance(value, str):
-            yield from nodes_in(value)
+
+def modification_count() -> int:
+    """The number of modifications made so far to any AST through transform_children and replace_with. Indexes over
+    an AST compare it with the count at the time they were built, to know whether they may be stale."""
+    return _modification_count
 
 
 @extension_method(Node)
-def search_by_type(self: Node, target_type, walker=walk):
+def search_by_type(self: Node, target_type, walker=walk, index=None):
+    """Finds the nodes that are instances of the target type, in this node and in its subtree.
+
+    :param self: the node from which to start the search.
+    :param target_type: the type of the nodes to find.
+    :param walker: a function that generates a sequence of nodes. By default this is the depth-first "walk" method.
+    :param index: optional ASTIndex of a tree including this node. When the walker is "walk", the nodes are looked up
+    in the index instead of walking the tree.
+    """
+    if index is not None and walker is walk:
+        yield from index.of_type(target_type, self)
+        return
     for node in walker(self):
         if isinstance(node, target_type):
             yield node
@@ -44,9 +58,11 @@ def search_by_type(self: Node, target_type, walker=walk):
 
 @extension_method(Node)
 def transform_children(self: Node, operation: Callable[[Node], Node]):
-    for prop in self.properties:
-        name = prop.name
-        value = prop.value
+    global _modification_count
+    _modification_count += 1
+    table = feature_table(type(self))
+    for feature, value in zip(table.features, table.values(self)):
+        name = feature.name
         if isinstance(value, Node):
             new_value = operation(value)
             if new_value != value:
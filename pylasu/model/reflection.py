@@ -1,6 +1,7 @@
 import enum
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Optional, Callable, Any, Iterable, Sequence, Tuple
 
 
 class Multiplicity(enum.Enum):
@@ -21,3 +22,57 @@ class PropertyDescription:
     @property
     def multiple(self):
         return self.multiplicity == Multiplicity.MANY
+
+
+@dataclass(frozen=True)
+class Feature:
+    """The static description of a feature of a Concept. Unlike PropertyDescription, it doesn't hold the value that the
+    feature has in a particular node; use the getter to read it."""
+    name: str
+    type: Optional[type]
+    is_containment: bool = False
+    is_reference: bool = False
+    multiplicity: Multiplicity = Multiplicity.SINGULAR
+    getter: Callable[[Any], Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "getter", attrgetter(self.name))
+
+    @property
+    def multiple(self):
+        return self.multiplicity == Multiplicity.MANY
+
+    def describe(self, value=None) -> PropertyDescription:
+        return PropertyDescription(self.name, self.type, self.is_containment, self.is_reference, self.multiplicity,
+                                   value)
+
+    @staticmethod
+    def of(description: PropertyDescription) -> "Feature":
+        return Feature(description.name, description.type, description.is_containment, description.is_reference,
+                       description.multiplicity)
+
+
+def tuple_getter(names: Iterable[str]) -> Callable[[Any], tuple]:
+    """Returns a function that reads the given attributes of an object into a tuple."""
+    names = tuple(names)
+    if not names:
+        return lambda _: ()
+    elif len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda obj: (getter(obj),)
+    else:
+        return attrgetter(*names)
+
+
+class FeatureTable:
+    """The features of a concept, together with functions that read their values from a node all at once, without
+    allocating a PropertyDescription for each of them."""
+    __slots__ = ("concept", "features", "containments", "values", "containment_values", "children")
+
+    def __init__(self, concept: type, features: Tuple[Feature, ...], children: Callable[[Any], Sequence] = None):
+        self.concept = concept
+        self.features = features
+        self.containments = tuple(f for f in features if f.is_containment)
+        self.values = tuple_getter(f.name for f in features)
+        self.containment_values = tuple_getter(f.name for f in self.containments)
+        self.children = children
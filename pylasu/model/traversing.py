@@ -1,50 +1,107 @@
-from typing import TypeVar, Type
+import enum
+from typing import Callable, Iterator, Optional, Tuple, TypeVar, Type
 
 from . import Position
-from .model import Node
+from .model import Node, child_nodes
 from ..support import extension_method
 
+# All the traversals in this module use an explicit stack rather than recursion, so that they can handle trees of any
+# depth, and so that each node is produced in constant time, regardless of its depth.
+
+
+class TraversalEvent(enum.Enum):
+    ENTER = 0
+    EXIT = 1
+
 
 @extension_method(Node)
-def walk(self: Node):
-    """Walks the whole AST starting from this node, depth-first."""
-    yield self
-    for child in self.children:
-        yield from walk(child)
+def walk(self: Node, prune: Optional[Callable[[Node], bool]] = None):
+    """Walks the whole AST starting from this node, depth-first.
+
+    :param self: the node from which to start the walk.
+    :param prune: optional predicate; the descendants of the nodes for which it returns true are skipped."""
+    stack = [self]
+    pop = stack.pop
+    push = stack.extend
+    while stack:
+        node = pop()
+        yield node
+        if prune is None or not prune(node):
+            push(reversed(child_nodes(node)))
 
 
 @extension_method(Node)
-def walk_within(self: Node, position: Position):
+def walk_within(self: Node, position: Position, index=None):
     """Walks the AST within the given [position] starting from this node, depth-first.
     :param self: the node from which to start the walk.
-    :param position: the position within which the walk should remain."""
-    if self.position in position:
-        yield self
-        for child in self.children:
-            yield from walk_within(child, position)
-    elif position in self.position:
-        for child in self.children:
-            yield from walk_within(child, position)
+    :param position: the position within which the walk should remain.
+    :param index: optional ASTIndex of a tree including this node, to look up the nodes instead of walking the tree.
+    As long as the position of each node includes those of its descendants, the result is the same."""
+    if index is not None:
+        yield from index.nodes_within(position, self)
+        return
+    stack = [self]
+    while stack:
+        node = stack.pop()
+        node_position = node.position
+        if node_position in position:
+            yield node
+        elif node_position is None or position not in node_position:
+            continue
+        stack.extend(reversed(child_nodes(node)))
+
+
+@extension_method(Node)
+def walk_leaves_first(self: Node, prune: Optional[Callable[[Node], bool]] = None):
+    """Performs a post-order (or leaves-first) node traversal starting with a given node.
+
+    :param self: the node from which to start the walk.
+    :param prune: optional predicate; the descendants of the nodes for which it returns true are skipped."""
+    stack = [(self, iter(() if prune is not None and prune(self) else child_nodes(self)))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            stack.append((child, iter(() if prune is not None and prune(child) else child_nodes(child))))
+            break
+        else:
+            stack.pop()
+            yield node
 
 
 @extension_method(Node)
-def walk_leaves_first(self: Node):
-    """Performs a post-order (or leaves-first) node traversal starting with a given node."""
-    for child in self.children:
-        yield from walk_leaves_first(child)
-    yield self
+def walk_events(self: Node, prune: Optional[Callable[[Node], bool]] = None) -> Iterator[Tuple[TraversalEvent, Node]]:
+    """Walks the whole AST starting from this node, depth-first, producing an ENTER event for each node before its
+    descendants, and an EXIT event after them.
+
+    :param self: the node from which to start the walk.
+    :param prune: optional predicate; the descendants of the nodes for which it returns true are skipped (but the nodes
+    themselves are still entered and exited)."""
+    enter = TraversalEvent.ENTER
+    exit = TraversalEvent.EXIT
+    yield enter, self
+    stack = [(self, iter(() if prune is not None and prune(self) else child_nodes(self)))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield exit, node
+        else:
+            yield enter, child
+            stack.append((child, iter(() if prune is not None and prune(child) else child_nodes(child))))
 
 
 @extension_method(Node)
 def walk_ancestors(self: Node):
     """Iterator over the sequence of nodes from this node's parent all the way up to the root node."""
-    if self.parent is not None:
-        yield self.parent
-        yield from walk_ancestors(self.parent)
+    node = self.parent
+    while node is not None:
+        yield node
+        node = node.parent
 
 
 @extension_method(Node)
-def walk_descendants(self: Node, walker=walk, restrict_to=Node):
+def walk_descendants(self: Node, walker=walk, restrict_to=Node, index=None):
     """Walks the whole AST starting from the child nodes of this node.
 
     :param self: the node from which to start the walk, which is NOT included in the walk.
@@ -52,9 +109,14 @@ def walk_descendants(self: Node, walker=walk, restrict_to=Node):
     For post-order traversal, use "walk_leaves_first".
     :param restrict_to: optional type filter. By default, all nodes (i.e., subclasses of Node) are included, but you can
     limit the walk to only a subtype of Node.
+    :param index: optional ASTIndex of a tree including this node. When the walker is "walk", the nodes are looked up
+    in the index instead of walking the tree.
     """
+    if index is not None and walker is walk:
+        yield from index.of_type(restrict_to, self, include_within=False)
+        return
     for node in walker(self):
-        if node != self and isinstance(node, restrict_to):
+        if node is not self and isinstance(node, restrict_to):
             yield node
 
 
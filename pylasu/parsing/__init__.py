@@ -1 +1 @@
-from .results import FirstStageParsingResult, ParsingResultWithFirstStage
+from .results import FirstStageParsingResult, ParsingResultWithFirstStage, TokenizationResult
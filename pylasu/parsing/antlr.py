@@ -1,14 +1,37 @@
+import hashlib
+import os
+import pickle
+import threading
 import time
+from asyncio import CancelledError
 from abc import abstractmethod
-from typing import Optional, List, Union
+from pathlib import Path
+from typing import Hashable, Iterable, Optional, List, Tuple, Union
 
-from antlr4 import CommonTokenStream, InputStream, Lexer, Parser, ParserATNSimulator, ParserRuleContext, \
-    PredictionContextCache, Recognizer, Token, TokenStream
+from antlr4 import CommonTokenStream, InputStream, Lexer, LexerATNSimulator, Parser, ParserATNSimulator, \
+    ParserRuleContext, PredictionContextCache, Recognizer, Token, TokenStream
+from antlr4.atn.ATN import ATN
+from antlr4.atn.PredictionMode import PredictionMode
 from antlr4.error.ErrorListener import ErrorListener
-from pylasu.model import walk, Source, Position, Node, Point
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.tree.Tree import ParseTreeListener, TerminalNode
+from pylasu.concurrency import AsyncRunner, current_cancellation, default_runner
+from pylasu.model import Source, Position, Node, Point
+from pylasu.model.position import FileSource, SourceText, intern_source
 from pylasu.model.processing import assign_parents
-from pylasu.parsing.parse_tree import token_end_point
-from pylasu.parsing.results import ParsingResultWithFirstStage, FirstStageParsingResult
+from pylasu.parsing.cache import ParseCache
+from pylasu.parsing.incremental import ChangedRegion, PointShift, TextEdit, apply_edits, first_ending_at_or_after, \
+    first_starting_after
+from pylasu.parsing.prediction import CountingParserATNSimulator, PredictionCachePolicy, PredictionCaches, \
+    PredictionCacheStatistics, antlr_runtime_version, dump_dfa, load_dfa, new_dfa
+from pylasu.parsing.parse_tree import ParseTreeOrigin, detach_parse_trees, parse_tree_origins, precompute_positions, \
+    remove_origins, token_end_point
+from pylasu.parsing.results import ParsingResultWithFirstStage, FirstStageParsingResult, TokenizationResult
+from pylasu.parsing.timing import ASSIGN_PARENTS, LEXING, PARSE_TREE_TO_AST, PARSING, POSITIONS, \
+    POST_PROCESS_AST, VERIFICATION, ParsingPhaseListener, ParsingTimings, PhaseTimer
+from pylasu.parsing.tokens import TokenColumns, TokenColumnsFactory, scan
+from pylasu.support import replacing
 from pylasu.validation import Issue, IssueType
 
 
@@ -18,12 +41,110 @@ class PylasuANTLRParser:
     You should extend this class to implement the parts that are specific to your language.
 
     Note: instances of this class are thread-safe and they're meant to be reused. Do not create a new PylasuANTLRParser
-    instance every time you need to parse some source code, or performance may suffer."""
-    def __init__(self):
-        self.prediction_context_cache = PredictionContextCache()
+    instance every time you need to parse some source code, or performance may suffer.
+
+    To skip parsing the texts that were already parsed, e.g., in repeated runs over a mostly unchanged code base, assign
+    a ParseCache to the cache attribute.
+
+    @param two_stage_prediction if true, the parser first tries the faster SLL prediction mode, which gives up at the
+    first syntax error, and only if that fails, parses the input again with the full LL mode, reporting errors as usual.
+    On most grammars, valid inputs are parsed much faster, and invalid ones a bit slower. The parse tree of a valid
+    input is the same in both modes, except for grammars with ambiguities that only full LL can resolve correctly, which
+    are rare in practice. The mode that succeeded is recorded in the prediction_mode of the FirstStageParsingResult.
+    @param cache_policy when to reset the DFA and the PredictionContextCache used by the ANTLR parsers, which are owned
+    by this instance and otherwise grow as long as it lives. See also reset_prediction_caches and
+    prediction_cache_statistics."""
+    def __init__(self, two_stage_prediction: bool = False, cache_policy: Optional[PredictionCachePolicy] = None):
+        self.prediction_caches = PredictionCaches(cache_policy or PredictionCachePolicy(), PredictionContextCache())
+        self.cache: Optional[ParseCache] = None
+        self.two_stage_prediction = two_stage_prediction
+        self.phase_listeners: List[ParsingPhaseListener] = []
+
+    def add_phase_listener(self, listener: ParsingPhaseListener):
+        """Registers a listener that's notified of the start and end of each phase of parsing."""
+        self.phase_listeners.append(listener)
+
+    def remove_phase_listener(self, listener: ParsingPhaseListener):
+        self.phase_listeners.remove(listener)
+
+    @property
+    def prediction_context_cache(self) -> PredictionContextCache:
+        return self.prediction_caches.prediction_context_cache
+
+    @prediction_context_cache.setter
+    def prediction_context_cache(self, prediction_context_cache: PredictionContextCache):
+        self.prediction_caches.install_prediction_context_cache(prediction_context_cache)
+
+    @property
+    def cache_policy(self) -> PredictionCachePolicy:
+        return self.prediction_caches.policy
+
+    @cache_policy.setter
+    def cache_policy(self, policy: PredictionCachePolicy):
+        self.prediction_caches.policy = policy
+
+    def reset_prediction_caches(self):
+        """Empties the DFA and the PredictionContextCache, e.g., to free memory. Parsers that are already running keep
+        using the previous ones, so it's safe to call at any time, but the next parses will be slower, until the new
+        caches warm up."""
+        self.prediction_caches.reset()
+
+    def prediction_cache_statistics(self) -> PredictionCacheStatistics:
+        """A snapshot of the size and use of the DFA and the PredictionContextCache."""
+        return self.prediction_caches.statistics()
+
+    def warm_up(self, samples: Iterable[Union[InputStream, str]]):
+        """Parses some sample inputs, only to fill the DFA, so that the first parses of actual inputs run as fast as the
+        following ones. Samples should be representative of the inputs, and they may contain errors. To warm up the
+        workers of a process pool, either warm up the parser before the processes are forked, or save the DFA with
+        save_prediction_state and load it in each worker (e.g., in the parser_factory of parse_many)."""
+        for sample in samples:
+            self.parse_first_stage(InputStream(sample) if type(sample) is str else sample)
+
+    def prediction_state_path(self, directory: Union[str, os.PathLike], version: str = "") -> Path:
+        """The file where save_prediction_state stores the DFA, identified by the class of the parser, the given version
+        of the grammar, the version of the ANTLR runtime and the size of the ATNs."""
+        lexer_atn, atn = self.atns()
+        parser_class = type(self)
+        key = f"{parser_class.__module__}.{parser_class.__qualname__}\0{version}\0{antlr_runtime_version()}\0" \
+              f"{len(lexer_atn.states)}\0{len(atn.states)}\0{len(atn.decisionToState)}"
+        return Path(directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".dfa")
+
+    def save_prediction_state(self, directory: Union[str, os.PathLike], version: str = "") -> Path:
+        """Saves the DFA learned by the lexer and the parser so far in a file in the given directory, to be loaded by
+        other processes with load_prediction_state. It should be called while no parse is running. Returns the path of
+        the file."""
+        path = self.prediction_state_path(directory, version)
+        lexer_atn, atn = self.atns()
+        caches = self.prediction_caches
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with replacing(path) as file:
+            dump_dfa(caches.lexer_decision_to_dfa or new_dfa(lexer_atn), file)
+            dump_dfa(caches.decision_to_dfa or new_dfa(atn), file)
+        return path
+
+    def load_prediction_state(self, directory: Union[str, os.PathLike], version: str = "") -> bool:
+        """Replaces the DFA of the lexer and of the parser with those saved by save_prediction_state, with the same
+        version, if any. Returns whether they were loaded; they're not if there's no file for this parser and version,
+        or if it can't be read. The file is unpickled, which can run arbitrary code: the directory must be trusted, as
+        writable only by the processes that save the prediction state."""
+        lexer_atn, atn = self.atns()
+        try:
+            with open(self.prediction_state_path(directory, version), "rb") as file:
+                lexer_decision_to_dfa, _ = load_dfa(lexer_atn, file)
+                decision_to_dfa, prediction_context_cache = load_dfa(atn, file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return False
+        self.prediction_caches.install(lexer_decision_to_dfa, decision_to_dfa, prediction_context_cache)
+        return True
+
+    def atns(self) -> Tuple[ATN, ATN]:
+        """The ATN of the ANTLR lexer and of the ANTLR parser, which are shared by all their instances."""
+        lexer = self.create_antlr_lexer(InputStream(""))
+        return lexer.atn, self.create_antlr_parser(self.create_token_stream(lexer)).atn
 
     def parse(self, input_stream: Union[InputStream, str], consider_range: bool = True,
-              measure_lexing_time: bool = False, source: Optional[Source] = None):
+              measure_lexing_time: bool = False, source: Optional[Source] = None, eager_positions: bool = False):
         """Parses source code, returning a result that includes an AST and a collection of parse issues
         (errors, warnings).
         The parsing is done in accordance to the StarLasu methodology i.e. a first-stage parser builds a parse tree
@@ -31,29 +152,186 @@ class PylasuANTLRParser:
         @param inputStream the source code.
         @param charset the character set in which the input is encoded.
         @param considerPosition if true (the default), parsed AST nodes record their position in the input text.
+        Otherwise, the nodes built with with_parse_tree or a ParseTreeToASTTransformer (through as_origin) get no origin
+        at all (see parse_tree_origins), and any other origin that parse_tree_to_ast or post_process_ast assigns, e.g.,
+        a ParseTreeOrigin created directly, is removed afterwards.
         @param measureLexingTime if true, the result will include a measurement of the time spent in lexing i.e.
-        breaking the input stream into tokens."""
-        start = time.time_ns()
+        breaking the input stream into tokens.
+        @param eagerPositions if true, the positions of the AST nodes are computed right away, in a single pass,
+        rather than when they're first requested. See precompute_positions.
+        If the parser has a cache, and the text was parsed before, the result comes from the cache, without the first
+        stage. The cache is not used when measuring the lexing time."""
+        start = time.perf_counter_ns()
+        key = None
+        if self.cache is not None and not measure_lexing_time:
+            key = self.cache.key(self, cached_text(input_stream), consider_range)
+            cached = self.cache.get(key, source)
+            if cached is not None:
+                return cached_result(cached, input_stream, source, start)
         if type(input_stream) is str:
             input_stream = InputStream(input_stream)
-        first_stage = self.parse_first_stage(input_stream, measure_lexing_time)
+        first_stage = self.parse_first_stage(input_stream, measure_lexing_time, source)
         issues = first_stage.issues
-        ast = self.parse_tree_to_ast(first_stage.root, consider_range, issues, source)
-        self.assign_parents(ast)
-        ast = self.post_process_ast(ast, issues) if ast else ast
+        # An override of parse_first_stage may not measure its phases
+        timings = first_stage.timings or ParsingTimings()
+        timer = PhaseTimer(timings, self.phase_listeners, source)
+        # Without positions, the nodes don't get a ParseTreeOrigin, from which they would compute their range
+        with parse_tree_origins(consider_range):
+            with timer(PARSE_TREE_TO_AST):
+                ast = self.parse_tree_to_ast(first_stage.root, consider_range, issues, source)
+            with timer(ASSIGN_PARENTS):
+                self.assign_parents(ast)
+            with timer(POST_PROCESS_AST):
+                ast = self.post_process_ast(ast, issues) if ast else ast
         if ast and not consider_range:
-            # Remove parseTreeNodes because they cause the range to be computed
-            for node in walk(ast):
-                node.origin = None
-        now = time.time_ns()
-        return ParsingResultWithFirstStage(
+            # The origins that got through anyway, e.g., assigned directly, would give the nodes a position
+            remove_origins(ast)
+        elif ast and eager_positions:
+            with timer(POSITIONS):
+                precompute_positions(ast)
+        if key is not None:
+            self.cache.put(key, ast, issues, source)
+        now = time.perf_counter_ns()
+        result = ParsingResultWithFirstStage(
             issues,
             ast,
-            input_stream.getText(0, input_stream.index + 1),
+            result_code(input_stream),
             (now - start) // 1_000_000,
             first_stage,
             source,
+            timings,
+            source_text_of(input_stream),
         )
+        timings.total = now - start
+        return result
+
+    def parse_file(self, path: Union[str, os.PathLike], encoding: str = "utf-8", consider_range: bool = True,
+                   measure_lexing_time: bool = False, eager_positions: bool = False):
+        """Parses a file, like parse, with a FileSource as the source of the result and of the positions. The source is
+        interned (see intern_source), so the positions of the nodes parsed from the same file share a single instance.
+        The file is read as bytes, not as a string: when each character takes a single byte, the lexer reads the bytes
+        directly, and the text is decoded only when needed, in one step. The result keeps its own copy of the bytes, so
+        it's not affected if the file changes afterwards.
+        @param path the path of the file.
+        @param encoding the character set in which the file is encoded."""
+        source = intern_source(FileSource(Path(path), encoding))
+        source_text = SourceText.from_file(path, encoding)
+        return self.parse(SourceTextInputStream(source_text, str(path)), consider_range, measure_lexing_time, source,
+                          eager_positions)
+
+    async def parse_async(self, input_stream: Union[InputStream, str], consider_range: bool = True,
+                          measure_lexing_time: bool = False, source: Optional[Source] = None,
+                          eager_positions: bool = False, runner: Optional[AsyncRunner] = None,
+                          key: Optional[Hashable] = None) -> ParsingResultWithFirstStage:
+        """Parses source code like parse, without blocking the event loop.
+        @param runner the AsyncRunner that runs the parser, which determines the executor and how many parsers may run
+        at once. By default, the parser runs in the default executor of the event loop. If the runner uses processes,
+        the parser is pickled and sent to them, and the result comes back without the parse tree (see
+        detach_parse_trees).
+        @param key if given, e.g., the URI of a document, a later call with the same key cancels this one."""
+        runner = runner or default_runner
+        function = parse_detached if runner.uses_processes else PylasuANTLRParser.parse
+        return await runner.run(function, self, input_stream, consider_range, measure_lexing_time, source,
+                                eager_positions, key=key)
+
+    def reparse(self, previous: ParsingResultWithFirstStage, edits: List[TextEdit]) -> ParsingResultWithFirstStage:
+        """Parses the code of a previous result again, after applying some edits to it, as in an editor, reusing as much
+        of the previous result as possible.
+
+        The code is split into units, usually top-level statements (see parse_unit, ast_units and unit_to_ast). Only
+        the units touched by the edits, and the text between them and their neighbours, are parsed and transformed
+        again; the new AST nodes replace the old ones in the AST of the previous result, and the parse trees in its
+        parse tree. The positions of the nodes following the edits are moved, and stored in their origins, so they
+        must not be computed from the parse tree again, e.g., with precompute_positions; post_process_ast is not
+        called on the new nodes. The previous result must not be used anymore.
+
+        Otherwise, that is, if the language doesn't define units, if the previous result has issues, or if the edited
+        units can't be parsed without issues on their own, the whole code is parsed again, with parse.
+        @param previous the result of parsing the code before the edits, with parse or reparse.
+        @param edits the changes to the code, each referring to the code resulting from the previous ones."""
+        start_time = time.perf_counter_ns()
+        new_text, changed = apply_edits(previous.line_index, edits)
+        if changed is None:
+            return previous
+        units = self.ast_units(previous.root) if previous.root is not None and not previous.issues else None
+        result = self._reparse_units(previous, units, new_text, changed) if units else None
+        if result is None:
+            return self.parse(new_text.text, source=previous.source)
+        result.time = (time.perf_counter_ns() - start_time) // 1_000_000
+        return result
+
+    def _reparse_units(self, previous: ParsingResultWithFirstStage, units: List[Node], new_text: SourceText,
+                       changed: ChangedRegion) -> Optional[ParsingResultWithFirstStage]:
+        old_text = previous.line_index
+        # The units touched by the changes, from first to last (excluded), and the text from the end of the unit before
+        # them to the start of the unit after them
+        first = first_ending_at_or_after(units, old_text.point_at(changed.start))
+        last = first_starting_after(units, old_text.point_at(changed.old_end))
+        start = old_text.offset_of(units[first - 1].position.end) if first > 0 else 0
+        old_end = old_text.offset_of(units[last].position.start) if last < len(units) else len(old_text)
+        new_end = old_end + len(new_text) - len(old_text)
+        input_stream = SourceTextInputStream(new_text, str(previous.source or "<empty>"), start, new_end)
+        parse_trees = self._parse_units(input_stream, new_text.point_at(start))
+        if parse_trees is None:
+            return None
+        issues = []
+        nodes = [self.unit_to_ast(parse_tree, issues, previous.source) for parse_tree in parse_trees]
+        if issues or None in nodes:
+            return None
+        first_stage = previous.first_stage
+        if first_stage is not None and first_stage.root is not None:
+            splice_parse_trees(first_stage.root, units[first:last], parse_trees, units[last:])
+        parent = (units[first] if first < len(units) else units[first - 1]).parent
+        for node in nodes:
+            node.parent = parent
+            self.assign_parents(node)
+        shift = PointShift(old_text.point_at(old_end), new_text.point_at(new_end))
+        shift.nodes(units[last:])
+        root = previous.root
+        if isinstance(root.origin, ParseTreeOrigin) and isinstance(root.origin.parse_tree, ParserRuleContext):
+            # The root spans the whole code: its tokens are moved to the new text
+            input_stream._size = len(new_text)
+            move_root_tokens(root.origin.parse_tree, units[first - 1] if first > 0 else None, parse_trees,
+                             units[last:], start, old_end, input_stream, changed, shift)
+            root.origin._position = None
+        units[first:last] = nodes
+        return ParsingResultWithFirstStage([], root, new_text.text, None, first_stage, previous.source, text=new_text)
+
+    def _parse_units(self, input_stream: InputStream, start: Point) -> Optional[List[ParserRuleContext]]:
+        """Parses the units in the input stream, or returns None if that's not possible without issues."""
+        issues = []
+        parser = self.create_parser(input_stream, issues)
+        token_stream = parser.getTokenStream()
+        # The input stream starts in the middle of the text; the lexer hasn't read it yet
+        lexer = token_stream.tokenSource
+        lexer.line = start.line
+        lexer.column = start.column
+        parse_trees = []
+        while token_stream.LA(1) != Token.EOF:
+            index = token_stream.index
+            parse_tree = self.parse_unit(parser)
+            if parse_tree is None or issues or token_stream.index == index:
+                return None
+            parse_trees.append(parse_tree)
+        # The lexer may still have found errors in the text after the last unit
+        return parse_trees if not issues else None
+
+    def parse_unit(self, parser: Parser) -> Optional[ParserRuleContext]:
+        """Parses one of the units of incremental parsing (see reparse), usually a top-level statement, by invoking the
+        corresponding rule of the parser. The default implementation returns None, so the whole code is always parsed
+        again."""
+        return None
+
+    def ast_units(self, root: Node) -> Optional[List[Node]]:
+        """The list of the AST nodes built from the units of incremental parsing (see reparse), one per unit, in the
+        order in which they appear in the code, e.g., the statements of a compilation unit; it's the list that reparse
+        modifies, replacing the nodes of the units that changed. The units must be direct children of the root: reparse
+        updates the position of the root and of the units, but not the one of any node between them."""
+        return None
+
+    def unit_to_ast(self, parse_tree: ParserRuleContext, issues: List[Issue], source: Source) -> Optional[Node]:
+        """Builds the AST node of a unit of incremental parsing (see reparse), as parse_tree_to_ast would."""
+        return None
 
     def parse_first_stage(
             self, input_stream: InputStream, measure_lexing_time: bool = False, source: Source = None
@@ -61,34 +339,95 @@ class PylasuANTLRParser:
         """Executes only the first stage of the parser, i.e., the production of a parse tree. Usually, you'll want to
         use the [parse] method, that returns an AST which is simpler to use and query."""
         issues = []
-        lexing_time: Optional[int] = None
-        total_time: int = time.time_ns()
+        start = time.perf_counter_ns()
+        timings = ParsingTimings()
+        timer = PhaseTimer(timings, self.phase_listeners, source)
         parser = self.create_parser(input_stream, issues)
+        cancellation = current_cancellation()
+        if cancellation is not None:
+            parser.addParseListener(CancellationListener(cancellation))
         if measure_lexing_time:
             token_stream = parser.getInputStream()
             if isinstance(token_stream, CommonTokenStream):
-                lexing_time = time.time_ns()
-                token_stream.fill()
-                token_stream.seek(0)
-                lexing_time = (time.time_ns() - lexing_time) // 1_000_000
-        root = self.invoke_root_rule(parser)
+                with timer(LEXING):
+                    token_stream.fill()
+                    token_stream.seek(0)
+        with timer(PARSING):
+            if self.two_stage_prediction:
+                root, prediction_mode = self.invoke_root_rule_in_two_stages(parser, issues)
+            else:
+                root, prediction_mode = self.invoke_root_rule(parser), parser._interp.predictionMode
         if root:
-            self.verify_parse_tree(parser, issues, root)
-        total_time = (time.time_ns() - total_time) // 1_000_000
-        return FirstStageParsingResult(issues, root, None, total_time, lexing_time, source)
+            with timer(VERIFICATION):
+                self.verify_parse_tree(parser, issues, root)
+        timings.total = time.perf_counter_ns() - start
+        lexing_time = timings.lexing // 1_000_000 if timings.lexing is not None else None
+        return FirstStageParsingResult(issues, root, None, timings.total // 1_000_000, lexing_time, source,
+                                       prediction_mode, timings)
+
+    def tokenize(self, input_stream: Union[InputStream, str], source: Optional[Source] = None) -> TokenizationResult:
+        """Runs only the lexer, e.g., for syntax highlighting or to count tokens, returning the tokens as TokenColumns,
+        and the lexical errors as issues. No parser, token stream or CommonToken per token is created, and the lexer
+        follows its DFA directly where it can (see scan), so it's much faster, and takes much less memory, than filling
+        a CommonTokenStream."""
+        start = time.perf_counter_ns()
+        if type(input_stream) is str:
+            input_stream = InputStream(input_stream)
+        issues = []
+        tokens = TokenColumns()
+        timings = ParsingTimings()
+        timer = PhaseTimer(timings, self.phase_listeners, source)
+        lexer = self.create_lexer(input_stream, issues)
+        factory = TokenColumnsFactory(tokens)
+        lexer._factory = factory
+        with timer(LEXING):
+            scan(lexer, tokens, factory)
+        timings.total = time.perf_counter_ns() - start
+        return TokenizationResult(issues, tokens, consumed_text(input_stream), timings.total // 1_000_000, source,
+                                  timings)
+
+    def invoke_root_rule_in_two_stages(self, parser: Parser, issues: List[Issue]):
+        """Invokes the root rule in SLL mode, bailing out at the first syntax error, and then, if needed, in LL mode,
+        from the start of the same token stream, with the usual error reporting and recovery. Errors found by the lexer
+        are only reported once, because the tokens are not lexed again. Returns the root and the mode that produced
+        it."""
+        parser.removeErrorListeners()
+        parser._errHandler = BailErrorStrategy()
+        parser._interp.predictionMode = PredictionMode.SLL
+        try:
+            return self.invoke_root_rule(parser), PredictionMode.SLL
+        except ParseCancellationException:
+            parser.reset()
+            parser._errHandler = DefaultErrorStrategy()
+            parser._interp.predictionMode = PredictionMode.LL
+            self.attach_listeners(parser, issues)
+            return self.invoke_root_rule(parser), PredictionMode.LL
 
     def create_parser(self, input_stream: InputStream, issues: List[Issue]) -> Parser:
         """Creates the first-stage parser."""
-        lexer = self.create_antlr_lexer(input_stream)
-        self.attach_listeners(lexer, issues)
-        token_stream = self.create_token_stream(lexer)
+        caches = self.prediction_caches
+        token_stream = self.create_token_stream(self.create_lexer(input_stream, issues))
         parser = self.create_antlr_parser(token_stream)
-        # Assign interpreter to avoid caching DFA states indefinitely across executions
-        parser._interp = \
-            ParserATNSimulator(parser, parser.atn, parser._interp.decisionToDFA, self.prediction_context_cache)
+        # Likewise for the parser, whose DFA and PredictionContextCache are also subject to the cache policy
+        decision_to_dfa, prediction_context_cache = caches.acquire(parser.atn, input_stream.size - input_stream.index)
+        if caches.policy.count_predictions:
+            parser._interp = CountingParserATNSimulator(
+                parser, parser.atn, decision_to_dfa, prediction_context_cache, caches)
+        else:
+            parser._interp = ParserATNSimulator(parser, parser.atn, decision_to_dfa, prediction_context_cache)
         self.attach_listeners(parser, issues)
         return parser
 
+    def create_lexer(self, input_stream: InputStream, issues: List[Issue]) -> Lexer:
+        """Creates the lexer of the first-stage parser, or of tokenize, reporting its errors as issues."""
+        lexer = self.create_antlr_lexer(input_stream)
+        # Use the DFA of this instance, rather than the one shared by the generated lexer class, so that it can be saved
+        # and loaded (see save_prediction_state)
+        dfa = self.prediction_caches.lexer_dfa(lexer.atn)
+        lexer._interp = LexerATNSimulator(lexer, lexer.atn, dfa, PredictionContextCache())
+        self.attach_listeners(lexer, issues)
+        return lexer
+
     def invoke_root_rule(self, parser: Parser):
         """Invokes the parser's root rule, i.e., the method which is responsible for parsing the entire input.
         Usually this is the topmost rule, the one with index 0 (as also assumed by other libraries such as antlr4-c3),
@@ -133,6 +472,8 @@ class PylasuANTLRParser:
 
     @abstractmethod
     def parse_tree_to_ast(self, root, consider_range: bool, issues: List[Issue], source: Source) -> Optional[Node]:
+        """Builds the AST from the parse tree. When consider_range is false, parse tree origins are disabled while it
+        runs, as well as post_process_ast."""
         pass
 
     def attach_listeners(self, recognizer: Recognizer, issues: List[Issue]):
@@ -151,3 +492,148 @@ class ParserErrorListener(ErrorListener):
             end_point = token_end_point(offending_symbol)
         msg = (msg or "unspecified").capitalize()
         self.issues.append(Issue(IssueType.SYNTACTIC, msg, position=Position(start_point, end_point)))
+
+
+class CancellationListener(ParseTreeListener):
+    """Stops the parser at the next rule when the asynchronous operation it's part of is cancelled."""
+
+    def __init__(self, cancellation: threading.Event):
+        self.cancellation = cancellation
+
+    def enterEveryRule(self, ctx: ParserRuleContext):
+        if self.cancellation.is_set():
+            raise CancelledError()
+
+
+class SourceTextInputStream(InputStream):
+    """An ANTLR input stream over a SourceText. Unlike InputStream, it doesn't keep a list of integers, one per
+    character: it reads the code points of the text from a compact buffer (see SourceText.code_points), and the text of
+    tokens from the SourceText."""
+
+    def __init__(self, source_text: SourceText, name: str = "<empty>", start: int = 0, end: Optional[int] = None):
+        """The stream reads the text from the start offset, and ends at the end offset, or at the end of the text."""
+        self.name = name
+        self.source_text = source_text
+        self._index = start
+        self.data = source_text.code_points()
+        self._size = len(self.data) if end is None else end
+
+    @property
+    def strdata(self) -> str:
+        return self.source_text.text
+
+    def getText(self, start: int, stop: int) -> str:
+        if stop >= self._size:
+            stop = self._size - 1
+        if start >= self._size:
+            return ""
+        return self.source_text.slice(start, stop + 1)
+
+
+def moved_token(token: Token, input_stream: InputStream, changed: ChangedRegion, shift: PointShift) -> Token:
+    """A copy of a token that doesn't come before a changed region, as it is in the new text, read from the given input
+    stream."""
+    if token is None or token.start < changed.old_end:
+        moved = token.clone() if token is not None else None
+    else:
+        moved = token.clone()
+        delta = changed.new_end - changed.old_end
+        moved.start += delta
+        moved.stop += delta
+        point = shift.point(Point(token.line, token.column))
+        moved.line = point.line
+        moved.column = point.column
+    if moved is not None:
+        moved.source = (moved.source[0], input_stream)
+    return moved
+
+
+def move_root_tokens(root_tree: ParserRuleContext, preceding: Optional[Node], parse_trees: List[ParserRuleContext],
+                     following: List[Node], start: int, end: int, input_stream: InputStream, changed: ChangedRegion,
+                     shift: PointShift):
+    """Moves the start and stop tokens of the root parse tree to the new text, after the units from the start to the
+    end offset have been parsed again, obtaining the given parse trees."""
+    if root_tree.start is not None and root_tree.start.start >= start:
+        if parse_trees:
+            root_tree.start = parse_trees[0].start
+        elif following and isinstance(following[0].origin, ParseTreeOrigin):
+            root_tree.start = moved_token(following[0].origin.parse_tree.start, input_stream, changed, shift)
+    else:
+        root_tree.start = moved_token(root_tree.start, input_stream, changed, shift)
+    if root_tree.stop is not None and root_tree.stop.start < end and parse_trees:
+        root_tree.stop = parse_trees[-1].stop
+    elif root_tree.stop is not None and start <= root_tree.stop.start < end \
+            and preceding is not None and isinstance(preceding.origin, ParseTreeOrigin):
+        root_tree.stop = moved_token(preceding.origin.parse_tree.stop, input_stream, changed, shift)
+    else:
+        root_tree.stop = moved_token(root_tree.stop, input_stream, changed, shift)
+
+
+def splice_parse_trees(root: ParserRuleContext, replaced: List[Node], parse_trees: List[ParserRuleContext],
+                       following: List[Node]):
+    """Replaces the parse trees of some AST nodes, children of the root parse tree, with new parse trees."""
+    if not root.children:
+        return
+    old = [node.origin.parse_tree for node in replaced if isinstance(node.origin, ParseTreeOrigin)]
+    if len(old) != len(replaced):
+        return
+    if old:
+        index = root.children.index(old[0])
+    elif following and isinstance(following[0].origin, ParseTreeOrigin):
+        index = root.children.index(following[0].origin.parse_tree)
+    elif isinstance(root.children[-1], TerminalNode) and root.children[-1].symbol.type == Token.EOF:
+        index = len(root.children) - 1
+    else:
+        index = len(root.children)
+    for parse_tree in parse_trees:
+        parse_tree.parentCtx = root
+    root.children[index:index + len(old)] = parse_trees
+
+
+def parse_detached(parser: PylasuANTLRParser, *args, **kwargs) -> ParsingResultWithFirstStage:
+    """Parses with the given parser, and removes the parse tree from the result, so that it can be pickled."""
+    return detach_parse_trees(parser.parse(*args, **kwargs))
+
+
+def cached_text(input_stream: Union[InputStream, str]) -> Union[str, SourceText]:
+    """The text to parse, as it's hashed to look up a ParseCache."""
+    if isinstance(input_stream, SourceTextInputStream):
+        return input_stream.source_text
+    if isinstance(input_stream, InputStream):
+        return input_stream.strdata
+    return input_stream
+
+
+def cached_result(cached: Tuple[Optional[Node], List[Issue]], input_stream: Union[InputStream, str],
+                  source: Optional[Source], start: int) -> ParsingResultWithFirstStage:
+    """The result of parsing a text, made of the AST and issues found in a ParseCache."""
+    root, issues = cached
+    if isinstance(input_stream, SourceTextInputStream):
+        # Decoded only if it's read
+        code = None
+    else:
+        code = input_stream if type(input_stream) is str else input_stream.strdata
+    elapsed = (time.perf_counter_ns() - start) // 1_000_000
+    return ParsingResultWithFirstStage(issues, root, code, elapsed, None, source, text=source_text_of(input_stream))
+
+
+def source_text_of(input_stream: Union[InputStream, str]) -> Optional[SourceText]:
+    """The SourceText that the input stream reads, if it's a SourceTextInputStream."""
+    return input_stream.source_text if isinstance(input_stream, SourceTextInputStream) else None
+
+
+def result_code(input_stream: InputStream) -> Optional[str]:
+    """The code of the result of parsing the input stream, i.e., the text read from it; None when that's the whole text
+    of a SourceTextInputStream, which the result decodes only if its code is read."""
+    if isinstance(input_stream, SourceTextInputStream) and input_stream.index + 1 >= input_stream.size - 1:
+        return None
+    return consumed_text(input_stream)
+
+
+def consumed_text(input_stream: InputStream) -> str:
+    """The text read from the input stream. When that's the whole input, as usual, it's the text of the stream itself
+    rather than a copy."""
+    end = input_stream.index + 1
+    if end >= input_stream.size - 1:
+        return input_stream.strdata
+    return input_stream.getText(0, end)
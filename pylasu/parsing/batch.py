@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pylasu.model.position import FileSource, StringSource
+from pylasu.parsing.antlr import PylasuANTLRParser
+from pylasu.parsing.parse_tree import detach_parse_trees
+from pylasu.parsing.results import ParsingResultWithFirstStage
+
+ParsingInput = Union[str, os.PathLike, FileSource, StringSource]
+
+
+@dataclass
+class BatchParsingResult:
+    """The outcome of parsing one of the inputs of parse_many: either a result, or the traceback of the error that
+    prevented parsing the input. The time is the time spent on the input, in milliseconds, including serialization."""
+    input: ParsingInput
+    result: Any = None
+    error: Optional[str] = None
+    time: int = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+def parse_many(parser_factory: Callable[[], PylasuANTLRParser], inputs: Iterable[ParsingInput],
+               workers: Optional[int] = None, serialize: Optional[Callable[[ParsingResultWithFirstStage], Any]] = None,
+               **parse_options) -> Iterator[BatchParsingResult]:
+    """Parses many files or strings in parallel, using a pool of processes, and yields a BatchParsingResult for each
+    input as soon as it's ready, so not in the order of the inputs.
+
+    Each process creates its own parser, once, with parser_factory, which is usually the parser class; then, it parses
+    the inputs it's given, starting from the largest, so that no process is left parsing a large input while the others
+    are idle. Inputs that are paths or FileSources are parsed with parse_file, StringSources with parse.
+
+    The results are sent back from the worker processes by pickling them, so they don't include the first stage (the
+    parse tree), and the nodes keep their positions but not their ParseTreeOrigin. To send something else, e.g., an AST
+    serialized in a compact form, pass a serialize function, which is called in the worker process: the results will be
+    what it returns. Both parser_factory and serialize must be picklable, e.g., module-level functions or classes.
+
+    An error while parsing an input doesn't stop the batch: it's reported in the BatchParsingResult of that input. If a
+    worker process crashes, e.g., running out of memory, the pool can't be used anymore: the inputs that were being
+    parsed then are parsed again one at a time, each in a process of its own, so that only the one that crashes fails,
+    and the others, which were still waiting, are parsed in a new pool. With one worker, a crash stops the current
+    process.
+
+    :param parser_factory: creates the parser in each process.
+    :param inputs: paths, FileSources or StringSources.
+    :param workers: the number of processes; by default, the number of CPUs. With one worker, the inputs are parsed in
+    the current process.
+    :param serialize: turns a parsing result into what's sent back to the caller.
+    :param parse_options: passed to parse and parse_file, e.g., consider_range.
+    """
+    inputs = sorted(inputs, key=input_size, reverse=True)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        _initialize_worker(parser_factory)
+        for index, parsing_input in enumerate(inputs):
+            yield _parse_in_worker(index, parsing_input, serialize, parse_options)
+        return
+    while inputs:
+        crashed = yield from _parse_in_pool(parser_factory, inputs, workers, serialize, parse_options)
+        if crashed is None:
+            return
+        inputs, suspects = crashed
+        for parsing_input in suspects:
+            yield _parse_alone(parser_factory, parsing_input, serialize, parse_options)
+
+
+def _parse_in_pool(parser_factory, inputs: List[ParsingInput], workers: int, serialize, parse_options) \
+        -> Generator[BatchParsingResult, None, Optional[Tuple[List[ParsingInput], List[ParsingInput]]]]:
+    """Parses the inputs in a pool of processes, yielding their results. If a worker process crashes, returns the
+    inputs that were still waiting, and those that were being parsed, one of which made the process crash."""
+    started = multiprocessing.SimpleQueue()
+    with ProcessPoolExecutor(workers, initializer=_initialize_worker, initargs=(parser_factory, started)) as executor:
+        futures = {executor.submit(_parse_in_worker, index, parsing_input, serialize, parse_options): index
+                   for index, parsing_input in enumerate(inputs)}
+        unfinished = set(futures.values())
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    yield from _completed_results(futures, unfinished)
+                    return _crashed(inputs, unfinished, started)
+                except Exception:
+                    # The result could not be sent back
+                    result = BatchParsingResult(inputs[futures[future]], error=traceback.format_exc())
+                unfinished.discard(futures[future])
+                yield result
+        finally:
+            # If the caller stops early, don't wait for the inputs that are still to be parsed
+            for future in futures:
+                future.cancel()
+    return None
+
+
+def _completed_results(futures, unfinished: set) -> Iterator[BatchParsingResult]:
+    """The results of the inputs parsed before the pool broke, but not yielded yet."""
+    for future, index in futures.items():
+        if index in unfinished and future.done() and not future.cancelled() and future.exception() is None:
+            unfinished.discard(index)
+            yield future.result()
+
+
+def _crashed(inputs: List[ParsingInput], unfinished: set, started) -> Tuple[List[ParsingInput], List[ParsingInput]]:
+    running = set()
+    while not started.empty():
+        running.add(started.get())
+    # If it's not known which inputs were being parsed, e.g., because the parser could not be created, all are suspects
+    suspects = {index for index in unfinished if index in running} or unfinished
+    return [inputs[i] for i in sorted(unfinished - suspects)], [inputs[i] for i in sorted(suspects)]
+
+
+def _parse_alone(parser_factory, parsing_input: ParsingInput, serialize, parse_options) -> BatchParsingResult:
+    """Parses an input in a process of its own, reporting its crash as the error of the input."""
+    with ProcessPoolExecutor(1, initializer=_initialize_worker,
+                             initargs=(parser_factory, multiprocessing.SimpleQueue())) as executor:
+        try:
+            return executor.submit(_parse_in_worker, 0, parsing_input, serialize, parse_options).result()
+        except Exception:
+            return BatchParsingResult(parsing_input, error=traceback.format_exc())
+
+
+def input_size(parsing_input: ParsingInput) -> int:
+    """The size of an input of parse_many, used to schedule the largest inputs first."""
+    if isinstance(parsing_input, StringSource):
+        return len(parsing_input.code or "")
+    try:
+        return os.path.getsize(parsing_input.file if isinstance(parsing_input, FileSource) else parsing_input)
+    except OSError:
+        return 0
+
+
+_worker_parser: Optional[PylasuANTLRParser] = None
+_worker_started = None
+
+
+def _initialize_worker(parser_factory: Callable[[], PylasuANTLRParser], started=None):
+    global _worker_parser, _worker_started
+    _worker_parser = parser_factory()
+    _worker_started = started
+
+
+def _parse_in_worker(index: int, parsing_input: ParsingInput, serialize, parse_options) -> BatchParsingResult:
+    if _worker_started is not None:
+        # Tells the parent process which input this process is parsing, in case it crashes
+        _worker_started.put(index)
+    start = time.time_ns()
+    try:
+        if isinstance(parsing_input, StringSource):
+            result = _worker_parser.parse(parsing_input.code, source=parsing_input, **parse_options)
+        elif isinstance(parsing_input, FileSource):
+            result = _worker_parser.parse_file(parsing_input.file, parsing_input.encoding, **parse_options)
+        else:
+            result = _worker_parser.parse_file(Path(parsing_input), **parse_options)
+        result = serialize(result) if serialize else detach_parse_trees(result)
+        return BatchParsingResult(parsing_input, result, time=(time.time_ns() - start) // 1_000_000)
+    except Exception:
+        return BatchParsingResult(parsing_input, error=traceback.format_exc(),
+                                  time=(time.time_ns() - start) // 1_000_000)
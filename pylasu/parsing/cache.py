@@ -0,0 +1,282 @@
+import hashlib
+import io
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from pylasu.model import Node, Source, walk
+from pylasu.model.position import SourceText
+from pylasu.parsing.parse_tree import ParseTreeOrigin, precompute_positions
+from pylasu.support import replacing
+from pylasu.validation import Issue
+
+SUFFIX = ".pickle"
+# Raised when an AST can't be pickled, e.g., because it contains a lambda, or it's too deep
+PICKLING_ERRORS = (pickle.PicklingError, TypeError, AttributeError, RecursionError)
+
+
+@dataclass
+class ParseCacheStatistics:
+    """How a ParseCache has been used since it was created. Hits are split between the in-memory tier and the directory;
+    evictions count the entries removed from the directory to stay within its size limit, and skips the results that
+    were not stored because they could not be pickled."""
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    skips: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ParseCache:
+    """A cache of parsing results, addressed by the content of the parsed code. To use it, assign it to the cache
+    attribute of a PylasuANTLRParser: then, parsing a text that was parsed before returns the cached AST and issues,
+    rather than parsing it again.
+
+    Entries are keyed by a hash of the text, of the class of the parser and of the given version, which should change
+    whenever the grammar or the AST do, since the key can't capture them otherwise. They're stored in pickled form, in a
+    directory, if given, so that they survive the process, and in memory. Both tiers have a size limit, beyond which the
+    least recently used entries are removed. Several processes may share a directory, although each one only knows of
+    the entries that were there when it started, and of its own.
+
+    A cached result is equivalent to a fresh one, with its AST, positions, issues and parents, but it doesn't include
+    the parse tree: as with detach_parse_trees, its nodes have a position but no origin. The AST classes must be
+    picklable; results that can't be pickled, e.g., ASTs deeper than the recursion limit, are not stored.
+
+    Since entries are unpickled, and unpickling can run arbitrary code, the directory must be trusted: only this cache,
+    or others of the same application, must be able to write to it.
+
+    :param directory: where the entries are stored, created if needed; if None, the cache is in memory only.
+    :param max_bytes: the size limit of the directory.
+    :param max_memory_bytes: the size limit of the in-memory tier; 0 to keep entries only in the directory.
+    :param version: a tag identifying the grammar and the AST, part of the keys.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike, None] = None, max_bytes: int = 256 * 2 ** 20,
+                 max_memory_bytes: int = 32 * 2 ** 20, version: str = ""):
+        self.directory = Path(directory) if directory is not None else None
+        self.max_bytes = max_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.version = version
+        self.statistics = ParseCacheStatistics()
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._files: Optional["OrderedDict[str, int]"] = None
+        self._file_bytes = 0
+
+    def __getstate__(self):
+        # Sent to another process, e.g., with the parser, the cache starts with an empty memory tier
+        return self.directory, self.max_bytes, self.max_memory_bytes, self.version
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def key(self, parser, text: Union[str, SourceText], consider_range: bool = True) -> str:
+        """The key of the result of parsing the given text with the given parser."""
+        digest = hashlib.sha256()
+        parser_class = type(parser)
+        digest.update(f"{parser_class.__module__}.{parser_class.__qualname__}\0{self.version}\0{consider_range}\0"
+                      .encode("utf-8"))
+        digest.update(text.utf8() if isinstance(text, SourceText) else text.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str, source: Optional[Source] = None) -> Optional[Tuple[Optional[Node], List[Issue]]]:
+        """The AST and the issues stored with the given key, if any, with the given source in place of the one they
+        were parsed from. Each call returns a new copy."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+        in_memory = data is not None
+        if not in_memory and self.directory is not None:
+            data = self._read(key)
+        result = None
+        if data is not None:
+            try:
+                result = load(data, source)
+            except Exception:
+                # E.g., an entry stored with a different version of the AST classes
+                self.discard(key)
+        with self._lock:
+            if result is None:
+                self.statistics.misses += 1
+            elif in_memory:
+                self.statistics.memory_hits += 1
+            else:
+                self.statistics.disk_hits += 1
+                self._remember(key, data)
+        return result
+
+    def put(self, key: str, root: Optional[Node], issues: List[Issue], source: Optional[Source] = None):
+        """Stores an AST and its issues with the given key. The nodes that originate from a parse tree are stored with
+        their position, and without their origin, but they're not changed. If they can't be pickled, nothing is
+        stored."""
+        try:
+            data = dump(root, issues, source)
+        except PICKLING_ERRORS:
+            with self._lock:
+                self.statistics.skips += 1
+            return
+        with self._lock:
+            self.statistics.stores += 1
+            self._remember(key, data)
+        if self.directory is not None:
+            self._write(key, data)
+
+    def discard(self, key: str):
+        """Removes the entry with the given key, if any."""
+        with self._lock:
+            data = self._memory.pop(key, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+            if self.directory is not None:
+                self._file_bytes -= self._file_index().pop(key, 0)
+                self._remove_file(key)
+
+    def clear(self):
+        """Removes all the entries, from memory and from the directory."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in self._file_index():
+                self._remove_file(key)
+            self._files.clear()
+            self._file_bytes = 0
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            self._memory_bytes -= len(self._memory.popitem(last=False)[1])
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + SUFFIX)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # The modification time of the files records their use, to evict the least recently used ones
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            files = self._file_index()
+            if key in files:
+                files.move_to_end(key)
+            else:
+                files[key] = len(data)
+                self._file_bytes += len(data)
+        return data
+
+    def _write(self, key: str, data: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            with replacing(self._path(key)) as file:
+                file.write(data)
+        except OSError:
+            return
+        with self._lock:
+            files = self._file_index()
+            self._file_bytes += len(data) - files.pop(key, 0)
+            files[key] = len(data)
+            while self._file_bytes > self.max_bytes and files:
+                evicted, size = files.popitem(last=False)
+                self._file_bytes -= size
+                self._remove_file(evicted)
+                self.statistics.evictions += 1
+
+    def _file_index(self) -> "OrderedDict[str, int]":
+        """The sizes of the entries in the directory, from the least to the most recently used, read the first time
+        they're needed."""
+        if self._files is None:
+            entries = []
+            if self.directory is not None and self.directory.is_dir():
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(SUFFIX):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime_ns, entry.name[:-len(SUFFIX)], stat.st_size))
+            entries.sort()
+            self._files = OrderedDict((key, size) for _, key, size in entries)
+            self._file_bytes = sum(self._files.values())
+        return self._files
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class ResultPickler(pickle.Pickler):
+    """Pickles an AST, replacing its source with a placeholder, so that it can be loaded for a different source with
+    the same content."""
+
+    def __init__(self, file, source: Optional[Source]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.source = source
+
+    def persistent_id(self, obj):
+        if obj is not None and obj is self.source:
+            return "source"
+        return None
+
+
+class ResultUnpickler(pickle.Unpickler):
+    def __init__(self, file, source: Optional[Source]):
+        super().__init__(file)
+        self.source = source
+
+    def persistent_load(self, pid):
+        if pid == "source":
+            return self.source
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
+
+
+def dump(root: Optional[Node], issues: List[Issue], source: Optional[Source]) -> bytes:
+    """Pickles an AST and its issues, storing the positions of the nodes originating from a parse tree in place of their
+    origin, which is restored afterwards."""
+    detached = []
+    if root is not None:
+        precompute_positions(root)
+        for node in walk(root):
+            origin = node.origin
+            if isinstance(origin, ParseTreeOrigin):
+                detached.append((node, origin, node.position_override))
+                if node.position_override is None:
+                    node.position_override = origin.position
+                node.origin = None
+    try:
+        buffer = io.BytesIO()
+        ResultPickler(buffer, source).dump((root, issues))
+        return buffer.getvalue()
+    finally:
+        for node, origin, position_override in detached:
+            node.origin = origin
+            node.position_override = position_override
+
+
+def load(data: bytes, source: Optional[Source]) -> Tuple[Optional[Node], List[Issue]]:
+    return ResultUnpickler(io.BytesIO(data), source).load()
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pylasu.model import Node, Point, Position, SourceText, walk
+from pylasu.parsing.parse_tree import ParseTreeOrigin
+
+
+@dataclass
+class TextEdit:
+    """A change to a text: the text at the given position is replaced with the given text. As in the Language Server
+    Protocol, each edit of a sequence refers to the text resulting from the previous ones."""
+    position: Position
+    text: str
+
+
+@dataclass
+class ChangedRegion:
+    """The region of a text changed by some edits: it starts at the same offset in the old and in the new text, and
+    what comes after its end, in either text, is the same."""
+    start: int
+    old_end: int
+    new_end: int
+
+
+def apply_edits(text: SourceText, edits: Sequence[TextEdit]) -> Tuple[SourceText, Optional[ChangedRegion]]:
+    """Applies edits to a text, in order, returning the new text and the region that they changed, or None if there
+    are no edits."""
+    old_length = len(text)
+    start = end = None
+    for edit in edits:
+        edit_start = text.offset_of(edit.position.start)
+        edit_end = text.offset_of(edit.position.end)
+        inserted_end = edit_start + len(edit.text)
+        text = text.replace(edit_start, edit_end, edit.text)
+        if start is None:
+            start, end = edit_start, inserted_end
+        else:
+            # The union of the region changed so far, as it is after this edit, and of the region changed by this edit
+            if end >= edit_end:
+                end += inserted_end - edit_end
+            elif end > edit_start:
+                end = inserted_end
+            start = min(start, edit_start)
+            end = max(end, inserted_end)
+    if start is None:
+        return text, None
+    return text, ChangedRegion(start, end - (len(text) - old_length), end)
+
+
+def first_ending_at_or_after(nodes: Sequence[Node], point: Point) -> int:
+    """The index of the first of a sequence of nodes, ordered by position, that ends at or after the given point."""
+    low, high = 0, len(nodes)
+    while low < high:
+        middle = (low + high) // 2
+        if nodes[middle].position.end < point:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def first_starting_after(nodes: Sequence[Node], point: Point) -> int:
+    """The index of the first of a sequence of nodes, ordered by position, that starts after the given point."""
+    low, high = 0, len(nodes)
+    while low < high:
+        middle = (low + high) // 2
+        if nodes[middle].position.start <= point:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class PointShift:
+    """Moves the points that come after the end of a changed region of a text, from where they were in the old text to
+    where they are in the new one. Points shared by several positions are moved only once, and stay shared."""
+
+    def __init__(self, old_end: Point, new_end: Point):
+        self.old_end = old_end
+        self.new_end = new_end
+        self.moved: Dict[int, Tuple[Point, Point]] = {}
+
+    @property
+    def lines(self) -> int:
+        return self.new_end.line - self.old_end.line
+
+    def __bool__(self):
+        return self.old_end != self.new_end
+
+    def point(self, point: Point) -> Point:
+        if point < self.old_end:
+            return point
+        entry = self.moved.get(id(point))
+        if entry is not None:
+            return entry[1]
+        if point.line == self.old_end.line:
+            moved = Point(self.new_end.line, point.column - self.old_end.column + self.new_end.column)
+        else:
+            moved = Point(point.line + self.lines, point.column)
+        # The old point is kept, so that its id is not reused
+        self.moved[id(point)] = (point, moved)
+        return moved
+
+    def position(self, position: Position) -> Position:
+        return Position.trusted(self.point(position.start), self.point(position.end), position.source)
+
+    def nodes(self, units: List[Node]):
+        """Moves the positions of the given nodes, which come after the changed region, and of their descendants. If
+        the number of lines didn't change, only the nodes starting on the line where the region ends are affected."""
+        if not self:
+            return
+        for unit in units:
+            if self.lines == 0 and unit.position.start.line != self.old_end.line:
+                break
+            for node in walk(unit):
+                if node.position_override is not None:
+                    node.position_override = self.position(node.position_override)
+                elif isinstance(node.origin, ParseTreeOrigin):
+                    position = node.origin.position
+                    if position is not None:
+                        node.origin._position = self.position(position)
@@ -1,25 +1,36 @@
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Optional, List, Sequence
+from typing import Dict, Optional, List, Sequence
 
 from antlr4 import ParserRuleContext, TerminalNode, Token
 from antlr4.tree.Tree import ParseTree
 
-from pylasu.model import Origin, Position, Point
-from pylasu.model.model import internal_property, Node
+from pylasu.model import Origin, Position, Point, walk
+from pylasu.model.model import compact_dataclass, internal_property, Node
 from pylasu.model.position import Source
+from pylasu.parsing.results import ParsingResultWithFirstStage
 from pylasu.support import extension_method
 
 import inspect
 
+_origins = threading.local()
 
-@dataclass
+
+@compact_dataclass
 class ParseTreeOrigin(Origin):
+    """The origin of a node built from a parse tree. The position is computed from the tokens of the parse tree the
+    first time it's requested, and then remembered."""
     parse_tree: ParseTree
     source: Source = None
+    _position: Optional[Position] = field(default=None, init=False, repr=False, compare=False)
 
     @internal_property
     def position(self) -> Optional[Position]:
-        return self.parse_tree.to_position(self.source)
+        position = self._position
+        if position is None or position.source is not self.source:
+            position = self._position = self.parse_tree.to_position(self.source)
+        return position
 
     @internal_property
     def source_text(self) -> Optional[str]:
@@ -45,10 +56,10 @@ Token.end_point = property(token_end_point)
 def to_position(self: ParserRuleContext, source: Source = None):
     # In case of an empty input, the start token will be EOF and the end token will be None
     if self.stop and self.start.start_point <= self.stop.end_point:
-        return Position(self.start.start_point, self.stop.end_point, source)
+        return Position.trusted(self.start.start_point, self.stop.end_point, source)
     else:
         # In case of parse errors, sometimes ANTLR inserts nodes that end before they start
-        return Position(self.start.start_point, self.start.end_point, source)
+        return Position.trusted(self.start.start_point, self.start.end_point, source)
 
 
 @extension_method(TerminalNode)
@@ -58,7 +69,80 @@ def to_position(self: TerminalNode, source: Source = None):
 
 @extension_method(Token)
 def to_position(self: Token, source: Source = None):
-    return Position(self.start_point, self.end_point, source)
+    return Position.trusted(self.start_point, self.end_point, source)
+
+
+class TokenPoints:
+    """Computes the start and end points of tokens, only once for each token, so that the positions of all the nodes
+    starting or ending with the same token share the same Point instances."""
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts: Dict[int, Point] = {}
+        self.ends: Dict[int, Point] = {}
+
+    def start(self, token: Token) -> Point:
+        index = token.tokenIndex
+        point = self.starts.get(index)
+        if point is None:
+            point = token_start_point(token)
+            # Tokens conjured by the error recovery of the parser have no index
+            if index >= 0:
+                self.starts[index] = point
+        return point
+
+    def end(self, token: Token) -> Point:
+        index = token.tokenIndex
+        point = self.ends.get(index)
+        if point is None:
+            point = self.start(token) if token.type == Token.EOF else self.start(token) + token.text
+            if index >= 0:
+                self.ends[index] = point
+        return point
+
+    def position(self, parse_tree: ParseTree, source: Source = None) -> Position:
+        """The position of a parse tree, computed like its to_position method would."""
+        if isinstance(parse_tree, ParserRuleContext):
+            start = self.start(parse_tree.start)
+            if parse_tree.stop:
+                end = self.end(parse_tree.stop)
+                if start <= end:
+                    return Position.trusted(start, end, source)
+            return Position.trusted(start, self.end(parse_tree.start), source)
+        elif isinstance(parse_tree, TerminalNode):
+            return Position.trusted(self.start(parse_tree.symbol), self.end(parse_tree.symbol), source)
+        else:
+            return parse_tree.to_position(source)
+
+
+def precompute_positions(root: Node):
+    """Computes the positions of all the nodes of an AST that originate from a parse tree, in a single walk, rather
+    than waiting for them to be requested one by one.
+
+    The end point of each token is computed only once, and nodes sharing a start or end token share the Point
+    instances, which saves memory on large trees."""
+    points = TokenPoints()
+    for node in walk(root):
+        origin = node.origin
+        if isinstance(origin, ParseTreeOrigin):
+            origin._position = points.position(origin.parse_tree, origin.source)
+
+
+def detach_parse_trees(result: ParsingResultWithFirstStage) -> ParsingResultWithFirstStage:
+    """Removes the parse tree from a parsing result, so that it can be pickled. The nodes built from the parse tree keep
+    their position, which is computed now, but lose their origin."""
+    result.first_stage = None
+    # The line index is not sent along with the code; the code is decoded first, if it wasn't already
+    result.code = result.code
+    result.text = None
+    if result.root is not None:
+        precompute_positions(result.root)
+        for node in walk(result.root):
+            if isinstance(node.origin, ParseTreeOrigin):
+                if node.position_override is None:
+                    node.position_override = node.origin.position
+                node.origin = None
+    return result
 
 
 @extension_method(ParseTree)
@@ -73,11 +157,38 @@ def get_original_text(self: ParserRuleContext) -> str:
     return self.start.getInputStream().getText(a, b)
 
 
+def parse_tree_origins_enabled() -> bool:
+    """Whether the nodes built from a parse tree in the current thread get a ParseTreeOrigin, see parse_tree_origins."""
+    return not getattr(_origins, "disabled", False)
+
+
+@contextmanager
+def parse_tree_origins(enabled: bool):
+    """Within this context, in the current thread, with_parse_tree and ParseTreeToASTTransformer give the nodes they
+    build a ParseTreeOrigin only if enabled is true. PylasuANTLRParser.parse disables them when it builds an AST without
+    positions (consider_range=False), so that no origin is created only to be removed afterwards. A ParseTreeOrigin
+    created directly is not affected; parse removes those with remove_origins."""
+    previous = getattr(_origins, "disabled", False)
+    _origins.disabled = not enabled
+    try:
+        yield
+    finally:
+        _origins.disabled = previous
+
+
+def remove_origins(root: Node):
+    """Removes the origins that the nodes of a tree have, e.g., those that were created directly while parse tree
+    origins were disabled. Only the nodes that have an origin are written to."""
+    for node in walk(root):
+        if node.origin is not None:
+            node.origin = None
+
+
 @extension_method(Node)
 def with_parse_tree(self: Node, parse_tree: Optional[ParseTree], source: Source = None):
-    """Set the origin of the AST node as a ParseTreeOrigin, providing the parse_tree is not None.
-If the parse_tree is None, no operation is performed."""
-    if parse_tree:
+    """Set the origin of the AST node as a ParseTreeOrigin, providing the parse_tree is not None and parse tree origins
+are enabled (see parse_tree_origins). Otherwise, no operation is performed."""
+    if parse_tree and not getattr(_origins, "disabled", False):
         self.origin = ParseTreeOrigin(parse_tree=parse_tree, source=source)
     return self
 
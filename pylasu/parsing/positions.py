@@ -0,0 +1,235 @@
+import re
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from antlr4 import ParserRuleContext, TerminalNode, Token
+from antlr4.Token import CommonToken
+from antlr4.tree.Tree import ParseTree
+
+from pylasu.model import Node, Point, Position, Source, SourceText, walk
+from pylasu.parsing.parse_tree import ParseTreeOrigin
+from pylasu.parsing.results import FirstStageParsingResult
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+COLUMNS = ("start_line", "start_column", "end_line", "end_column", "start_offset", "end_offset")
+# Stands for the tokens whose end point must be computed from their text, which is done separately
+PLACEHOLDER = CommonToken(type=Token.EOF)
+PLACEHOLDER.line = 1
+PLACEHOLDER.column = 0
+PLACEHOLDER.start = 0
+PLACEHOLDER.stop = -1
+
+
+@dataclass
+class PositionTable:
+    """The positions of a sequence of elements (AST nodes or parse trees), in columnar form: the start line of the i-th
+    element is start_line[i], and so on. The columns are NumPy arrays if NumPy is used, arrays from the array module
+    otherwise. Offsets are character offsets in the parsed text, end excluded; they're -1 for the elements whose
+    position could not be computed from the text, such as tokens inserted by the error recovery of the parser."""
+    elements: List[Any]
+    start_line: Sequence[int]
+    start_column: Sequence[int]
+    end_line: Sequence[int]
+    end_column: Sequence[int]
+    start_offset: Sequence[int]
+    end_offset: Sequence[int]
+    sources: List[Optional[Source]] = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def position(self, i: int) -> Position:
+        return Position.trusted(
+            Point(int(self.start_line[i]), int(self.start_column[i])),
+            Point(int(self.end_line[i]), int(self.end_column[i])),
+            self.sources[i] if self.sources else None)
+
+    def columns(self) -> Dict[str, Sequence[int]]:
+        """The columns of the table by name, e.g., to export them."""
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def apply(self):
+        """Stores the positions in the origins of the AST nodes in the table, so that they're not computed again."""
+        for i, element in enumerate(self.elements):
+            if isinstance(element, Node) and isinstance(element.origin, ParseTreeOrigin):
+                element.origin._position = self.position(i)
+
+
+def compute_positions(tree: Union[Node, ParseTree, FirstStageParsingResult],
+                      use_numpy: Optional[bool] = None) -> PositionTable:
+    """Computes the positions of all the elements of a tree at once.
+
+    Given an AST, the elements are its nodes originating from a parse tree (see ParseTreeOrigin), in the order of walk.
+    Given a parse tree, or a first stage parsing result, they're the rule contexts and terminal nodes of the parse
+    tree, in pre-order. The result is the same as the to_position method of each parse tree, but, rather than adding
+    the text of each token to its start point, the end points are looked up in a line index of the whole text, with a
+    single vectorized pass if NumPy is used.
+
+    :param tree: the tree.
+    :param use_numpy: whether to use NumPy; by default, it's used if it's installed.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError("NumPy is not installed")
+    elements, parse_trees, sources = collect_parse_trees(tree)
+    columns = TokenBoundaries(parse_trees)
+    if use_numpy:
+        table = columns.compute_with_numpy()
+    else:
+        table = columns.compute()
+    for i in columns.unresolved:
+        position = parse_trees[i].to_position()
+        for name, value in zip(COLUMNS, (position.start.line, position.start.column, position.end.line,
+                                         position.end.column, -1, -1)):
+            table[name][i] = value
+    return PositionTable(elements, **table, sources=sources)
+
+
+def collect_parse_trees(tree: Union[Node, ParseTree, FirstStageParsingResult]):
+    if isinstance(tree, FirstStageParsingResult):
+        tree = tree.root
+    if isinstance(tree, Node):
+        elements = []
+        parse_trees = []
+        sources = []
+        for node in walk(tree):
+            origin = node.origin
+            if isinstance(origin, ParseTreeOrigin):
+                elements.append(node)
+                parse_trees.append(origin.parse_tree)
+                sources.append(origin.source)
+        return elements, parse_trees, sources
+    parse_trees = []
+    stack = [tree] if tree is not None else []
+    while stack:
+        parse_tree = stack.pop()
+        parse_trees.append(parse_tree)
+        if isinstance(parse_tree, ParserRuleContext) and parse_tree.children:
+            stack.extend(reversed(parse_tree.children))
+    return parse_trees, parse_trees, []
+
+
+class TokenBoundaries:
+    """The start and stop tokens of a sequence of parse trees, in columnar form."""
+
+    def __init__(self, parse_trees: Sequence[ParseTree]):
+        starts = []
+        stops = []
+        for parse_tree in parse_trees:
+            if isinstance(parse_tree, ParserRuleContext):
+                starts.append(parse_tree.start)
+                # In case of an empty input, the start token will be EOF and the stop token will be None
+                stops.append(parse_tree.stop or parse_tree.start)
+            elif isinstance(parse_tree, TerminalNode):
+                starts.append(parse_tree.symbol)
+                stops.append(parse_tree.symbol)
+            else:
+                starts.append(None)
+                stops.append(None)
+        self.unresolved = [i for i, (start, stop) in enumerate(zip(starts, stops))
+                           if not resolvable(start) or not resolvable(stop)]
+        self.text = next((start.getInputStream().strdata for start in starts if resolvable(start)), "")
+        for i in self.unresolved:
+            starts[i] = stops[i] = PLACEHOLDER
+        self.start_line = [token.line for token in starts]
+        self.start_column = [token.column for token in starts]
+        self.start_begin = [token.start for token in starts]
+        self.start_end = [token.stop + 1 for token in starts]
+        self.stop_line = [token.line for token in stops]
+        self.stop_column = [token.column for token in stops]
+        self.stop_begin = [token.start for token in stops]
+        self.stop_end = [token.stop + 1 for token in stops]
+
+    def compute(self) -> Dict[str, array]:
+        line_starts = SourceText(self.text).line_starts
+        line_breaks_split = split_line_breaks(self.text)
+
+        def end_points(lines, columns, begins, ends):
+            end_line = array("q")
+            end_column = array("q")
+            for line, column, begin, end in zip(lines, columns, begins, ends):
+                begin_line = bisect_right(line_starts, begin)
+                last_line = bisect_right(line_starts, end)
+                i = bisect_right(line_breaks_split, end)
+                if i and line_breaks_split[i - 1] == end:
+                    end_line.append(line + last_line + 1 - begin_line)
+                    end_column.append(0)
+                elif last_line == begin_line:
+                    end_line.append(line)
+                    end_column.append(column + end - begin)
+                else:
+                    end_line.append(line + last_line - begin_line)
+                    end_column.append(end - line_starts[last_line - 1])
+            return end_line, end_column
+
+        start_end_line, start_end_column = end_points(
+            self.start_line, self.start_column, self.start_begin, self.start_end)
+        stop_end_line, stop_end_column = end_points(self.stop_line, self.stop_column, self.stop_begin, self.stop_end)
+        table = {name: array("q") for name in COLUMNS}
+        for i, (line, column) in enumerate(zip(self.start_line, self.start_column)):
+            # In case of parse errors, sometimes ANTLR inserts nodes that end before they start
+            stop_end = stop_end_line[i], stop_end_column[i]
+            ends_after_start = (line, column) <= stop_end
+            table["start_line"].append(line)
+            table["start_column"].append(column)
+            table["end_line"].append(stop_end[0] if ends_after_start else start_end_line[i])
+            table["end_column"].append(stop_end[1] if ends_after_start else start_end_column[i])
+            table["start_offset"].append(self.start_begin[i])
+            table["end_offset"].append(self.stop_end[i] if ends_after_start else self.start_end[i])
+        return table
+
+    def compute_with_numpy(self) -> Dict[str, Any]:
+        line_starts = numpy.frombuffer(SourceText(self.text).line_starts, dtype=numpy.int64)
+        line_breaks_split = numpy.array(split_line_breaks(self.text), dtype=numpy.int64)
+
+        def end_points(line, column, begin, end):
+            begin_line = numpy.searchsorted(line_starts, begin, side="right")
+            last_line = numpy.searchsorted(line_starts, end, side="right")
+            i = numpy.searchsorted(line_breaks_split, end, side="right")
+            split = (i > 0) & (line_breaks_split[numpy.maximum(i - 1, 0)] == end) if len(line_breaks_split) \
+                else numpy.zeros(len(end), dtype=bool)
+            end_line = line + last_line - begin_line + split
+            end_column = numpy.where(
+                split, 0, numpy.where(last_line == begin_line, column + end - begin, end - line_starts[last_line - 1]))
+            return end_line, end_column
+
+        start_line = numpy.array(self.start_line, dtype=numpy.int64)
+        start_column = numpy.array(self.start_column, dtype=numpy.int64)
+        start_begin = numpy.array(self.start_begin, dtype=numpy.int64)
+        start_end = numpy.array(self.start_end, dtype=numpy.int64)
+        stop_end = numpy.array(self.stop_end, dtype=numpy.int64)
+        start_end_line, start_end_column = end_points(start_line, start_column, start_begin, start_end)
+        stop_end_line, stop_end_column = end_points(
+            numpy.array(self.stop_line, dtype=numpy.int64), numpy.array(self.stop_column, dtype=numpy.int64),
+            numpy.array(self.stop_begin, dtype=numpy.int64), stop_end)
+        # In case of parse errors, sometimes ANTLR inserts nodes that end before they start
+        ends_after_start = \
+            (start_line < stop_end_line) | ((start_line == stop_end_line) & (start_column <= stop_end_column))
+        return {
+            "start_line": start_line,
+            "start_column": start_column,
+            "end_line": numpy.where(ends_after_start, stop_end_line, start_end_line),
+            "end_column": numpy.where(ends_after_start, stop_end_column, start_end_column),
+            "start_offset": start_begin,
+            "end_offset": numpy.where(ends_after_start, stop_end, start_end),
+        }
+
+
+def resolvable(token: Optional[Token]) -> bool:
+    """Whether the end point of the token can be computed from its offsets in the text: that's not the case for tokens
+    conjured by the error recovery of the parser, or whose text was changed by the lexer."""
+    return token is not None and token.start >= 0 and token._text is None \
+        and (token.type == Token.EOF or token.stop >= token.start)
+
+
+def split_line_breaks(text: str) -> List[int]:
+    """The offsets between the \\r and the \\n of each \\r\\n line break. A text ending there ends with a \\r, so, like
+    Point.__add__ would, we consider that it ends at the start of the next line."""
+    return [match.start() + 1 for match in re.finditer("\r\n", text)]
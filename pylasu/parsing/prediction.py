@@ -0,0 +1,300 @@
+import importlib.metadata
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from antlr4 import ParserATNSimulator, PredictionContextCache
+from antlr4.PredictionContext import ArrayPredictionContext, PredictionContext, SingletonPredictionContext, \
+    calculateHashCode, calculateListsHashCode
+from antlr4.atn.ATN import ATN
+from antlr4.atn.ATNState import ATNState
+from antlr4.atn.LexerActionExecutor import LexerActionExecutor
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.dfa.DFA import DFA
+
+
+@dataclass
+class PredictionCachePolicy:
+    """When a PylasuANTLRParser resets the caches that its ANTLR parsers use to predict alternatives, i.e., the DFA of
+    each decision and the PredictionContextCache. The caches make parsing fast once they're warm, but they only grow,
+    with the variety of the inputs; in a long-running process, a policy bounds the memory they take. Limits are checked
+    before each parse, so a reset never happens during a parse; the default policy never resets the caches.
+
+    :param max_dfa_states: the maximum number of DFA states, over all the decisions.
+    :param max_prediction_contexts: the maximum number of entries of the PredictionContextCache.
+    :param max_age: the maximum time, in seconds, between resets.
+    :param reset_after_parses: reset after this many parses.
+    :param reset_after_characters: reset after parsing this many characters (bytes, for ASCII text).
+    :param count_predictions: whether to count the predictions that found their answer in the DFA, to estimate the hit
+    ratio of the cache (see PredictionCacheStatistics). It costs a bit of time on each prediction, so it's off by
+    default.
+    """
+    max_dfa_states: Optional[int] = None
+    max_prediction_contexts: Optional[int] = None
+    max_age: Optional[float] = None
+    reset_after_parses: Optional[int] = None
+    reset_after_characters: Optional[int] = None
+    count_predictions: bool = False
+
+
+@dataclass(frozen=True)
+class PredictionCacheStatistics:
+    """A snapshot of the prediction caches of a PylasuANTLRParser. Counts refer to the time since the last reset."""
+    dfa_states: Dict[int, int] = field(default_factory=dict)
+    """The number of DFA states of each decision that has some."""
+    prediction_contexts: int = 0
+    parses: int = 0
+    characters: int = 0
+    age: float = 0.0
+    """The time since the last reset, in seconds."""
+    resets: int = 0
+    predictions: Optional[int] = None
+    """The number of predictions, if they're counted (see PredictionCachePolicy.count_predictions)."""
+    misses: Optional[int] = None
+    """The number of predictions that had to simulate the ATN, because the DFA didn't have the answer yet."""
+
+    @property
+    def total_dfa_states(self) -> int:
+        return sum(self.dfa_states.values())
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        """An estimate of the fraction of predictions answered by the DFA alone, if predictions are counted."""
+        if not self.predictions:
+            return None
+        return 1 - self.misses / self.predictions
+
+
+class PredictionCaches:
+    """The DFA and the PredictionContextCache shared by the ANTLR parsers of a PylasuANTLRParser, with the counters that
+    its PredictionCachePolicy needs. It's thread-safe: a reset replaces the caches, while the parsers already running
+    keep using the previous ones."""
+
+    def __init__(self, policy: PredictionCachePolicy, prediction_context_cache: PredictionContextCache):
+        self.policy = policy
+        self.prediction_context_cache = prediction_context_cache
+        self.decision_to_dfa: Optional[List[DFA]] = None
+        self.lexer_decision_to_dfa: Optional[List[DFA]] = None
+        self.parses = 0
+        self.characters = 0
+        self.resets = 0
+        self.predictions = 0
+        self.misses = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent to another process, e.g., with the parser, the caches start empty there
+        return self.policy
+
+    def __setstate__(self, policy):
+        self.__init__(policy, PredictionContextCache())
+
+    def lexer_dfa(self, atn: ATN) -> List[DFA]:
+        """The DFA of the lexer, which, unlike the one of the parser, is not reset, because it's bounded by the size of
+        the lexer grammar rather than by the variety of the inputs."""
+        with self._lock:
+            if self.lexer_decision_to_dfa is None:
+                self.lexer_decision_to_dfa = new_dfa(atn)
+            return self.lexer_decision_to_dfa
+
+    def acquire(self, atn: ATN, characters: int):
+        """Accounts for a new parse of the given number of characters, resetting the caches first if the policy
+        requires it, and returns the DFA and PredictionContextCache that it must use."""
+        with self._lock:
+            if self.decision_to_dfa is None:
+                self.decision_to_dfa = new_dfa(atn)
+            elif self._must_reset():
+                self._reset(atn)
+            self.parses += 1
+            self.characters += characters
+            return self.decision_to_dfa, self.prediction_context_cache
+
+    def reset(self):
+        with self._lock:
+            self._reset(None)
+
+    def install(self, lexer_decision_to_dfa: List[DFA], decision_to_dfa: List[DFA],
+                prediction_context_cache: PredictionContextCache):
+        """Replaces the caches with the given ones, e.g., loaded from a file, as a reset would."""
+        with self._lock:
+            self._reset(None)
+            self.lexer_decision_to_dfa = lexer_decision_to_dfa
+            self.decision_to_dfa = decision_to_dfa
+            self.prediction_context_cache = prediction_context_cache
+
+    def install_prediction_context_cache(self, prediction_context_cache: PredictionContextCache):
+        """Replaces only the PredictionContextCache, e.g., to free the contexts that it has accumulated, keeping the
+        DFA. The parsers already running keep using the previous one."""
+        with self._lock:
+            self.prediction_context_cache = prediction_context_cache
+
+    def count_prediction(self, missed: bool):
+        """Accounts for a prediction of a parser, which missed the DFA if it had to compute states of it. Parsers may
+        predict in several threads at once, so the counters are updated under the lock."""
+        with self._lock:
+            self.predictions += 1
+            if missed:
+                self.misses += 1
+
+    def _reset(self, atn: Optional[ATN]):
+        self.decision_to_dfa = new_dfa(atn) if atn is not None else None
+        self.prediction_context_cache = PredictionContextCache()
+        self.parses = self.characters = self.predictions = self.misses = 0
+        self.started = time.monotonic()
+        self.resets += 1
+
+    def _must_reset(self) -> bool:
+        policy = self.policy
+        return (policy.reset_after_parses is not None and self.parses >= policy.reset_after_parses) \
+            or (policy.reset_after_characters is not None and self.characters >= policy.reset_after_characters) \
+            or (policy.max_age is not None and time.monotonic() - self.started >= policy.max_age) \
+            or (policy.max_prediction_contexts is not None
+                and len(self.prediction_context_cache.cache) > policy.max_prediction_contexts) \
+            or (policy.max_dfa_states is not None
+                and sum(len(dfa._states) for dfa in self.decision_to_dfa) > policy.max_dfa_states)
+
+    def statistics(self) -> PredictionCacheStatistics:
+        with self._lock:
+            counted = self.policy.count_predictions
+            return PredictionCacheStatistics(
+                {dfa.decision: len(dfa._states) for dfa in self.decision_to_dfa or [] if dfa._states},
+                len(self.prediction_context_cache.cache), self.parses, self.characters,
+                time.monotonic() - self.started, self.resets, self.predictions if counted else None,
+                self.misses if counted else None)
+
+
+def antlr_runtime_version() -> str:
+    try:
+        return importlib.metadata.version("antlr4-python3-runtime")
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def new_dfa(atn: ATN) -> List[DFA]:
+    """Empty DFA for the decisions of an ATN, as the generated parsers create them."""
+    return [DFA(state, i) for i, state in enumerate(atn.decisionToState)]
+
+
+class CountingParserATNSimulator(ParserATNSimulator):
+    """A ParserATNSimulator that counts its predictions, and those that couldn't be answered by the DFA alone, in its
+    PredictionCaches."""
+
+    def __init__(self, parser, atn, decision_to_dfa, prediction_context_cache, caches: PredictionCaches):
+        super().__init__(parser, atn, decision_to_dfa, prediction_context_cache)
+        self.caches = caches
+        self._missed = False
+
+    def adaptivePredict(self, input, decision, outerContext):
+        self._missed = False
+        try:
+            return super().adaptivePredict(input, decision, outerContext)
+        finally:
+            self.caches.count_prediction(self._missed)
+
+    def computeStartState(self, p, ctx, fullCtx):
+        self._missed = True
+        return super().computeStartState(p, ctx, fullCtx)
+
+    def computeTargetState(self, dfa, previousD, t):
+        self._missed = True
+        return super().computeTargetState(dfa, previousD, t)
+
+
+class DFAPickler(pickle.Pickler):
+    """Pickles the DFA of a parser, referring to the states of its ATN, and to the singletons of the ANTLR runtime, by
+    identifier, so that they're not copied."""
+
+    def __init__(self, file: BinaryIO):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+
+    def persistent_id(self, obj):
+        if isinstance(obj, ATNState):
+            return "state", obj.stateNumber
+        elif obj is PredictionContext.EMPTY:
+            return "empty context", None
+        elif obj is SemanticContext.NONE:
+            return "no semantic context", None
+        elif obj is ParserATNSimulator.ERROR:
+            return "error state", None
+        return None
+
+
+class DFAUnpickler(pickle.Unpickler):
+    def __init__(self, file: BinaryIO, atn: ATN):
+        super().__init__(file)
+        self.atn = atn
+
+    def persistent_load(self, pid):
+        kind, value = pid
+        if kind == "state":
+            return self.atn.states[value]
+        elif kind == "empty context":
+            return PredictionContext.EMPTY
+        elif kind == "no semantic context":
+            return SemanticContext.NONE
+        elif kind == "error state":
+            return ParserATNSimulator.ERROR
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
+
+
+def dump_dfa(decision_to_dfa: List[DFA], file: BinaryIO):
+    """Writes the states of the DFA of each decision (of a parser, or of each mode of a lexer) to a file. The hash codes
+    cached in the states are recomputed when they're loaded, because they depend on the process, since ANTLR hashes
+    strings."""
+    DFAPickler(file).dump([(dfa.s0, list(dfa._states)) for dfa in decision_to_dfa])
+
+
+def load_dfa(atn: ATN, file: BinaryIO) -> Tuple[List[DFA], PredictionContextCache]:
+    """Reads the DFA of each decision of an ATN from a file written by dump_dfa, and returns it with a
+    PredictionContextCache of the contexts that it refers to."""
+    entries = DFAUnpickler(file, atn).load()
+    decision_to_dfa = new_dfa(atn)
+    if len(entries) != len(decision_to_dfa):
+        raise ValueError(f"The file has {len(entries)} decisions rather than {len(decision_to_dfa)}")
+    prediction_context_cache = PredictionContextCache()
+    contexts = [config.context for _, states in entries for state in states for config in state.configs.configs]
+    for context in rehash_prediction_contexts(contexts):
+        prediction_context_cache.add(context)
+    for dfa, (s0, states) in zip(decision_to_dfa, entries):
+        for state in states:
+            rehash_lexer_action_executor(state.lexerActionExecutor)
+            for config in state.configs.configs:
+                rehash_lexer_action_executor(getattr(config, "lexerActionExecutor", None))
+            # Computed again from the contexts when it's needed
+            state.configs.cachedHashCode = -1
+        if s0 is not None:
+            dfa.s0 = s0
+        dfa._states = {state: state for state in states}
+    return decision_to_dfa, prediction_context_cache
+
+
+def rehash_lexer_action_executor(executor: Optional[LexerActionExecutor]):
+    if executor is not None:
+        executor.hashCode = hash("".join([str(action) for action in executor.lexerActions]))
+
+
+def rehash_prediction_contexts(contexts: List[PredictionContext]) -> List[PredictionContext]:
+    """Computes again the hash codes of the given prediction contexts and of their ancestors, parents first, and returns
+    them all, in that order."""
+    done = {id(PredictionContext.EMPTY)}
+    ordered = []
+    stack = [(context, False) for context in contexts if context is not None]
+    while stack:
+        context, parents_done = stack.pop()
+        if id(context) in done:
+            continue
+        parents = context.parents if isinstance(context, ArrayPredictionContext) else [context.parentCtx]
+        if not parents_done:
+            stack.append((context, True))
+            stack.extend((parent, False) for parent in parents if parent is not None and id(parent) not in done)
+            continue
+        done.add(id(context))
+        if isinstance(context, ArrayPredictionContext):
+            context.cachedHashCode = calculateListsHashCode(context.parents, context.returnStates)
+        elif isinstance(context, SingletonPredictionContext):
+            context.cachedHashCode = calculateHashCode(context.parentCtx, context.returnState)
+        ordered.append(context)
+    return ordered
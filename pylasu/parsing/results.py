@@ -1,7 +1,12 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 
+from antlr4.atn.PredictionMode import PredictionMode
+
 from pylasu.model import Source, Node
+from pylasu.model.position import SourceText
+from pylasu.parsing.timing import ParsingTimings
+from pylasu.parsing.tokens import TokenColumns
 from pylasu.validation.validation import Issue
 
 
@@ -13,13 +18,56 @@ class FirstStageParsingResult:
     time: int = None
     lexing_time: int = None
     source: Source = None
+    # The prediction mode in which the parser produced the root, see PylasuANTLRParser.two_stage_prediction
+    prediction_mode: Optional[PredictionMode] = None
+    # The time spent in each phase, in nanoseconds; time and lexing_time are the same, in milliseconds
+    timings: Optional[ParsingTimings] = None
+
+
+@dataclass
+class TokenizationResult:
+    issues: List[Issue]
+    tokens: TokenColumns
+    code: Optional[str] = None
+    time: int = None
+    source: Source = None
+    # The time spent lexing, in nanoseconds, as lexing and total; time is the same, in milliseconds
+    timings: Optional[ParsingTimings] = None
 
 
 @dataclass
 class ParsingResultWithFirstStage:
     issues: List[Issue] = field(default_factory=list)
     root: Node = None
-    code: str = None
+    # The parsed code, see code; not compared nor shown, since it may have to be decoded from text first
+    _code: Optional[str] = field(default=None, repr=False, compare=False)
     time: int = None
     first_stage: FirstStageParsingResult = None
     source: Source = None
+    # The time spent in each phase, in nanoseconds; None if the result doesn't come from parse, e.g., from a ParseCache
+    timings: Optional[ParsingTimings] = None
+    # The parsed code as a SourceText, if it's known, e.g., when it was read from a file
+    text: Optional[SourceText] = field(default=None, repr=False, compare=False)
+
+    @property
+    def code(self) -> Optional[str]:
+        """The parsed code. When it's the whole text of a SourceText, e.g., read from a file, it's only decoded when
+        it's read."""
+        if self._code is None and self.text is not None:
+            self._code = self.text.text
+        return self._code
+
+    @code.setter
+    def code(self, code: Optional[str]):
+        self._code = code
+
+    @property
+    def line_index(self) -> Optional[SourceText]:
+        """The parsed code, indexed by line, to convert between offsets and points."""
+        text = self.text
+        if text is not None and (self._code is None or text._text is self._code):
+            return text
+        if self._code is None:
+            return None
+        self.text = SourceText(self._code)
+        return self.text
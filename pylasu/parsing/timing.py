@@ -0,0 +1,74 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from pylasu.model import Source
+
+LEXING = "lexing"
+PARSING = "parsing"
+VERIFICATION = "verification"
+PARSE_TREE_TO_AST = "parse_tree_to_ast"
+ASSIGN_PARENTS = "assign_parents"
+POST_PROCESS_AST = "post_process_ast"
+POSITIONS = "positions"
+
+
+@dataclass
+class ParsingTimings:
+    """The time spent in each phase of parsing, in nanoseconds, or None for the phases that didn't run. Lexing is only
+    measured on its own if requested (see measure_lexing_time); otherwise, it's part of parsing, since the parser pulls
+    tokens from the lexer as it needs them. Positions is the time spent precomputing positions, if requested."""
+    lexing: Optional[int] = None
+    parsing: Optional[int] = None
+    verification: Optional[int] = None
+    parse_tree_to_ast: Optional[int] = None
+    assign_parents: Optional[int] = None
+    post_process_ast: Optional[int] = None
+    positions: Optional[int] = None
+    total: Optional[int] = None
+
+
+class ParsingPhaseListener:
+    """Receives an event at the start and at the end of each phase of parsing (see the constants in this module, which
+    are also the names of the fields of ParsingTimings), e.g., to feed a profiler or a tracing system. Register it with
+    PylasuANTLRParser.add_phase_listener. The methods are called in the thread that parses, and they should be quick,
+    since their time counts in the phases."""
+
+    def phase_started(self, phase: str, source: Optional[Source]):
+        pass
+
+    def phase_ended(self, phase: str, source: Optional[Source], nanoseconds: int):
+        pass
+
+
+class PhaseTimer:
+    """Measures the phases of a parse, one at a time, recording their durations in a ParsingTimings and notifying the
+    listeners, if any. Use it as a context manager, e.g., with timer(PARSING): ..., so that a phase ends, and the
+    listeners are notified, even if it raises."""
+    __slots__ = ("timings", "listeners", "source", "phase", "started")
+
+    def __init__(self, timings: ParsingTimings, listeners: List[ParsingPhaseListener], source: Optional[Source]):
+        self.timings = timings
+        self.listeners = listeners
+        self.source = source
+        self.phase = None
+        self.started = 0
+
+    def __call__(self, phase: str) -> "PhaseTimer":
+        self.phase = phase
+        return self
+
+    def __enter__(self):
+        if self.listeners:
+            for listener in self.listeners:
+                listener.phase_started(self.phase, self.source)
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter_ns() - self.started
+        setattr(self.timings, self.phase, elapsed)
+        if self.listeners:
+            for listener in self.listeners:
+                listener.phase_ended(self.phase, self.source, elapsed)
+        return False
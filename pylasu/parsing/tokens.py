@@ -0,0 +1,187 @@
+from array import array
+from typing import Dict, Optional
+
+from antlr4 import Lexer, LexerATNSimulator, Token
+from antlr4.Token import CommonToken
+from antlr4.CommonTokenFactory import TokenFactory
+from antlr4.atn.LexerAction import LexerChannelAction, LexerModeAction, LexerPopModeAction, LexerPushModeAction, \
+    LexerSkipAction, LexerTypeAction
+from antlr4.dfa.DFAState import DFAState
+
+from pylasu.parsing.prediction import antlr_runtime_version
+
+# The lexer actions that only change the type, channel or mode of the token being emitted, which scan can execute
+SIMPLE_ACTIONS = (LexerChannelAction, LexerModeAction, LexerPopModeAction, LexerPushModeAction, LexerSkipAction,
+                  LexerTypeAction)
+# The versions of the ANTLR runtime whose internals (the DFA of the lexer and its private fields) scan has been tested
+# with; with any other version, it leaves all the tokens to nextToken
+FAST_PATH_RUNTIME_VERSIONS = ("4.13.2",)
+RUNTIME_VERSION = antlr_runtime_version()
+
+
+class TokenColumns:
+    """The tokens produced by a lexer, stored as columns of integers rather than as one CommonToken per token: their
+    types, channels, start and stop offsets (both inclusive, as in ANTLR), lines and columns. Each token takes a few
+    dozens of bytes, and the columns can be handed over to array-based code as they are. The text of a token is the one
+    between its offsets, unless a lexer action has replaced it (see texts). The EOF token is not included."""
+    __slots__ = ("types", "channels", "starts", "stops", "lines", "columns", "texts")
+
+    def __init__(self):
+        self.types = array("i")
+        self.channels = array("i")
+        self.starts = array("q")
+        self.stops = array("q")
+        self.lines = array("i")
+        self.columns = array("i")
+        self.texts: Dict[int, str] = {}
+        """The text of the tokens whose text was set by the lexer, by index."""
+
+    def __len__(self):
+        return len(self.types)
+
+    def append(self, type: int, channel: int, start: int, stop: int, line: int, column: int,
+               text: Optional[str] = None):
+        if text is not None:
+            self.texts[len(self.types)] = text
+        self.types.append(type)
+        self.channels.append(channel)
+        self.starts.append(start)
+        self.stops.append(stop)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def text(self, index: int, code: str) -> str:
+        """The text of the token at the given index, in the given code, which is the one that was tokenized."""
+        text = self.texts.get(index)
+        if text is not None:
+            return text
+        return code[self.starts[index]:self.stops[index] + 1]
+
+    def token(self, index: int, code: Optional[str] = None) -> CommonToken:
+        """The token at the given index, as a CommonToken without a source, e.g., to use it with an API that requires
+        one. Its text is read from the given code, if any, which is the one that was tokenized."""
+        token = CommonToken(type=self.types[index], channel=self.channels[index], start=self.starts[index],
+                            stop=self.stops[index])
+        token.line = self.lines[index]
+        token.column = self.columns[index]
+        token.tokenIndex = index
+        token.text = self.text(index, code) if code is not None else self.texts.get(index)
+        return token
+
+
+class TokenColumnsFactory(TokenFactory):
+    """A token factory that records the tokens that a lexer creates in TokenColumns. It doesn't create a token each
+    time: it returns the same one, with only its type and channel updated, which is all that the lexer and the loop
+    calling nextToken need."""
+    __slots__ = ("columns", "token")
+
+    def __init__(self, columns: TokenColumns):
+        self.columns = columns
+        self.token = CommonToken()
+
+    def create(self, source, type: int, text: str, channel: int, start: int, stop: int, line: int, column: int):
+        if type != Token.EOF:
+            self.columns.append(type, channel, start, stop, line, column, text)
+        token = self.token
+        token.type = type
+        token.channel = channel
+        return token
+
+    def createThin(self, type: int, text: str):
+        token = CommonToken(type=type)
+        token.text = text
+        return token
+
+
+def scan(lexer: Lexer, tokens: TokenColumns, factory: TokenColumnsFactory):
+    """Records all the tokens of a lexer in TokenColumns, whose factory the lexer must use. As long as the DFA of the
+    lexer knows the way, it's followed directly over the characters of the input, without the method calls that
+    nextToken makes for each character; any other token (one that the DFA doesn't know yet, a lexical error, one at the
+    end of the input, or one with actions other than setting the type, channel or mode) is left to nextToken, so the
+    tokens and the errors are the same. Lexers that override how tokens are emitted, and versions of the runtime other
+    than FAST_PATH_RUNTIME_VERSIONS, always use nextToken."""
+    if fast_path_applies(lexer):
+        input_stream = lexer._input
+        interp = lexer._interp
+        data, size, skip = input_stream.data, input_stream.size, Lexer.SKIP
+        while input_stream._index < size:
+            start, line, column = input_stream._index, interp.line, interp.column
+            match = match_in_dfa(interp.decisionToDFA[lexer._mode].s0, data, start, size, line, column)
+            if match is None or not accept(lexer, match[0]):
+                if next_token(lexer, tokens, factory):
+                    return
+                continue
+            state, end, interp.line, interp.column = match
+            input_stream._index = end
+            token_type = lexer._type if state.lexerActionExecutor is not None else state.prediction
+            if token_type != skip:
+                tokens.append(token_type, lexer._channel, start, end - 1, line, column)
+    while not next_token(lexer, tokens, factory):
+        pass
+
+
+def fast_path_applies(lexer: Lexer) -> bool:
+    if RUNTIME_VERSION not in FAST_PATH_RUNTIME_VERSIONS:
+        return False
+    lexer_class = type(lexer)
+    return lexer_class.nextToken is Lexer.nextToken and lexer_class.emit is Lexer.emit \
+        and lexer_class.emitToken is Lexer.emitToken and type(lexer._interp) is LexerATNSimulator \
+        and hasattr(lexer._input, "data")
+
+
+def match_in_dfa(state: Optional[DFAState], data, index: int, size: int, line: int, column: int):
+    """Follows the edges of the DFA of a lexer from its start state, returning the last accept state, with the offset,
+    line and column after it, unless the DFA doesn't know where some character leads, the input ends first, or the
+    token would be empty."""
+    if state is None:
+        return None
+    error = LexerATNSimulator.ERROR
+    max_edge = LexerATNSimulator.MAX_DFA_EDGE
+    accepted = None
+    while index < size:
+        character = data[index]
+        edges = state.edges
+        if edges is None or character > max_edge:
+            return None
+        state = edges[character]
+        if state is None:
+            return None
+        if state is error:
+            return accepted
+        index += 1
+        if character == 10:
+            line += 1
+            column = 0
+        else:
+            column += 1
+        if state.isAcceptState:
+            accepted = (state, index, line, column)
+    return None
+
+
+def accept(lexer: Lexer, state: DFAState) -> bool:
+    """Executes the actions of an accept state of the DFA of a lexer, as the lexer would, if they're all simple."""
+    executor = state.lexerActionExecutor
+    if executor is None:
+        lexer._channel = Token.DEFAULT_CHANNEL
+        return True
+    actions = executor.lexerActions
+    if not all(type(action) in SIMPLE_ACTIONS for action in actions):
+        return False
+    lexer._type = Token.INVALID_TYPE
+    lexer._channel = Token.DEFAULT_CHANNEL
+    for action in actions:
+        action.execute(lexer)
+    if lexer._type == Token.INVALID_TYPE:
+        lexer._type = state.prediction
+    return True
+
+
+def next_token(lexer: Lexer, tokens: TokenColumns, factory: TokenColumnsFactory) -> bool:
+    """Records the next token of a lexer, returning whether it's EOF."""
+    token = lexer.nextToken()
+    if token.type == Token.EOF:
+        return True
+    if token is not factory.token:
+        tokens.append(token.type, token.channel, token.start, token.stop, token.line, token.column, token._text)
+    return False
@@ -1,8 +1,15 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
 from pylasu.model.model import Concept
 
 
 def register_internal_property(cls, name):
     cls.__internal_properties__.append(name)
+    cls.invalidate_features()
     for s in cls.__subclasses__():
         register_internal_property(s, name)
 
@@ -19,3 +26,17 @@ def extension_method(cls):
             register_internal_property(cls, name)
         return func
     return decorator
+
+
+@contextmanager
+def replacing(path: Path) -> Iterator[BinaryIO]:
+    """Opens a temporary file, in the directory of the given path, which replaces the file at that path once it's been
+    written, so that other processes never read a partial file. If writing fails, the temporary file is removed."""
+    descriptor, temporary = tempfile.mkstemp(path.suffix + ".tmp", dir=path.parent)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            yield file
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
@@ -1,6 +1,6 @@
 import unittest
 
-from pylasu.model import Node
+from pylasu.model import Node, feature_values
 
 
 def assert_asts_are_equal(
@@ -13,13 +13,11 @@ def assert_asts_are_equal(
                   f"but found {actual.node_type}")
     if consider_position:
         case.assertEqual(expected.position, actual.position, f"{context}.position")
-    for expected_property in expected.properties:
-        try:
-            actual_property = next(filter(lambda p: p.name == expected_property.name, actual.properties))
-        except StopIteration:
+    actual_values = {f.name: v for f, v in zip(type(actual).node_features, feature_values(actual))}
+    for expected_property, expected_prop_value in zip(type(expected).node_features, feature_values(expected)):
+        if expected_property.name not in actual_values:
             case.fail(f"No property {expected_property.name} found at {context}")
-        actual_prop_value = actual_property.value
-        expected_prop_value = expected_property.value
+        actual_prop_value = actual_values[expected_property.name]
         if expected_property.is_containment:
             if expected_property.multiple:
                 assert_multi_properties_are_equal(
@@ -1,12 +1,13 @@
 import functools
 from dataclasses import dataclass, field, Field, fields
 from inspect import signature
-from typing import Any, Dict, Callable, TypeVar, Generic, Optional, List, Set, Iterable, Type, Union
+from typing import Any, Dict, Callable, TypeVar, Generic, Optional, List, Set, Iterable, Type, Union, Hashable
 
+from pylasu.concurrency import AsyncRunner, check_cancelled, default_runner
 from pylasu.model import Node, Origin
 from pylasu.model.errors import GenericErrorNode
 from pylasu.model.model import concept_of
-from pylasu.model.reflection import PropertyDescription
+from pylasu.model.reflection import Feature
 from pylasu.transformation.generic_nodes import GenericNode
 from pylasu.validation import Issue, IssueSeverity
 
@@ -108,7 +109,14 @@ class ASTTransformer:
         else:
             raise Exception(f"Cannot transform {source} into a single Node as multiple nodes where produced")
 
+    async def transform_async(self, source: Optional[Any], parent: Optional[Node] = None,
+                              runner: Optional[AsyncRunner] = None, key: Optional[Hashable] = None) -> Optional[Node]:
+        """Transforms source like transform, without blocking the event loop. See AsyncRunner for the meaning of runner
+        and key. If the runner uses processes, the transformer and the source tree must be picklable."""
+        return await (runner or default_runner).run(self.transform, source, parent, key=key)
+
     def transform_into_nodes(self, source: Optional[Any], parent: Optional[Node] = None) -> List[Node]:
+        check_cancelled()
         if source is None:
             return []
         elif isinstance(source, Iterable):
@@ -117,7 +125,7 @@ class ASTTransformer:
         if factory:
             nodes = self.make_nodes(factory, source)
             for node in nodes:
-                for pd in concept_of(node).node_properties:
+                for pd in concept_of(node).node_features:
                     self.process_child(source, node, pd, factory)
                 factory.finalizer(node)
                 node.parent = parent
@@ -153,7 +161,7 @@ class ASTTransformer:
     def as_origin(self, source: Any) -> Optional[Origin]:
         return source if isinstance(source, Origin) else None
 
-    def set_child(self, child_node_factory: ChildNodeFactory, source: Any, node: Node, pd: PropertyDescription):
+    def set_child(self, child_node_factory: ChildNodeFactory, source: Any, node: Node, pd: Feature):
         src = child_node_factory.get(self.get_source(node, source))
         if pd.multiple:
             child = []
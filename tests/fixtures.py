@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List
 
-from pylasu.model import Node, pos, internal_field
+from pylasu.model import Node, pos, internal_field, compact_dataclass
 
 
 @dataclass
@@ -21,6 +21,11 @@ class ReinforcedBox(Box):
     strength: int = 10
 
 
+@compact_dataclass
+class CompactItem(Node):
+    name: str = None
+
+
 box = Box(
     name="root",
     contents=[
@@ -6,6 +6,7 @@ from antlr4 import CommonTokenStream, InputStream
 
 from pylasu.mapping.parse_tree_to_ast_transformer import ParseTreeToASTTransformer
 from pylasu.model import Node, Named, ReferenceByName
+from pylasu.parsing.parse_tree import parse_tree_origins
 from pylasu.transformation.transformation import PropertyRef, field_of
 from tests.antlr_entity.AntlrEntityLexer import AntlrEntityLexer
 from tests.antlr_entity.AntlrEntityParser import AntlrEntityParser
@@ -101,6 +102,18 @@ module M {
             }"""))
         self.assertEqual(expected_ast, actual_ast)
 
+    def test_no_origins(self):
+        transformer = ParseTreeToASTTransformer(allow_generic_node=False)
+        transformer.register_node_factory(AntlrEntityParser.ModuleContext, lambda ctx: EModule(name=ctx.name.text)) \
+            .with_child(field_of(EModule, "entities"), AntlrEntityParser.ModuleContext.entity)
+        transformer.register_node_factory(AntlrEntityParser.EntityContext, lambda ctx: EEntity(name=ctx.name.text))
+        parse_tree = self.parse_entities("module M { entity FOO { } }")
+        with parse_tree_origins(False):
+            ast = transformer.transform(parse_tree)
+        self.assertEqual(EModule("M", [EEntity("FOO", [])]), ast)
+        self.assertEqual([None, None], [node.origin for node in ast.walk()])
+        self.assertIs(parse_tree, transformer.transform(parse_tree).origin.parse_tree)
+
     def parse_entities(self, code: str) -> AntlrEntityParser.ModuleContext:
         lexer = AntlrEntityLexer(InputStream(code))
         parser = AntlrEntityParser(CommonTokenStream(lexer))
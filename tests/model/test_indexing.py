@@ -0,0 +1,138 @@
+import unittest
+from abc import ABC
+
+from pylasu.model import ASTIndex, Node, Point, pos
+from tests.fixtures import box, Box, Item, ReinforcedBox
+
+
+def by_name(name):
+    return next(n for n in box.walk() if n.name == name)
+
+
+class ASTIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ASTIndex(box)
+
+    def test_nodes_in_pre_order(self):
+        self.assertEqual(["root", "first", "1", "2", "big", "small", "3", "4", "5", "6"],
+                         [n.name for n in self.index.nodes])
+        self.assertEqual(10, len(self.index))
+        self.assertIn(by_name("4"), self.index)
+        self.assertNotIn(Item("4"), self.index)
+
+    def test_depth_and_parent(self):
+        self.assertEqual(0, self.index.depth(box))
+        self.assertEqual(3, self.index.depth(by_name("4")))
+        self.assertIsNone(self.index.parent(box))
+        self.assertIs(by_name("small"), self.index.parent(by_name("4")))
+        self.assertEqual(["small", "big", "root"], [n.name for n in self.index.ancestors(by_name("4"))])
+
+    def test_containment(self):
+        self.assertTrue(self.index.is_ancestor(box, by_name("4")))
+        self.assertTrue(self.index.is_ancestor(by_name("big"), by_name("4")))
+        self.assertFalse(self.index.is_ancestor(by_name("4"), by_name("4")))
+        self.assertTrue(self.index.contains(by_name("4"), by_name("4")))
+        self.assertFalse(self.index.is_ancestor(by_name("first"), by_name("4")))
+        self.assertFalse(self.index.is_ancestor(by_name("4"), by_name("big")))
+
+    def test_subtrees(self):
+        self.assertEqual(["big", "small", "3", "4", "5"], [n.name for n in self.index.subtree(by_name("big"))])
+        self.assertEqual(["small", "3", "4", "5"], [n.name for n in self.index.descendants(by_name("big"))])
+        self.assertEqual([], self.index.descendants(by_name("6")))
+        self.assertEqual(10, self.index.subtree_size(box))
+
+    def test_lowest_common_ancestor(self):
+        def lca(a, b):
+            return self.index.lowest_common_ancestor(by_name(a), by_name(b)).name
+        self.assertEqual("small", lca("3", "5"))
+        self.assertEqual("root", lca("1", "4"))
+        self.assertEqual("root", lca("6", "2"))
+        self.assertEqual("big", lca("big", "4"))
+        self.assertEqual("big", lca("4", "big"))
+        self.assertEqual("4", lca("4", "4"))
+
+    def test_unknown_node(self):
+        with self.assertRaises(ValueError):
+            self.index.depth(Item("4"))
+
+    def test_rebuild_after_replace(self):
+        tree = Box("root", [Box("a", [Item("1")]), Item("2")])
+        tree.assign_parents()
+        index = ASTIndex(tree)
+        self.assertEqual(2, index.depth(tree.contents[0].contents[0]))
+        self.assertFalse(index.stale)
+        replacement = Item("a")
+        tree.contents[0].replace_with(replacement)
+        self.assertTrue(index.stale)
+        index.refresh()
+        self.assertFalse(index.stale)
+        self.assertEqual(["root", "a", "2"], [n.name for n in index.nodes])
+        self.assertEqual(1, index.depth(replacement))
+
+    def test_invalidate(self):
+        tree = Box("root", [Item("1")])
+        index = ASTIndex(tree)
+        self.assertEqual(2, len(index))
+        tree.contents.append(Item("2"))
+        index.invalidate()
+        self.assertEqual(3, len(index))
+
+    def test_deep_tree(self):
+        root = leaf = Box("0")
+        for i in range(1, 100_000):
+            child = Box(str(i))
+            leaf.contents.append(child)
+            leaf = child
+        index = ASTIndex(root)
+        self.assertEqual(99_999, index.depth(leaf))
+        self.assertTrue(index.is_ancestor(root, leaf))
+        self.assertIs(root.contents[0], index.lowest_common_ancestor(root.contents[0], leaf))
+
+    def test_of_type(self):
+        self.assertEqual(["root", "first", "big", "small"], [n.name for n in self.index.of_type(Box)])
+        self.assertEqual(["small", "3", "4", "5"], [n.name for n in self.index.of_type(Node, by_name("small"))])
+        self.assertEqual(["3", "4", "5"],
+                         [n.name for n in self.index.of_type(Item, by_name("big"), include_within=False)])
+        self.assertEqual([], self.index.of_type(ReinforcedBox))
+        self.assertEqual([n.name for n in box.walk()], [n.name for n in self.index.of_type((Box, Item))])
+
+    def test_of_trait_type(self):
+        class Leaf(ABC):
+            pass
+        Leaf.register(Item)
+        self.assertEqual(["1", "2", "3", "4", "5", "6"], [n.name for n in self.index.of_type(Leaf)])
+
+    def test_search_by_type_with_index(self):
+        big = by_name("big")
+        self.assertEqual(list(big.search_by_type(Item)), list(big.search_by_type(Item, index=self.index)))
+        self.assertEqual(list(box.walk_descendants(restrict_to=Box)),
+                         list(box.walk_descendants(restrict_to=Box, index=self.index)))
+
+    def test_node_at(self):
+        self.assertEqual("1", self.index.node_at(Point(3, 8)).name)
+        self.assertEqual("first", self.index.node_at(Point(2, 4)).name)
+        self.assertEqual("small", self.index.node_at(Point(7, 6)).name)
+        self.assertEqual("big", self.index.node_at(Point(6, 4)).name)
+        self.assertEqual("root", self.index.node_at(Point(14, 1)).name)
+        self.assertIsNone(self.index.node_at(Point(20, 1)))
+
+    def test_node_at_same_position(self):
+        inner = Box("inner", [Item("item").with_position(pos(1, 0, 1, 2))]).with_position(pos(1, 0, 1, 4))
+        tree = Box("outer", [inner])
+        tree.with_position(pos(1, 0, 1, 4))
+        index = ASTIndex(tree)
+        self.assertEqual("inner", index.node_at(Point(1, 3)).name)
+        self.assertEqual("item", index.node_at(Point(1, 2)).name)
+
+    def test_nodes_overlapping(self):
+        self.assertEqual(["root", "big", "small", "4"],
+                         [n.name for n in self.index.nodes_overlapping(pos(9, 10, 10, 1))])
+        self.assertEqual([], self.index.nodes_overlapping(pos(20, 1, 21, 1)))
+
+    def test_walk_within_with_index(self):
+        for position in [pos(15, 1, 15, 1), box.position, pos(13, 3, 13, 9), pos(7, 5, 11, 5)]:
+            self.assertEqual([n.name for n in box.walk_within(position)],
+                             [n.name for n in box.walk_within(position, index=self.index)])
+        big = by_name("big")
+        self.assertEqual(["big", "small", "3", "4", "5"],
+                         [n.name for n in big.walk_within(box.position, index=self.index)])
@@ -1,12 +1,15 @@
 import dataclasses
+import gc
 import unittest
+import weakref
 from typing import List, Optional, Union
 
-from pylasu.model import Node, Position, Point, internal_field
-from pylasu.model.model import node_property, node_containment
+from pylasu.model import Node, Position, Point, internal_field, internal_properties, compact_dataclass, pos
+from pylasu.model.model import node_property, node_containment, feature_values, containment_values, add_slots, \
+    concept_of, internal_property
 from pylasu.model.reflection import Multiplicity, PropertyDescription
 from pylasu.model.naming import ReferenceByName, Named, Scope, Symbol
-from pylasu.support import extension_method
+from pylasu.support import extension_method, register_internal_property
 
 
 @dataclasses.dataclass
@@ -52,6 +55,13 @@ class AnotherSymbol(Symbol):
     index: int = dataclasses.field(default=None)
 
 
+@compact_dataclass
+class CompactNode(Node):
+    name: str = None
+    child: Optional["CompactNode"] = None
+    children_list: List["CompactNode"] = dataclasses.field(default_factory=list)
+
+
 @dataclasses.dataclass
 class InvalidNode(Node):
     attr: int
@@ -268,3 +278,146 @@ class ModelTest(unittest.TestCase):
         self.assertEqual(Multiplicity.MANY, pds[9].multiplicity)
 
         self.assertRaises(Exception, lambda: [x for x in InvalidNode.node_properties])
+
+    def test_node_features_are_cached(self):
+        self.assertIs(SomeNode.node_features, SomeNode.node_features)
+        self.assertEqual([pd.name for pd in SomeNode.node_properties], [f.name for f in SomeNode.node_features])
+        node = SomeNode("n", containment=Node())
+        self.assertEqual("n", require_feature(node, "name").value)
+        self.assertEqual(node.containment, next(f for f in SomeNode.node_features if f.name == "containment")
+                         .getter(node))
+
+    def test_feature_values(self):
+        child = Node()
+        node = SomeNode("n", containment=child, multiple=[child])
+        self.assertEqual(tuple(getattr(node, f.name) for f in SomeNode.node_features), feature_values(node))
+        self.assertEqual([(p.name, p.value) for p in node.properties],
+                         list(zip([f.name for f in SomeNode.node_features], feature_values(node))))
+        self.assertEqual((child, [child], None, []), containment_values(node))
+        self.assertEqual((), feature_values(Node()))
+        self.assertEqual((), containment_values(Node()))
+
+    def test_compact_node(self):
+        leaf = CompactNode("leaf").with_position(pos(1, 0, 1, 4))
+        node = CompactNode("root", CompactNode("child"), [leaf])
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.foo = 1
+        self.assertEqual(["name", "child", "children_list"], [p.name for p in node.properties])
+        self.assertTrue(require_feature(node, "children_list").is_containment)
+        self.assertEqual(["root", "child", "leaf"], [n.name for n in node.walk()])
+        node.assign_parents()
+        self.assertIs(node, leaf.parent)
+        self.assertIsNone(node.origin)
+        self.assertEqual(pos(1, 0, 1, 4), leaf.position)
+
+        @extension_method(CompactNode)
+        def shout(self: CompactNode):
+            return self.name.upper()
+
+        self.assertEqual("ROOT", node.shout())
+        self.assertEqual(["name", "child", "children_list"], [f.name for f in CompactNode.node_features])
+
+    def test_add_slots(self):
+        @dataclasses.dataclass
+        class BaseSlotted(Node):
+            a: int = 0
+
+        Slotted = add_slots(BaseSlotted)
+        self.assertEqual(("a",), Slotted.__slots__)
+        self.assertFalse(hasattr(Slotted(1), "__dict__"))
+        self.assertEqual(Slotted(1), Slotted(1))
+        self.assertEqual(["a"], [f.name for f in Slotted.node_features])
+
+    def test_node_attributes_are_in_slots(self):
+        node = SomeNode("n")
+        node.parent = Node()
+        self.assertNotIn("parent", vars(node))
+        self.assertIn("name", vars(node))
+
+        class Mixin:
+            __slots__ = ()
+
+        class WithMixin(Node, Mixin):
+            pass
+
+        self.assertIsNone(WithMixin().parent)
+        with self.assertRaises(TypeError):
+            class WithSlots(Node, int):
+                pass
+
+    def test_node_features_are_invalidated(self):
+        @dataclasses.dataclass
+        class MutableNode(Node):
+            a: int = 0
+            b: str = ""
+
+        @dataclasses.dataclass
+        class MutableSubNode(MutableNode):
+            c: Node = None
+
+        self.assertEqual(["a", "b"], [f.name for f in MutableNode.node_features])
+        self.assertEqual(["a", "b", "c"], [f.name for f in MutableSubNode.node_features])
+
+        MutableNode.d = 1
+        self.assertEqual(["a", "b", "d"], [f.name for f in MutableNode.node_features])
+        self.assertEqual(["a", "b", "c", "d"], [f.name for f in MutableSubNode.node_features])
+
+        register_internal_property(MutableNode, "b")
+        self.assertEqual(["a", "d"], [f.name for f in MutableNode.node_features])
+        self.assertEqual(["a", "c", "d"], [f.name for f in MutableSubNode.node_features])
+
+        @extension_method(MutableNode)
+        def e(_: MutableNode):
+            pass
+
+        self.assertEqual(["a", "d"], [f.name for f in MutableNode.node_features])
+
+        internal_properties("a")(MutableSubNode)
+        self.assertEqual(["a", "d"], [f.name for f in MutableNode.node_features])
+        self.assertEqual(["c", "d"], [f.name for f in MutableSubNode.node_features])
+
+        del MutableNode.d
+        self.assertEqual(["a"], [f.name for f in MutableNode.node_features])
+
+    def test_concept_of(self):
+        @dataclasses.dataclass
+        class Typed(Node):
+            a: int = 0
+
+        @dataclasses.dataclass
+        class SubTyped(Typed):
+            pass
+
+        @dataclasses.dataclass
+        class Dynamic(Node):
+            kind: type = None
+
+            @internal_property
+            def node_type(self):
+                return self.kind
+
+        node = SubTyped()
+        self.assertIs(SubTyped, concept_of(node))
+        self.assertIs(SubTyped, concept_of(node))
+        node.__concept__ = Typed
+        self.assertIs(Typed, concept_of(node))
+        self.assertIs(SubTyped, concept_of(SubTyped()))
+        Typed.__concept__ = Typed
+        self.assertIs(Typed, concept_of(SubTyped()))
+        self.assertIs(Typed, concept_of(Dynamic(Typed)))
+        self.assertIs(SubTyped, concept_of(Dynamic(SubTyped)))
+        self.assertIs(CompactNode, concept_of(CompactNode()))
+        with self.assertRaises(Exception):
+            concept_of(Dynamic(int))
+
+    def test_concept_of_does_not_keep_classes_alive(self):
+        @dataclasses.dataclass
+        class Temporary(Node):
+            a: int = 0
+
+        self.assertIs(Temporary, concept_of(Temporary()))
+        reference = weakref.ref(Temporary)
+        del Temporary
+        gc.collect()
+        self.assertIsNone(reference())
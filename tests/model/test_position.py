@@ -1,6 +1,10 @@
+import dataclasses
+import tempfile
 import unittest
+from pathlib import Path
 
-from pylasu.model import Point
+from pylasu.model import Point, Position, SourceText, pos
+from pylasu.model.position import FileSource, StringSource, intern_source
 
 START_LINE = 1
 START_COLUMN = 0
@@ -69,3 +73,121 @@ class PositionTest(unittest.TestCase):
         self.assertFalse(p3.is_before(p1))
         self.assertFalse(p3.is_before(p2))
         self.assertFalse(p3.is_before(p3))
+
+    def test_add_text(self):
+        p = Point(2, 3)
+        self.assertIs(p, p + "")
+        self.assertEqual(Point(2, 8), p + "hello")
+        self.assertEqual(Point(3, 0), p + "hello\n")
+        self.assertEqual(Point(3, 2), p + "ab\r\ncd")
+        self.assertEqual(Point(4, 2), p + "ab\r\rcd")
+        self.assertEqual(Point(5, 1), p + "\n\r\n\rx")
+        self.assertEqual(Point(4, 0), p + "a\n\r")
+
+    def test_source_text(self):
+        text = "ab\r\ncd\re\n\nf"
+        source_text = SourceText(text)
+        self.assertEqual(5, source_text.line_count)
+        for offset in range(len(text) + 1):
+            point = START_POINT + text[:offset]
+            self.assertEqual(point, source_text.point_at(offset), f"offset {offset}")
+            if text[offset - 1:offset + 1] != "\r\n":
+                self.assertEqual(offset, source_text.offset_of(point))
+        self.assertEqual("cd\re", source_text.text_at(source_text.position(4, 8)))
+        self.assertEqual(pos(2, 0, 3, 1), source_text.position(4, 8))
+        with self.assertRaises(ValueError):
+            source_text.point_at(len(text) + 1)
+        with self.assertRaises(ValueError):
+            source_text.offset_of(Point(6, 0))
+        with self.assertRaises(ValueError):
+            source_text.offset_of(Point(5, 2))
+
+    def test_line_index_of_source(self):
+        source = StringSource("a\nb")
+        self.assertIs(source.line_index, source.line_index)
+        self.assertEqual(Point(2, 1), source.line_index.point_at(3))
+        self.assertIsNone(StringSource().line_index)
+
+    def test_replace_source_text(self):
+        text = SourceText("set a = 1\r\ndisplay a\rend\n")
+        self.assertEqual(4, text.line_count)
+        for start, end, replacement in [(0, 0, "x\n"), (10, 11, ""), (11, 11, "\n\r"), (4, 20, "b"), (22, 23, "\r\n")]:
+            replaced = text.replace(start, end, replacement)
+            expected = text.text[:start] + replacement + text.text[end:]
+            self.assertEqual(expected, replaced.text)
+            self.assertEqual(SourceText(expected).line_starts, replaced.line_starts)
+
+    def test_file_source_text(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ascii_file = Path(directory, "ascii.txt")
+            ascii_file.write_bytes(b"set a = 1\r\ndisplay a\rend")
+            source = FileSource(ascii_file)
+            text = source.line_index
+            self.assertIs(text, source.line_index)
+            self.assertEqual(3, text.line_count)
+            self.assertEqual("display", text.slice(11, 18))
+            self.assertEqual("display", text.text_at(pos(2, 0, 2, 7)))
+            self.assertEqual(Point(2, 0), text.point_at(10))
+            self.assertEqual(Point(3, 3), text.point_at(len(text)))
+            self.assertIsNone(text._text)
+            self.assertEqual("set a = 1\r\ndisplay a\rend", text.text)
+            unicode_file = Path(directory, "unicode.txt")
+            unicode_file.write_text("città\nè", encoding="utf-8")
+            text = SourceText.from_file(unicode_file)
+            self.assertEqual("è", text.text_at(pos(2, 0, 2, 1)))
+            self.assertEqual(Point(2, 1), text.point_at(len(text)))
+            text = SourceText.from_file(unicode_file, encoding="latin-1")
+            self.assertEqual("Ã", text.slice(4, 5))
+            empty_file = Path(directory, "empty.txt")
+            empty_file.write_bytes(b"")
+            self.assertEqual(Point(1, 0), SourceText.from_file(empty_file).point_at(0))
+            self.assertIsNone(FileSource(Path(directory, "missing.txt")).line_index)
+
+    def test_file_source_encoding_and_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "latin.txt")
+            path.write_bytes("città".encode("latin-1"))
+            self.assertIsNone(FileSource(path).line_index)
+            source = FileSource(path, "latin-1")
+            self.assertEqual("città", source.line_index.text)
+            self.assertIs(source.line_index, source.line_index)
+            path.write_bytes("città\nè".encode("latin-1"))
+            self.assertEqual(2, source.line_index.line_count)
+            self.assertEqual("è", source.line_index.slice(6, 7))
+
+    def test_file_source_text_survives_truncation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "source.txt")
+            path.write_bytes(b"set a = 1\n" * 1000)
+            text = SourceText.from_file(path)
+            with open(path, "r+b") as file:
+                file.truncate(10)
+            self.assertEqual("set a", text.slice(8000, 8005))
+
+    def test_compact_points_and_positions(self):
+        position = pos(1, 2, 3, 4)
+        self.assertFalse(hasattr(position, "__dict__"))
+        self.assertFalse(hasattr(position.start, "__dict__"))
+        self.assertEqual(["line", "column"], [f.name for f in dataclasses.fields(Point)])
+        self.assertEqual(pos(1, 2, 3, 5), dataclasses.replace(position, end=Point(3, 5)))
+        self.assertEqual(position, pos(1, 2, 3, 4, StringSource("a")))
+        self.assertTrue(pos(1, 2, 3, 4) < pos(1, 2, 3, 5) < pos(1, 3, 1, 3))
+        self.assertEqual(sorted([pos(2, 0, 2, 1), pos(1, 0, 3, 0), pos(1, 0, 2, 0)]),
+                         [pos(1, 0, 2, 0), pos(1, 0, 3, 0), pos(2, 0, 2, 1)])
+        self.assertIn(pos(2, 0, 3, 4), position)
+        self.assertNotIn(pos(1, 1, 2, 0), position)
+        self.assertNotIn(Point(2, 0), position)
+        with self.assertRaises(TypeError):
+            hash(position)
+        with self.assertRaises(Exception):
+            Position(Point(2, 0), Point(1, 0))
+
+    def test_trusted_constructor(self):
+        self.assertEqual(pos(1, 2, 3, 4), Position.trusted(Point(1, 2), Point(3, 4)))
+
+    def test_intern_source(self):
+        source = FileSource(Path("a.txt"))
+        self.assertIs(source, intern_source(source))
+        self.assertIs(source, intern_source(FileSource(Path("a.txt"))))
+        self.assertIsNot(source, intern_source(FileSource(Path("b.txt"))))
+        self.assertIsNone(intern_source(None))
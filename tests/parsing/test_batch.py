@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pylasu.model import Point, Position
+from pylasu.model.position import FileSource, StringSource
+from pylasu.parsing.batch import input_size, parse_many
+from tests.parsing.test_pylasu_antlr_parser import SimpleLangBoxParser
+
+
+def item_names(result):
+    return [item.name for item in result.root.contents]
+
+
+class CrashingParser(SimpleLangBoxParser):
+    def parse(self, input_stream, *args, **kwargs):
+        if input_stream == "display 666":
+            os._exit(1)
+        return super().parse(input_stream, *args, **kwargs)
+
+
+class BatchParsingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.small = Path(self.directory.name, "small.simple")
+        self.small.write_text("display 1")
+        self.large = Path(self.directory.name, "large.simple")
+        self.large.write_text("set a = 10 display 42 " * 10)
+        self.missing = Path(self.directory.name, "missing.simple")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_largest_inputs_first(self):
+        inputs = [str(self.small), self.missing, FileSource(self.large), StringSource("display 42 display 42")]
+        self.assertEqual([FileSource(self.large), StringSource("display 42 display 42"), str(self.small), self.missing],
+                         sorted(inputs, key=input_size, reverse=True))
+
+    def test_parse_many_in_process(self):
+        results = list(parse_many(SimpleLangBoxParser, [self.small, self.missing, StringSource("display 2")],
+                                  workers=1))
+        self.assertEqual([self.small, StringSource("display 2"), self.missing], [r.input for r in results])
+        self.assertEqual([False, False, True], [r.failed for r in results])
+        self.assertIn("FileNotFoundError", results[2].error)
+        small = results[0].result
+        self.assertIsNone(small.first_stage)
+        self.assertEqual(["display1"], item_names(small))
+        self.assertIsNone(small.root.origin)
+        self.assertEqual(Position(Point(1, 0), Point(1, 9), FileSource(self.small)), small.root.contents[0].position)
+        self.assertEqual(FileSource(self.small), small.root.contents[0].position.source)
+
+    def test_parse_many_in_worker_processes(self):
+        inputs = [self.small, self.large, self.missing, StringSource("display 2")]
+        results = {str(r.input): r for r in parse_many(SimpleLangBoxParser, inputs, workers=2)}
+        self.assertEqual(4, len(results))
+        self.assertTrue(results[str(self.missing)].failed)
+        self.assertEqual(["seta=10", "display42"] * 10, item_names(results[str(self.large)].result))
+        self.assertEqual(Position(Point(1, 11), Point(1, 21), FileSource(self.large)),
+                         results[str(self.large)].result.root.contents[1].position)
+        self.assertEqual(["display2"], item_names(results[str(StringSource("display 2"))].result))
+        self.assertTrue(all(r.time >= 0 for r in results.values()))
+
+    def test_serialize_in_worker_processes(self):
+        results = list(parse_many(SimpleLangBoxParser, [self.small, self.large], workers=2, serialize=item_names))
+        self.assertEqual([["display1"], ["seta=10", "display42"] * 10],
+                         sorted(r.result for r in results))
+
+    def test_worker_crash_only_fails_its_input(self):
+        inputs = [StringSource(f"display {i}") for i in range(10)] + [StringSource("display 666")]
+        results = list(parse_many(CrashingParser, inputs, workers=2))
+        self.assertEqual(sorted(source.code for source in inputs), sorted(r.input.code for r in results))
+        results = {r.input.code: r for r in results}
+        self.assertIn("BrokenProcessPool", results["display 666"].error)
+        self.assertEqual([["display" + str(i)] for i in range(10)],
+                         [item_names(results[f"display {i}"].result) for i in range(10)])
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pylasu.model import Point, Position
+from pylasu.model.position import FileSource, StringSource
+from pylasu.parsing.cache import ParseCache
+from tests.fixtures import Box
+from tests.parsing.test_pylasu_antlr_parser import SimpleLangBoxParser
+
+
+def cached_parser(cache: ParseCache) -> SimpleLangBoxParser:
+    parser = SimpleLangBoxParser()
+    parser.cache = cache
+    return parser
+
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_hit_is_equivalent_to_parsing(self):
+        parser = cached_parser(ParseCache())
+        code = "set a = 10 display 42 set set b = 1"
+        fresh = parser.parse(code, source=StringSource(code))
+        cached = parser.parse(code, source=StringSource(code))
+        self.assertIsNotNone(fresh.first_stage)
+        self.assertIsNone(cached.first_stage)
+        self.assertEqual(fresh.root, cached.root)
+        self.assertEqual(fresh.issues, cached.issues)
+        self.assertTrue(cached.issues)
+        self.assertEqual(code, cached.code)
+        self.assertIsNotNone(fresh.root.contents[0].origin)
+        for fresh_node, cached_node in zip([fresh.root, *fresh.root.contents], [cached.root, *cached.root.contents]):
+            self.assertEqual(fresh_node.position, cached_node.position)
+            self.assertIs(cached.source, cached_node.position.source)
+        self.assertTrue(all(item.parent is cached.root for item in cached.root.contents))
+        self.assertEqual((1, 1, 1), (parser.cache.statistics.misses, parser.cache.statistics.stores,
+                                     parser.cache.statistics.memory_hits))
+
+    def test_each_hit_is_a_copy_with_its_own_source(self):
+        parser = cached_parser(ParseCache())
+        parser.parse("display 1", source=FileSource(Path("a.simple")))
+        first = parser.parse("display 1", source=FileSource(Path("b.simple")))
+        second = parser.parse("display 1")
+        self.assertIsNot(first.root, second.root)
+        self.assertEqual(Position(Point(1, 0), Point(1, 9), FileSource(Path("b.simple"))),
+                         first.root.contents[0].position)
+        self.assertIsNone(second.root.contents[0].position.source)
+        self.assertEqual(2, parser.cache.statistics.hits)
+
+    def test_key(self):
+        cache = ParseCache(version="1")
+        parser = SimpleLangBoxParser()
+        self.assertEqual(cache.key(parser, "display 1"), cache.key(SimpleLangBoxParser(), "display 1"))
+        self.assertNotEqual(cache.key(parser, "display 1"), cache.key(parser, "display 2"))
+        self.assertNotEqual(cache.key(parser, "display 1"), cache.key(parser, "display 1", consider_range=False))
+        self.assertNotEqual(cache.key(parser, "display 1"), ParseCache(version="2").key(parser, "display 1"))
+
+    def test_entries_persist_in_the_directory(self):
+        path = Path(self.directory.name, "code.simple")
+        path.write_text("set a = 1 display a")
+        cached_parser(ParseCache(self.directory.name)).parse_file(path)
+        parser = cached_parser(ParseCache(self.directory.name))
+        result = parser.parse_file(path)
+        self.assertEqual(1, parser.cache.statistics.disk_hits)
+        self.assertEqual(["seta=1", "displaya"], [item.name for item in result.root.contents])
+        self.assertEqual(Position(Point(1, 10), Point(1, 19), FileSource(path)), result.root.contents[1].position)
+        self.assertEqual(Point(1, 10), result.line_index.point_at(10))
+        result = parser.parse_file(path)
+        self.assertEqual(1, parser.cache.statistics.memory_hits)
+        # The key is computed from the bytes of the file, and the code is decoded only when it's read
+        self.assertIsNone(result.line_index._text)
+        self.assertEqual("set a = 1 display a", result.code)
+
+    def test_results_that_cannot_be_pickled_are_not_stored(self):
+        class DeepParser(SimpleLangBoxParser):
+            def parse_tree_to_ast(self, root, consider_range, issues, source):
+                ast = Box("leaf")
+                for _ in range(5000):
+                    ast = Box("box", [ast])
+                return ast
+
+        parser = DeepParser()
+        parser.cache = ParseCache(self.directory.name)
+        self.assertEqual("box", parser.parse("display 1").root.name)
+        self.assertEqual("box", parser.parse("display 1").root.name)
+        self.assertEqual((2, 0, 0), (parser.cache.statistics.skips, parser.cache.statistics.stores,
+                                     parser.cache.statistics.hits))
+        self.assertEqual([], os.listdir(self.directory.name))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        parser = cached_parser(ParseCache(self.directory.name, max_memory_bytes=0))
+        parser.parse("display 1")
+        size = sum(f.stat().st_size for f in Path(self.directory.name).iterdir())
+        parser.cache.max_bytes = 2 * size
+        parser.parse("display 2")
+        parser.parse("display 1")
+        parser.parse("display 3")
+        self.assertEqual(1, parser.cache.statistics.evictions)
+        self.assertEqual(2, len(os.listdir(self.directory.name)))
+        parser.parse("display 1")
+        parser.parse("display 2")
+        self.assertEqual((2, 4), (parser.cache.statistics.disk_hits, parser.cache.statistics.misses))
+
+    def test_unreadable_entries_are_discarded(self):
+        cache = ParseCache(self.directory.name)
+        parser = cached_parser(cache)
+        key = cache.key(parser, "display 1")
+        Path(self.directory.name, key + ".pickle").write_bytes(b"garbage")
+        self.assertEqual(["display1"], [item.name for item in parser.parse("display 1").root.contents])
+        self.assertEqual(1, cache.statistics.misses)
+        self.assertEqual(["display1"], [item.name for item in parser.parse("display 1").root.contents])
+        self.assertEqual(1, cache.statistics.memory_hits)
+        cache.clear()
+        self.assertEqual([], os.listdir(self.directory.name))
@@ -0,0 +1,147 @@
+import random
+import unittest
+from typing import List, Optional
+
+from antlr4 import InputStream, Parser, TokenStream
+
+from pylasu.model import Node, Point, Position, SourceText, walk
+from pylasu.parsing.antlr import PylasuANTLRParser
+from pylasu.parsing.incremental import TextEdit, apply_edits
+from pylasu.validation import Issue
+from tests.antlr_script.AntlrScriptLexer import AntlrScriptLexer
+from tests.antlr_script.AntlrScriptParser import AntlrScriptParser
+from tests.fixtures import Box, Item
+
+CODE = """create Client as c
+print 'hello'
+set name of c to 'Alice'
+
+print 1 + 2
+"""
+
+
+class ScriptParser(PylasuANTLRParser):
+    def create_antlr_lexer(self, input_stream: InputStream):
+        return AntlrScriptLexer(input_stream)
+
+    def create_antlr_parser(self, token_stream: TokenStream):
+        return AntlrScriptParser(token_stream)
+
+    def parse_tree_to_ast(self, root, consider_range: bool, issues: List[Issue], source) -> Optional[Node]:
+        return Box("script", [self.unit_to_ast(s, issues, source) for s in root.statement()]).with_parse_tree(root)
+
+    def parse_unit(self, parser: Parser):
+        return parser.statement()
+
+    def ast_units(self, root: Node):
+        return root.contents
+
+    def unit_to_ast(self, parse_tree, issues: List[Issue], source) -> Optional[Node]:
+        return Item(parse_tree.getText()).with_parse_tree(parse_tree, source)
+
+
+class NonIncrementalScriptParser(ScriptParser):
+    def parse_unit(self, parser: Parser):
+        return None
+
+
+def edit(start_line, start_column, end_line, end_column, text):
+    return TextEdit(Position(Point(start_line, start_column), Point(end_line, end_column)), text)
+
+
+class IncrementalParsingTest(unittest.TestCase):
+    def assert_same_as_parsing_again(self, parser, previous, edits):
+        result = parser.reparse(previous, edits)
+        expected = parser.parse(result.code)
+        self.assertEqual(expected.issues, result.issues)
+        self.assertEqual([(node.name, node.position, node.source_text) for node in walk(expected.root)],
+                         [(node.name, node.position, node.source_text) for node in walk(result.root)])
+        self.assertEqual([node.parent for node in walk(expected.root)][1:],
+                         [expected.root] * (len(expected.root.contents)))
+        self.assertTrue(all(node.parent is result.root for node in result.root.contents))
+        self.assertEqual([child.getText() for child in expected.first_stage.root.children],
+                         [child.getText() for child in result.first_stage.root.children])
+        return result
+
+    def test_edits(self):
+        parser = ScriptParser()
+        for edits in [
+            [edit(2, 7, 2, 12, "world")],
+            [edit(2, 0, 2, 0, "\n\n")],
+            [edit(4, 0, 4, 0, "print 3\n")],
+            [edit(2, 0, 3, 0, "")],
+            [edit(1, 0, 1, 0, "  ")],
+            [edit(5, 9, 5, 9, "0")],
+            [edit(6, 0, 6, 0, "print 4")],
+            [edit(3, 24, 5, 0, " ")],
+            [edit(1, 7, 1, 7, "\n"), edit(6, 10, 6, 10, " * 3")],
+            [edit(6, 0, 6, 0, "'")],
+        ]:
+            with self.subTest(edits=edits):
+                self.assert_same_as_parsing_again(parser, parser.parse(CODE), edits)
+
+    def test_only_changed_units_are_replaced(self):
+        parser = ScriptParser()
+        previous = parser.parse(CODE)
+        first, second, third, fourth = previous.root.contents
+        result = parser.reparse(previous, [edit(2, 7, 2, 12, "world")])
+        self.assertIs(previous.root, result.root)
+        self.assertEqual([first, "print'world'", third, fourth],
+                         [result.root.contents[0], result.root.contents[1].name] + result.root.contents[2:])
+
+    def test_repeated_edits(self):
+        parser = ScriptParser()
+        result = parser.parse(CODE)
+        for edits in [[edit(2, 0, 2, 0, "print 0\n")], [edit(4, 3, 4, 3, "\n\n")], [edit(1, 0, 2, 0, "")],
+                      [edit(7, 11, 7, 11, "+ 4")], [edit(1, 0, 3, 0, "")], [edit(5, 14, 6, 0, "")]]:
+            result = self.assert_same_as_parsing_again(parser, result, edits)
+
+    def test_errors_cause_a_full_parse(self):
+        parser = ScriptParser()
+        result = parser.reparse(parser.parse(CODE), [edit(2, 0, 2, 5, "prin")])
+        self.assertTrue(result.issues)
+        result = self.assert_same_as_parsing_again(parser, result, [edit(2, 0, 2, 4, "print")])
+        self.assertEqual([], result.issues)
+
+    def test_create_parser_can_be_overridden(self):
+        created = []
+
+        class Parser(ScriptParser):
+            def create_parser(self, input_stream: InputStream, issues: List[Issue]):
+                created.append(input_stream.index)
+                return super().create_parser(input_stream, issues)
+
+        parser = Parser()
+        previous = parser.parse(CODE)
+        self.assert_same_as_parsing_again(parser, previous, [edit(4, 0, 4, 0, "print 3\n")])
+        self.assertEqual(3, len(created))
+        self.assertGreater(created[1], 0)
+
+    def test_languages_without_units_are_parsed_again(self):
+        parser = NonIncrementalScriptParser()
+        previous = parser.parse(CODE)
+        result = parser.reparse(previous, [edit(2, 7, 2, 12, "world")])
+        self.assertIsNot(previous.root, result.root)
+        self.assertEqual("print'world'", result.root.contents[1].name)
+        self.assertIs(previous, parser.reparse(previous, []))
+
+    def test_changed_region(self):
+        random.seed(1)
+        for _ in range(200):
+            code = "".join(random.choice("ab\n") for _ in range(20))
+            text = SourceText(code)
+            edits = []
+            current = code
+            for _ in range(random.randint(1, 3)):
+                index = SourceText(current)
+                start = random.randint(0, len(current))
+                end = random.randint(start, len(current))
+                inserted = "".join(random.choice("xy\n") for _ in range(random.randint(0, 3)))
+                edits.append(TextEdit(index.position(start, end), inserted))
+                current = current[:start] + inserted + current[end:]
+            new_text, changed = apply_edits(text, edits)
+            new_code = new_text.text
+            self.assertEqual(current, new_code)
+            self.assertEqual(code[:changed.start], new_code[:changed.start])
+            self.assertEqual(code[changed.old_end:], new_code[changed.new_end:])
+            self.assertLessEqual(changed.start, changed.old_end)
@@ -0,0 +1,63 @@
+import unittest
+
+from antlr4 import CommonTokenStream, InputStream
+
+from pylasu.parsing.parse_tree import ParseTreeOrigin
+from pylasu.parsing.positions import compute_positions, numpy
+from pylasu.parsing.results import FirstStageParsingResult
+from tests.fixtures import Box, Item
+from tests.simple_lang.SimpleLangLexer import SimpleLangLexer
+from tests.simple_lang.SimpleLangParser import SimpleLangParser
+
+CODE = [
+    "set a = 10 display 42",
+    "display\r\n42",
+    "set a = \"x\" display \"a\r\nb\"",
+    "set set a = 10\ndisplay c",
+    "set a = \"\r\" display 1",
+    "",
+]
+
+
+def parse(code):
+    parser = SimpleLangParser(CommonTokenStream(SimpleLangLexer(InputStream(code))))
+    parser.removeErrorListeners()
+    return parser.compilationUnit()
+
+
+class PositionsTest(unittest.TestCase):
+    def check_positions(self, use_numpy):
+        for code in CODE:
+            table = compute_positions(parse(code), use_numpy=use_numpy)
+            self.assertTrue(len(table) > 0)
+            for i, parse_tree in enumerate(table.elements):
+                self.assertEqual(parse_tree.to_position(), table.position(i), f"{parse_tree.getText()} in {code!r}")
+
+    def test_positions(self):
+        self.check_positions(False)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_positions_with_numpy(self):
+        self.check_positions(True)
+
+    def test_columns(self):
+        table = compute_positions(FirstStageParsingResult([], parse("set a = 10 display 42")), use_numpy=False)
+        columns = table.columns()
+        self.assertEqual("10", table.elements[6].getText())
+        self.assertEqual(0, columns["start_offset"][0])
+        self.assertEqual(21, columns["end_offset"][0])
+        self.assertEqual(8, columns["start_offset"][6])
+        self.assertEqual(10, columns["end_offset"][6])
+        self.assertEqual(1, columns["end_line"][0])
+
+    def test_apply(self):
+        parse_tree = parse("set a = 10\r\ndisplay 42")
+        ast = Box("cu", [Item(s.getText()).with_parse_tree(s) for s in parse_tree.statement()])\
+            .with_parse_tree(parse_tree)
+        table = compute_positions(ast)
+        self.assertEqual(3, len(table))
+        table.apply()
+        for node in ast.walk():
+            self.assertIsInstance(node.origin, ParseTreeOrigin)
+            self.assertIsNotNone(node.origin._position)
+            self.assertEqual(node.origin.parse_tree.to_position(), node.position)
@@ -0,0 +1,157 @@
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from antlr4 import PredictionContextCache
+
+from pylasu.parsing.prediction import PredictionCachePolicy
+from tests.parsing.test_pylasu_antlr_parser import SimpleLangBoxParser
+
+CODE = "set a = 10 display 42"
+
+
+class PredictionCachesTest(unittest.TestCase):
+    def test_statistics(self):
+        parser = SimpleLangBoxParser()
+        self.assertEqual(0, parser.prediction_cache_statistics().total_dfa_states)
+        parser.parse(CODE)
+        statistics = parser.prediction_cache_statistics()
+        self.assertGreater(statistics.total_dfa_states, 0)
+        self.assertTrue(all(count > 0 for count in statistics.dfa_states.values()))
+        self.assertEqual((1, len(CODE), 0), (statistics.parses, statistics.characters, statistics.resets))
+        self.assertGreaterEqual(statistics.age, 0)
+        self.assertIsNone(statistics.hit_ratio)
+
+    def test_caches_are_owned_by_the_parser(self):
+        parser = SimpleLangBoxParser()
+        parser.parse(CODE)
+        self.assertEqual(0, SimpleLangBoxParser().prediction_cache_statistics().total_dfa_states)
+
+    def test_reset(self):
+        parser = SimpleLangBoxParser()
+        expected = parser.parse(CODE)
+        context_cache = parser.prediction_context_cache
+        parser.reset_prediction_caches()
+        statistics = parser.prediction_cache_statistics()
+        self.assertEqual((0, 0, 1), (statistics.total_dfa_states, statistics.parses, statistics.resets))
+        self.assertIsNot(context_cache, parser.prediction_context_cache)
+        self.assertEqual(expected.root, parser.parse(CODE).root)
+
+    def test_replace_prediction_context_cache(self):
+        parser = SimpleLangBoxParser()
+        expected = parser.parse(CODE)
+        dfa_states = parser.prediction_cache_statistics().total_dfa_states
+        context_cache = PredictionContextCache()
+        parser.prediction_context_cache = context_cache
+        self.assertIs(context_cache, parser.prediction_context_cache)
+        self.assertEqual(dfa_states, parser.prediction_cache_statistics().total_dfa_states)
+        self.assertEqual(expected.root, parser.parse(CODE).root)
+
+    def test_reset_after_parses_or_characters(self):
+        parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(reset_after_parses=2))
+        for _ in range(5):
+            parser.parse(CODE)
+        self.assertEqual((2, 1), (parser.prediction_cache_statistics().resets,
+                                  parser.prediction_cache_statistics().parses))
+        parser.cache_policy = PredictionCachePolicy(reset_after_characters=len(CODE) * 3)
+        for _ in range(3):
+            parser.parse(CODE)
+        self.assertEqual((3, 1), (parser.prediction_cache_statistics().resets,
+                                  parser.prediction_cache_statistics().parses))
+
+    def test_size_and_age_limits(self):
+        for policy in [PredictionCachePolicy(max_dfa_states=1), PredictionCachePolicy(max_prediction_contexts=0),
+                       PredictionCachePolicy(max_age=0)]:
+            parser = SimpleLangBoxParser(cache_policy=policy)
+            parser.parse(CODE)
+            parser.parse(CODE)
+            self.assertEqual(1, parser.prediction_cache_statistics().resets)
+        parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(max_dfa_states=1000, max_age=3600))
+        parser.parse(CODE)
+        parser.parse(CODE)
+        self.assertEqual(0, parser.prediction_cache_statistics().resets)
+
+    def test_hit_ratio(self):
+        parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(count_predictions=True))
+        parser.parse(CODE)
+        cold = parser.prediction_cache_statistics()
+        self.assertGreater(cold.predictions, 0)
+        self.assertGreater(cold.misses, 0)
+        parser.parse(CODE)
+        warm = parser.prediction_cache_statistics()
+        self.assertEqual(2 * cold.predictions, warm.predictions)
+        self.assertEqual(cold.misses, warm.misses)
+        self.assertGreater(warm.hit_ratio, cold.hit_ratio)
+
+    def test_predictions_are_counted_across_threads(self):
+        parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(count_predictions=True))
+        parser.parse(CODE)
+        predictions = parser.prediction_cache_statistics().predictions
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda _: parser.parse(CODE), range(40)))
+        self.assertEqual(41 * predictions, parser.prediction_cache_statistics().predictions)
+
+    def test_pickled_parser_keeps_the_policy(self):
+        parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(reset_after_parses=10))
+        parser.parse(CODE)
+        copy = pickle.loads(pickle.dumps(parser))
+        self.assertEqual(PredictionCachePolicy(reset_after_parses=10), copy.cache_policy)
+        self.assertEqual(0, copy.prediction_cache_statistics().parses)
+        self.assertEqual(parser.parse(CODE).root, copy.parse(CODE).root)
+
+
+class PredictionStateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_warm_up(self):
+        parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(count_predictions=True))
+        parser.warm_up([CODE, "set set a = 1"])
+        self.assertGreater(parser.prediction_cache_statistics().total_dfa_states, 0)
+        warm = parser.prediction_cache_statistics()
+        parser.parse(CODE)
+        self.assertEqual(warm.misses, parser.prediction_cache_statistics().misses)
+
+    def test_save_and_load(self):
+        parser = SimpleLangBoxParser()
+        parser.warm_up([CODE, "set set a = 1"])
+        path = parser.save_prediction_state(self.directory.name, "1")
+        self.assertEqual(path, parser.prediction_state_path(self.directory.name, "1"))
+        self.assertNotEqual(path, parser.prediction_state_path(self.directory.name, "2"))
+        loaded = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(count_predictions=True))
+        self.assertFalse(loaded.load_prediction_state(self.directory.name, "2"))
+        self.assertTrue(loaded.load_prediction_state(self.directory.name, "1"))
+        self.assertEqual(parser.prediction_cache_statistics().dfa_states,
+                         loaded.prediction_cache_statistics().dfa_states)
+        self.assertEqual(parser.parse(CODE).root, loaded.parse(CODE).root)
+        self.assertEqual(0, loaded.prediction_cache_statistics().misses)
+        self.assertEqual(parser.parse("set set a = 1").issues, loaded.parse("set set a = 1").issues)
+        data = path.read_bytes()
+        path.write_bytes(data[:len(data) // 2])
+        self.assertFalse(SimpleLangBoxParser().load_prediction_state(self.directory.name, "1"))
+        path.write_bytes(b"garbage")
+        self.assertFalse(SimpleLangBoxParser().load_prediction_state(self.directory.name, "1"))
+
+    def test_load_in_another_process(self):
+        parser = SimpleLangBoxParser()
+        parser.warm_up([CODE])
+        parser.save_prediction_state(self.directory.name)
+        # ANTLR hashes strings, whose hash codes are different in each process
+        script = "import sys\n" \
+                 "from tests.parsing.test_pylasu_antlr_parser import SimpleLangBoxParser\n" \
+                 "from pylasu.parsing.prediction import PredictionCachePolicy\n" \
+                 "parser = SimpleLangBoxParser(cache_policy=PredictionCachePolicy(count_predictions=True))\n" \
+                 "assert parser.load_prediction_state(sys.argv[1])\n" \
+                 "result = parser.parse(sys.argv[2] + ' display 7')\n" \
+                 "print([item.name for item in result.root.contents], len(result.issues), \n" \
+                 "      parser.prediction_cache_statistics().total_dfa_states > 0)\n"
+        output = subprocess.run([sys.executable, "-c", script, self.directory.name, CODE], check=True,
+                                capture_output=True, text=True, cwd=Path(__file__).parents[2]).stdout
+        self.assertEqual("['seta=10', 'display42', 'display7'] 0 True", output.strip())
@@ -1,11 +1,24 @@
+import asyncio
+import dataclasses
+import tempfile
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import List, Optional
 
-from antlr4 import TokenStream, InputStream
+from antlr4 import CommonTokenStream, TokenStream, InputStream
+from antlr4.atn.PredictionMode import PredictionMode
 
-from pylasu.model import Source, Node, Position, Point
-from pylasu.parsing.antlr import PylasuANTLRParser
+from pylasu.concurrency import AsyncRunner, current_cancellation
+from pylasu.model import Source, Node, Position, Point, SourceText
+from pylasu.model.position import FileSource, StringSource
+from pylasu.parsing import tokens as token_scanner
+from pylasu.parsing.antlr import PylasuANTLRParser, SourceTextInputStream
+from pylasu.parsing.parse_tree import ParseTreeOrigin
+from pylasu.parsing.results import FirstStageParsingResult
+from pylasu.parsing.timing import ParsingPhaseListener
 from pylasu.validation import Issue
+from tests.fixtures import Box, Item
 from tests.simple_lang.SimpleLangLexer import SimpleLangLexer
 from tests.simple_lang.SimpleLangParser import SimpleLangParser
 
@@ -22,6 +35,13 @@ class SimpleLangPylasuParser(PylasuANTLRParser):
         return None
 
 
+class SimpleLangBoxParser(SimpleLangPylasuParser):
+
+    def parse_tree_to_ast(self, root, consider_range: bool, issues: List[Issue], source: Source) -> Optional[Node]:
+        return Box("cu", [Item(s.getText()).with_parse_tree(s, source) for s in root.statement()])\
+            .with_parse_tree(root, source)
+
+
 class KolasuParserTest(unittest.TestCase):
     def test_lexing(self):
         parser = SimpleLangPylasuParser()
@@ -51,3 +71,283 @@ display c
         self.assertEqual(Position(Point(1, 4), Point(1, 7)), extraneous_input.position)
         mismatched_input = [i for i in result.issues if i.message.startswith("Mismatched input 'c'")][0]
         self.assertEqual(Position(Point(2, 8), Point(2, 9)), mismatched_input.position)
+
+    def test_eager_positions(self):
+        parser = SimpleLangBoxParser()
+        result = parser.parse("set a = 10\ndisplay 42\n", eager_positions=True)
+        self.assertIsNotNone(result.root.origin._position)
+        self.assertIsNotNone(result.root.contents[1].origin._position)
+        self.assertEqual(Position(Point(2, 0), Point(2, 10)), result.root.contents[1].position)
+        result = parser.parse("set a = 10\ndisplay 42\n", consider_range=False, eager_positions=True)
+        self.assertIsNone(result.root.position)
+
+    def test_no_origins_without_range(self):
+        created = []
+
+        class Parser(SimpleLangBoxParser):
+            def parse_tree_to_ast(self, root, consider_range, issues, source):
+                ast = super().parse_tree_to_ast(root, consider_range, issues, source)
+                created.extend(node.origin for node in ast.walk())
+                return ast
+
+        parser = Parser()
+        code = "set a = 10\ndisplay 42\n"
+        result = parser.parse(code, consider_range=False)
+        self.assertEqual([None, None, None], created)
+        self.assertIsNone(result.root.contents[1].position)
+        self.assertEqual(Position(Point(2, 0), Point(2, 10)), parser.parse(code).root.contents[1].position)
+        self.assertIsNotNone(Box("b").with_parse_tree(result.first_stage.root).origin)
+
+    def test_direct_origins_without_range(self):
+        class Parser(SimpleLangBoxParser):
+            def parse_tree_to_ast(self, root, consider_range, issues, source):
+                box = Box("cu")
+                box.origin = ParseTreeOrigin(root, source)
+                return box
+
+        result = Parser().parse("set a = 10\ndisplay 42\n", consider_range=False)
+        self.assertIsNone(result.root.origin)
+        self.assertIsNone(result.root.position)
+        self.assertEqual(Position(Point(1, 0), Point(3, 0)), Parser().parse("set a = 10\ndisplay 42\n").root.position)
+
+    def test_line_index(self):
+        parser = SimpleLangBoxParser()
+        result = parser.parse("set a = 10\ndisplay 42\n")
+        self.assertEqual(Point(2, 8), result.line_index.point_at(19))
+        self.assertEqual("42", result.line_index.text_at(result.root.contents[1].position)[-2:])
+
+    def test_source_is_kept(self):
+        parser = SimpleLangBoxParser()
+        parser.parse("display 1", source=StringSource("display 1"))
+        source = StringSource("display 1")
+        result = parser.parse("display 1", source=source)
+        self.assertIs(source, result.source)
+        self.assertIs(source, result.root.contents[0].position.source)
+
+    def test_code_is_not_copied(self):
+        parser = SimpleLangBoxParser()
+        input_stream = InputStream("set a = 10\ndisplay 42\n")
+        result = parser.parse(input_stream)
+        self.assertIs(input_stream.strdata, result.code)
+
+    def test_parse_file(self):
+        parser = SimpleLangBoxParser()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "example.simple")
+            path.write_text("set a = 10 display 42")
+            result = parser.parse_file(path)
+            self.assertEqual([], result.issues)
+            # The code is decoded only when it's read
+            self.assertIsNone(result.line_index._text)
+            repr(result)
+            self.assertEqual(result, dataclasses.replace(result))
+            dataclasses.asdict(dataclasses.replace(result, first_stage=None))
+            self.assertIsNone(result.line_index._text)
+            self.assertEqual(FileSource(path), result.source)
+            self.assertIs(result.source, result.root.contents[1].position.source)
+            self.assertEqual(Position(Point(1, 11), Point(1, 21)), result.root.contents[1].position)
+            self.assertEqual("display 42", result.root.contents[1].source_text)
+            self.assertEqual("set a = 10 display 42", result.code)
+            self.assertIs(result.source, parser.parse_file(str(path)).source)
+            self.assertIsNone(result.source._line_index)
+
+    def test_parse_file_then_rewrite_it(self):
+        parser = SimpleLangBoxParser()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "example.simple")
+            path.write_text("set a = 10 display 42" * 500)
+            result = parser.parse_file(path)
+            with open(path, "r+b") as file:
+                file.truncate(5)
+            self.assertEqual("display 42", result.root.contents[-1].source_text)
+            self.assertEqual(10500, len(result.code))
+
+    def test_source_text_input_stream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "example.simple")
+            path.write_text("set à = 10", encoding="utf-8")
+            input_stream = SourceTextInputStream(SourceText.from_file(path))
+            self.assertEqual(10, input_stream.size)
+            self.assertEqual(ord("à"), input_stream.LA(5))
+            self.assertEqual("à =", input_stream.getText(4, 6))
+            self.assertEqual("set à = 10", str(input_stream))
+            path = Path(directory, "ascii.simple")
+            path.write_text("set a = 10")
+            input_stream = SourceTextInputStream(SourceText.from_file(path))
+            self.assertEqual(ord("a"), input_stream.LA(5))
+            self.assertEqual("a = 10", input_stream.getText(4, 100))
+            self.assertEqual("", input_stream.getText(10, 12))
+
+    def test_two_stage_prediction(self):
+        parser = SimpleLangBoxParser()
+        self.assertEqual(PredictionMode.LL, parser.parse("display 1").first_stage.prediction_mode)
+        two_stage_parser = SimpleLangBoxParser(two_stage_prediction=True)
+        for code in ["set a = 10 display 42", "set set a = 10 display c", "set a @ = 1 display",
+                     "set a = 1 display @ 2"]:
+            expected = parser.parse(code)
+            result = two_stage_parser.parse(code)
+            self.assertEqual(expected.root, result.root)
+            self.assertEqual(expected.issues, result.issues)
+            self.assertEqual(expected.root.position, result.root.position)
+        self.assertEqual(PredictionMode.SLL, two_stage_parser.parse("display 42").first_stage.prediction_mode)
+        self.assertEqual(PredictionMode.LL, two_stage_parser.parse("set set a = 10").first_stage.prediction_mode)
+
+    def test_timings(self):
+        parser = SimpleLangBoxParser()
+        timings = parser.parse("set a = 10 display 42").timings
+        for phase in ["parsing", "verification", "parse_tree_to_ast", "assign_parents", "post_process_ast", "total"]:
+            self.assertGreater(getattr(timings, phase), 0, phase)
+        self.assertEqual((None, None), (timings.lexing, timings.positions))
+        self.assertGreater(timings.total, timings.parsing + timings.parse_tree_to_ast)
+        timings = parser.parse("set a = 10", measure_lexing_time=True, consider_range=False).timings
+        self.assertGreater(timings.lexing, 0)
+        result = parser.parse("set a = 10", eager_positions=True)
+        self.assertGreater(result.timings.positions, 0)
+        self.assertIs(result.timings, result.first_stage.timings)
+
+    def test_phase_listener(self):
+        events = []
+        durations = []
+
+        class Listener(ParsingPhaseListener):
+            def phase_started(self, phase, source):
+                events.append(("start", phase, source))
+
+            def phase_ended(self, phase, source, nanoseconds):
+                events.append(("end", phase, source))
+                durations.append(nanoseconds)
+
+        parser = SimpleLangBoxParser()
+        listener = Listener()
+        parser.add_phase_listener(listener)
+        source = StringSource("display 1")
+        parser.parse("display 1", source=source)
+        phases = ["parsing", "verification", "parse_tree_to_ast", "assign_parents", "post_process_ast"]
+        self.assertEqual([(event, phase, source) for phase in phases for event in ["start", "end"]], events)
+        self.assertTrue(all(isinstance(duration, int) and duration >= 0 for duration in durations))
+        parser.remove_phase_listener(listener)
+        parser.parse("display 1")
+        self.assertEqual(10, len(events))
+
+    def test_phase_listener_when_a_phase_raises(self):
+        events = []
+
+        class Listener(ParsingPhaseListener):
+            def phase_started(self, phase, source):
+                events.append(("start", phase))
+
+            def phase_ended(self, phase, source, nanoseconds):
+                events.append(("end", phase))
+
+        class FailingParser(SimpleLangBoxParser):
+            def post_process_ast(self, ast, issues):
+                raise ValueError("post-processing failed")
+
+        parser = FailingParser()
+        parser.add_phase_listener(Listener())
+        with self.assertRaises(ValueError):
+            parser.parse("display 1")
+        self.assertEqual([("start", "post_process_ast"), ("end", "post_process_ast")], events[-2:])
+
+    def test_timings_without_first_stage_timings(self):
+        class UntimedParser(SimpleLangBoxParser):
+            def parse_first_stage(self, input_stream, measure_lexing_time=False, source=None):
+                first_stage = super().parse_first_stage(input_stream, measure_lexing_time, source)
+                return FirstStageParsingResult(first_stage.issues, first_stage.root)
+
+        result = UntimedParser().parse("display 1")
+        self.assertEqual(1, len(result.root.contents))
+        self.assertIsNone(result.timings.parsing)
+        self.assertIsNotNone(result.timings.parse_tree_to_ast)
+        self.assertGreaterEqual(result.timings.total, result.timings.parse_tree_to_ast)
+
+    def test_tokenize(self):
+        parser = SimpleLangPylasuParser()
+        code = "set a = 10\ndisplay 42 @\n"
+        result = parser.tokenize(code)
+        lexer = SimpleLangLexer(InputStream(code))
+        lexer.removeErrorListeners()
+        token_stream = CommonTokenStream(lexer)
+        token_stream.fill()
+        expected = token_stream.tokens[:-1]
+        tokens = result.tokens
+        self.assertEqual(len(expected), len(tokens))
+        self.assertEqual([(t.type, t.channel, t.start, t.stop, t.line, t.column) for t in expected],
+                         list(zip(tokens.types, tokens.channels, tokens.starts, tokens.stops, tokens.lines,
+                                  tokens.columns)))
+        self.assertEqual([t.text for t in expected], [tokens.text(i, result.code) for i in range(len(tokens))])
+        self.assertEqual(expected[3].text, tokens.token(3, result.code).text)
+        self.assertEqual(expected[3].type, tokens.token(3).type)
+        self.assertEqual(1, len(result.issues))
+        self.assertEqual(Position(Point(2, 11), Point(2, 11)), result.issues[0].position)
+        self.assertGreater(result.timings.lexing, 0)
+        self.assertEqual(0, len(parser.tokenize("").tokens))
+
+    def test_tokenize_follows_the_lexer(self):
+        class Lexer(SimpleLangLexer):
+            def nextToken(self):
+                return super().nextToken()
+
+        class Parser(SimpleLangPylasuParser):
+            def create_antlr_lexer(self, input_stream: InputStream):
+                return Lexer(input_stream)
+
+        code = "set à = 10\ndisplay 42 @\nset b = 1"
+        parser = SimpleLangPylasuParser()
+        cold = parser.tokenize(code)
+        warm = parser.tokenize(SourceTextInputStream(SourceText(code)))
+        slow = Parser().tokenize(code)
+        for result in [warm, slow]:
+            for column in ["types", "channels", "starts", "stops", "lines", "columns"]:
+                self.assertEqual(getattr(cold.tokens, column), getattr(result.tokens, column), column)
+            self.assertEqual(cold.issues, result.issues)
+        self.assertEqual(2, len(cold.issues))
+
+    def test_tokenize_with_another_runtime_version(self):
+        code = "set a = 10\ndisplay 42 @\n"
+        parser = SimpleLangPylasuParser()
+        expected = parser.tokenize(code)
+        lexer = parser.create_lexer(InputStream(code), [])
+        self.assertTrue(token_scanner.fast_path_applies(lexer))
+        versions = token_scanner.FAST_PATH_RUNTIME_VERSIONS
+        token_scanner.FAST_PATH_RUNTIME_VERSIONS = ()
+        try:
+            self.assertFalse(token_scanner.fast_path_applies(lexer))
+            result = parser.tokenize(code)
+        finally:
+            token_scanner.FAST_PATH_RUNTIME_VERSIONS = versions
+        self.assertEqual(expected.tokens.types, result.tokens.types)
+        self.assertEqual(expected.tokens.starts, result.tokens.starts)
+        self.assertEqual(expected.issues, result.issues)
+
+
+class AsyncParsingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_parse_async(self):
+        parser = SimpleLangBoxParser()
+        result = await parser.parse_async("set a = 10 display 42")
+        self.assertEqual([], result.issues)
+        self.assertEqual(["seta=10", "display42"], [item.name for item in result.root.contents])
+        self.assertIsNotNone(result.first_stage)
+
+    async def test_parse_async_in_processes(self):
+        with ProcessPoolExecutor(1) as executor:
+            result = await SimpleLangBoxParser().parse_async("set a = 10 display 42", runner=AsyncRunner(executor))
+        self.assertIsNone(result.first_stage)
+        self.assertEqual(Position(Point(1, 11), Point(1, 21)), result.root.contents[1].position)
+
+    async def test_superseded_parsing_is_cancelled(self):
+        parser = SimpleLangBoxParser()
+        old, new = await asyncio.gather(parser.parse_async("display 1", key="doc"),
+                                        parser.parse_async("display 12", key="doc"), return_exceptions=True)
+        self.assertIsInstance(old, asyncio.CancelledError)
+        self.assertEqual("display 12", new.code)
+
+    async def test_parser_stops_when_cancelled(self):
+        parser = SimpleLangBoxParser()
+
+        def cancel_and_parse():
+            current_cancellation().set()
+            return parser.parse("set a = 10 display 42")
+
+        with self.assertRaises(asyncio.CancelledError):
+            await AsyncRunner().run(cancel_and_parse)
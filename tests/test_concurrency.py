@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pylasu.concurrency import AsyncRunner, check_cancelled, current_cancellation
+
+
+class AsyncRunnerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    async def test_run(self):
+        runner = AsyncRunner(self.executor)
+        self.assertEqual(5, await runner.run(max, 2, 5))
+        self.assertEqual([3, 2, 1], await runner.run(sorted, [1, 3, 2], reverse=True))
+        self.assertIsNone(current_cancellation())
+
+    async def test_superseded_calls_are_cancelled(self):
+        runner = AsyncRunner(self.executor)
+        results = await asyncio.gather(runner.run(len, "old", key="doc"), runner.run(len, "newer", key="doc"),
+                                       runner.run(len, "other", key="other"), return_exceptions=True)
+        self.assertIsInstance(results[0], asyncio.CancelledError)
+        self.assertEqual([5, 5], results[1:])
+        self.assertEqual({}, runner._latest)
+
+    async def test_limit(self):
+        runner = AsyncRunner(self.executor, limit=2)
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return 1
+
+        self.assertEqual(8, sum(await asyncio.gather(*(runner.run(work) for _ in range(8)))))
+        self.assertLessEqual(peak[0], 2)
+
+    async def test_cancelled_functions_keep_their_place_until_they_stop(self):
+        runner = AsyncRunner(self.executor, limit=1)
+        started = threading.Event()
+        finish = threading.Event()
+        events = []
+
+        def slow():
+            started.set()
+            # Doesn't check for cancellation
+            finish.wait(5)
+            events.append("slow finished")
+
+        def fast():
+            events.append("fast ran")
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(runner.run(slow))
+        self.assertTrue(await loop.run_in_executor(None, started.wait, 5))
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        following = asyncio.ensure_future(runner.run(fast))
+        await asyncio.sleep(0.05)
+        self.assertEqual([], events)
+        finish.set()
+        await following
+        self.assertEqual(["slow finished", "fast ran"], events)
+
+    async def test_running_functions_stop_when_cancelled(self):
+        runner = AsyncRunner(self.executor)
+        started = threading.Event()
+        stopped = threading.Event()
+
+        def work():
+            started.set()
+            try:
+                while True:
+                    check_cancelled()
+                    time.sleep(0.001)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        task = asyncio.ensure_future(runner.run(work))
+        self.assertTrue(await asyncio.get_running_loop().run_in_executor(None, started.wait, 5))
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertTrue(await asyncio.get_running_loop().run_in_executor(None, stopped.wait, 5))
@@ -2,10 +2,12 @@ import unittest
 
 from antlr4 import CommonTokenStream, InputStream
 
-from pylasu.model import Point
-from pylasu.parsing.parse_tree import ParseTreeOrigin, generate_nodes_classes_for_parser
+from pylasu.model import Point, Position
+from pylasu.model.position import StringSource
+from pylasu.parsing.parse_tree import ParseTreeOrigin, generate_nodes_classes_for_parser, precompute_positions
 from tests.antlr_script.AntlrScriptLexer import AntlrScriptLexer
 from tests.antlr_script.AntlrScriptParser import AntlrScriptParser
+from tests.fixtures import Box, Item
 from tests.simple_lang.SimpleLangLexer import SimpleLangLexer
 from tests.simple_lang.SimpleLangParser import SimpleLangParser
 
@@ -39,3 +41,30 @@ class ParseTreeTest(unittest.TestCase):
         cu = CompilationUnit()
         self.assertIsNotNone(cu)
         self.assertTrue(("statement_list", []) in cu.properties)
+
+    def test_parse_tree_origin_position_is_cached(self):
+        lexer = SimpleLangLexer(InputStream("display\n42"))
+        parser = SimpleLangParser(CommonTokenStream(lexer))
+        origin = ParseTreeOrigin(parser.compilationUnit())
+        self.assertIs(origin.position, origin.position)
+        source = StringSource("display\n42")
+        origin.source = source
+        self.assertIs(source, origin.position.source)
+        self.assertEqual(Point(2, 2), origin.position.end)
+
+    def test_precompute_positions(self):
+        code = "set a = 10\nset b = 1 + 2\ndisplay 3 * 4\n"
+        lexer = SimpleLangLexer(InputStream(code))
+        parser = SimpleLangParser(CommonTokenStream(lexer))
+        parse_tree = parser.compilationUnit()
+
+        def to_ast(cu):
+            return Box("cu", [Box(type(s).__name__, [Item(e.getText()).with_parse_tree(e)]).with_parse_tree(s)
+                              for s in cu.statement() for e in [s.expression()]]).with_parse_tree(cu)
+        lazy = to_ast(parse_tree)
+        eager = to_ast(parse_tree)
+        precompute_positions(eager)
+        self.assertEqual([n.position for n in lazy.walk()], [n.position for n in eager.walk()])
+        self.assertIs(eager.position.start, eager.contents[0].position.start)
+        self.assertIs(eager.contents[1].position.end, eager.contents[1].contents[0].position.end)
+        self.assertEqual(Position(Point(1, 0), Point(4, 0)), eager.position)
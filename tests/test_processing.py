@@ -1,8 +1,8 @@
 import unittest
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, Optional
 
-from pylasu.model import Node
+from pylasu.model import Node, child_nodes
 from tests.fixtures import box, Item
 
 
@@ -17,6 +17,34 @@ class BW(Node):
     many_as: List[AW]
 
 
+class Statement:
+    pass
+
+
+@dataclass
+class SW(Node, Statement):
+    s: str = None
+
+
+@dataclass
+class CW(Node):
+    name: str = None
+    single: AW = None
+    optional: Optional[AW] = None
+    many: List[Optional[AW]] = field(default_factory=list)
+    statements: List[Statement] = field(default_factory=list)
+    untyped: object = None
+
+
+@dataclass
+class DW(Node):
+    a: AW = None
+
+    @property
+    def children(self):
+        return iter([AW("custom")])
+
+
 class ProcessingTest(unittest.TestCase):
     def test_search_by_type(self):
         self.assertEqual(["1", "2", "3", "4", "5", "6"], [i.name for i in box.search_by_type(Item)])
@@ -43,3 +71,16 @@ class ProcessingTest(unittest.TestCase):
         b.assign_parents()
         a1.replace_with(a2)
         self.assertEqual("2", b.a.s)
+
+    def test_children(self):
+        a1, a2, a3, a4 = AW("1"), AW("2"), AW("3"), AW("4")
+        s1 = SW("s1")
+        node = CW("c", single=a1, many=[a2, None, a3], statements=[s1], untyped=[a4, "x"])
+        self.assertEqual([a1, a2, a3, s1, a4], list(child_nodes(node)))
+        self.assertEqual([a1, a2, a3, s1, a4], list(node.children))
+        self.assertEqual([], list(CW().children))
+        self.assertEqual([], list(Node().children))
+
+    def test_children_override(self):
+        self.assertEqual(["custom"], [n.s for n in child_nodes(DW(AW("1")))])
+        self.assertEqual(["custom"], [n.s for n in DW(AW("1")).walk_descendants()])
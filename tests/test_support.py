@@ -0,0 +1,25 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from pylasu.support import replacing
+
+
+class ReplacingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_files_are_replaced_only_once_written(self):
+        path = Path(self.directory.name, "entry.pickle")
+        path.write_bytes(b"old")
+        with self.assertRaises(ValueError):
+            with replacing(path) as file:
+                file.write(b"partial")
+                raise ValueError()
+        self.assertEqual([b"old"], [path.read_bytes() for path in Path(self.directory.name).iterdir()])
+        with replacing(path) as file:
+            file.write(b"new")
+        self.assertEqual([b"new"], [path.read_bytes() for path in Path(self.directory.name).iterdir()])
@@ -8,7 +8,7 @@ from pylasu.StrumentaLanguageSupport import ASTNode
 from pylasu.emf import MetamodelBuilder
 from pylasu.playground import TranspilationTrace, ETranspilationTrace
 from pylasu.validation.validation import Result
-from tests.fixtures import Box, Item
+from tests.fixtures import Box, Item, CompactItem
 
 nsURI = "http://mypackage.com"
 name = "StrumentaLanguageSupportTranspilationTest"
@@ -113,3 +113,17 @@ class ModelTest(unittest.TestCase):
         }"""
         as_json = tt.save_as_json("foo.json", mmb.generate())
         self.assertEqual(json.loads(expected), json.loads(as_json))
+
+    def test_serialize_compact_nodes(self):
+        mmb = MetamodelBuilder("tests.fixtures", "https://strumenta.com/pylasu/test/fixtures")
+        mmb.provide_class(Box)
+        mmb.provide_class(CompactItem)
+
+        tt = TranspilationTrace(
+            original_code="box(a)[c]", generated_code='<box name="a"><c /></box>',
+            source_result=Result(Box("a", [CompactItem("c")])),
+            target_result=Result(Box("a")))
+        as_json = json.loads(tt.save_as_json("foo.json", mmb.generate()))
+        self.assertEqual(
+            {"eClass": "https://strumenta.com/pylasu/test/fixtures#//CompactItem", "name": "c"},
+            as_json["sourceResult"]["root"]["contents"][0])
@@ -48,3 +48,38 @@ class TraversingTest(unittest.TestCase):
         box.assign_parents()
         item = box.contents[1]
         self.assertEqual(box, find_ancestor_of_type(item, Box))
+
+    def test_walk_pruned(self):
+        self.assertEqual(
+            ["root", "first", "1", "2", "big", "6"],
+            [n.name for n in box.walk(prune=lambda n: n.name == "big")]
+        )
+
+    def test_walk_leaves_first_pruned(self):
+        self.assertEqual(
+            ["1", "first", "2", "big", "6", "root"],
+            [n.name for n in box.walk_leaves_first(prune=lambda n: n.name == "big")]
+        )
+
+    def test_walk_events(self):
+        events = [(e.name.lower(), n.name) for e, n in box.walk_events(prune=lambda n: n.name == "first")]
+        self.assertEqual(
+            [("enter", "root"), ("enter", "first"), ("exit", "first"), ("enter", "2"), ("exit", "2"),
+             ("enter", "big"), ("enter", "small"), ("enter", "3"), ("exit", "3"), ("enter", "4"), ("exit", "4"),
+             ("enter", "5"), ("exit", "5"), ("exit", "small"), ("exit", "big"), ("enter", "6"), ("exit", "6"),
+             ("exit", "root")],
+            events
+        )
+
+    def test_walk_deep_tree(self):
+        depth = 100_000
+        root = leaf = Box("0")
+        for i in range(1, depth):
+            child = Box(str(i))
+            leaf.contents.append(child)
+            leaf = child
+        root.assign_parents()
+        self.assertEqual(depth, sum(1 for _ in root.walk()))
+        self.assertEqual(depth, sum(1 for _ in root.walk_events()) // 2)
+        self.assertIs(leaf, next(root.walk_leaves_first()))
+        self.assertIs(root, list(leaf.walk_ancestors())[-1])
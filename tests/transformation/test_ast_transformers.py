@@ -1,8 +1,10 @@
+import asyncio
 import enum
 import unittest
 from dataclasses import dataclass, field
 from typing import List
 
+from pylasu.concurrency import AsyncRunner, current_cancellation
 from pylasu.model import Node
 from pylasu.testing.testing import assert_asts_are_equal
 from pylasu.transformation.generic_nodes import GenericNode
@@ -220,3 +222,26 @@ class BazRoot(Node):
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class AsyncASTTransformerTest(unittest.IsolatedAsyncioTestCase):
+    def create_transformer(self):
+        prop = PropertyRef("statements")
+        transformer = ASTTransformer()
+        transformer.register_node_factory(CU, CU).with_child(prop, prop)
+        transformer.register_identity_transformation(DisplayIntStatement)
+        return transformer
+
+    async def test_transform_async(self):
+        cu = CU(statements=[DisplayIntStatement(value=456)])
+        self.assertEqual(cu, await self.create_transformer().transform_async(cu))
+
+    async def test_transformation_stops_when_cancelled(self):
+        transformer = self.create_transformer()
+
+        def cancel_and_transform():
+            current_cancellation().set()
+            return transformer.transform(CU(statements=[DisplayIntStatement(value=456)]))
+
+        with self.assertRaises(asyncio.CancelledError):
+            await AsyncRunner().run(cancel_and_transform)